@@ -0,0 +1,216 @@
+import os
+import re
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process use only
+    fcntl = None
+
+# Column name -> on-disk dtype. Timestamps are stored as int64 epoch milliseconds.
+CANDLE_COLUMNS: Dict[str, str] = {
+    'open_time': '<i8',
+    'open': '<f8',
+    'high': '<f8',
+    'low': '<f8',
+    'close': '<f8',
+    'volume': '<f8',
+    'close_time': '<i8',
+    'quote_volume': '<f8',
+}
+MISSING_TIME = np.iinfo(np.int64).min
+
+
+def _safe_name(value: str) -> str:
+    return re.sub(r'[^A-Za-z0-9._-]', '_', value)
+
+
+class CandleStore:
+    """On-disk OHLCV store with one memory-mappable file per column.
+
+    Each (provider, symbol, timeframe) series lives in its own directory as raw
+    little-endian column files sorted by open_time. Reads memory-map the files
+    and only copy the requested slice, so years of 1m bars never need to be
+    loaded at once. Writes replace the stored candles within the incoming
+    open_time range and keep the rest, so a newer window can be written past
+    a hole in the history and the hole backfilled later; rewriting the last
+    candle keeps the still-forming one up to date.
+
+    A write only rewrites the column tails from the first incoming candle on.
+    The new tails are first saved to a journal, which is replayed if a write
+    was interrupted, so the columns never end up misaligned.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _series_dir(self, provider: str, symbol: str, timeframe: str) -> str:
+        return os.path.join(self.root, _safe_name(provider), _safe_name(symbol.upper()), _safe_name(timeframe))
+
+    def _column_path(self, series_dir: str, column: str) -> str:
+        return os.path.join(series_dir, f'{column}.bin')
+
+    def _journal_path(self, series_dir: str) -> str:
+        return os.path.join(series_dir, 'journal.npz')
+
+    @contextmanager
+    def _locked(self, series_dir: str, exclusive: bool):
+        os.makedirs(series_dir, exist_ok=True)
+        with open(os.path.join(series_dir, '.lock'), 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                # Writers remove the journal before unlocking: one left behind is an interrupted write
+                if os.path.exists(self._journal_path(series_dir)):
+                    if not exclusive and fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX)
+                    self._replay(series_dir)
+                    if not exclusive and fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_SH)
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _replay(self, series_dir: str) -> None:
+        """Apply the journaled column tails (idempotent) and drop the journal"""
+        path = self._journal_path(series_dir)
+        try:
+            with np.load(path) as journal:
+                keep = int(journal['keep'])
+                tails = {column: journal[column] for column in CANDLE_COLUMNS}
+        except FileNotFoundError:
+            return  # replayed by another reader
+        for column, dtype in CANDLE_COLUMNS.items():
+            with open(self._column_path(series_dir, column), 'ab') as f:
+                f.truncate(keep * np.dtype(dtype).itemsize)
+                f.write(np.ascontiguousarray(tails[column], dtype=dtype).tobytes())
+        os.remove(path)
+
+    def _row_count(self, series_dir: str) -> int:
+        """Rows present in every column (a torn write leaves columns uneven)"""
+        counts = []
+        for column, dtype in CANDLE_COLUMNS.items():
+            path = self._column_path(series_dir, column)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            counts.append(size // np.dtype(dtype).itemsize)
+        return min(counts)
+
+    def _column(self, series_dir: str, column: str, rows: int) -> np.ndarray:
+        if rows == 0:
+            return np.empty(0, dtype=CANDLE_COLUMNS[column])
+        return np.memmap(self._column_path(series_dir, column), dtype=CANDLE_COLUMNS[column],
+                         mode='r', shape=(rows,))
+
+    def count(self, provider: str, symbol: str, timeframe: str) -> int:
+        """Number of stored candles"""
+        series_dir = self._series_dir(provider, symbol, timeframe)
+        with self._locked(series_dir, exclusive=False):
+            return self._row_count(series_dir)
+
+    def last_open_time(self, provider: str, symbol: str, timeframe: str) -> Optional[pd.Timestamp]:
+        """open_time of the newest stored candle, or None when empty"""
+        series_dir = self._series_dir(provider, symbol, timeframe)
+        with self._locked(series_dir, exclusive=False):
+            rows = self._row_count(series_dir)
+            if rows == 0:
+                return None
+            return pd.Timestamp(int(self._column(series_dir, 'open_time', rows)[-1]), unit='ms')
+
+    def write(self, provider: str, symbol: str, timeframe: str, df: pd.DataFrame) -> int:
+        """Upsert candles indexed by open_time; returns the stored row count"""
+        if df is None or df.empty:
+            return self.count(provider, symbol, timeframe)
+        df = df.sort_index()
+        df = df[~df.index.duplicated(keep='last')]
+        incoming = {'open_time': df.index.values.astype('datetime64[ms]').astype(np.int64)}
+        for column, dtype in CANDLE_COLUMNS.items():
+            if column == 'open_time':
+                continue
+            if column == 'close_time':
+                if column in df.columns:
+                    values = pd.to_datetime(df[column]).values.astype('datetime64[ms]').astype(np.int64)
+                else:
+                    values = np.full(len(df), MISSING_TIME, dtype=np.int64)
+            elif column in df.columns:
+                values = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=float)
+            else:
+                values = np.full(len(df), np.nan)
+            incoming[column] = np.ascontiguousarray(values, dtype=dtype)
+
+        series_dir = self._series_dir(provider, symbol, timeframe)
+        with self._locked(series_dir, exclusive=True):
+            rows = self._row_count(series_dir)
+            keep, after = 0, rows
+            if rows:
+                stored_times = self._column(series_dir, 'open_time', rows)
+                keep = int(np.searchsorted(stored_times, incoming['open_time'][0], side='left'))
+                after = int(np.searchsorted(stored_times, incoming['open_time'][-1], side='right'))
+                del stored_times
+            # Stored candles newer than the incoming ones (a backfilled hole) are kept after them
+            tails = {column: np.concatenate([incoming[column], self._column(series_dir, column, rows)[after:]])
+                     if after < rows else incoming[column] for column in CANDLE_COLUMNS}
+            journal = self._journal_path(series_dir)
+            with open(journal + '.tmp', 'wb') as f:
+                np.savez(f, keep=np.int64(keep), **tails)
+            os.replace(journal + '.tmp', journal)
+            self._replay(series_dir)
+            return keep + len(tails['open_time'])
+
+    def read(self, provider: str, symbol: str, timeframe: str, limit: Optional[int] = None,
+             start: Optional[pd.Timestamp] = None, end: Optional[pd.Timestamp] = None) -> Optional[pd.DataFrame]:
+        """Read candles in [start, end], keeping only the newest `limit` rows"""
+        series_dir = self._series_dir(provider, symbol, timeframe)
+        with self._locked(series_dir, exclusive=False):
+            rows = self._row_count(series_dir)
+            if rows == 0:
+                return None
+            open_times = self._column(series_dir, 'open_time', rows)
+            lo, hi = 0, rows
+            if start is not None:
+                lo = int(np.searchsorted(open_times, pd.Timestamp(start).value // 10**6, side='left'))
+            if end is not None:
+                hi = int(np.searchsorted(open_times, pd.Timestamp(end).value // 10**6, side='right'))
+            if limit is not None:
+                lo = max(lo, hi - limit)
+            if lo >= hi:
+                return None
+            data = {column: np.array(self._column(series_dir, column, rows)[lo:hi])
+                    for column in CANDLE_COLUMNS}
+
+        index = pd.DatetimeIndex(pd.to_datetime(data.pop('open_time'), unit='ms'), name='open_time')
+        close_time = data.pop('close_time')
+        df = pd.DataFrame(data, index=index)
+        # MISSING_TIME is NumPy's NaT sentinel, so unknown close times come back as NaT
+        close_time = close_time.astype('datetime64[ms]').astype('datetime64[ns]')
+        df.insert(5, 'close_time', close_time)
+        return df
+
+    def find_gap(self, provider: str, symbol: str, timeframe: str, bar_seconds: int,
+                 start: Optional[pd.Timestamp] = None) -> Optional[pd.Timestamp]:
+        """open_time of the first candle (at or after start) followed by a hole of a bar or more"""
+        series_dir = self._series_dir(provider, symbol, timeframe)
+        with self._locked(series_dir, exclusive=False):
+            rows = self._row_count(series_dir)
+            if rows < 2:
+                return None
+            open_times = self._column(series_dir, 'open_time', rows)
+            lo = 0 if start is None else int(np.searchsorted(open_times, pd.Timestamp(start).value // 10**6))
+            # 1.5 bars: monthly candles are 28 to 31 days apart
+            holes = np.flatnonzero(np.diff(open_times[lo:]) > bar_seconds * 1500)
+            if not len(holes):
+                return None
+            return pd.Timestamp(int(open_times[lo + holes[0]]), unit='ms')
+
+    def clear(self, provider: str, symbol: str, timeframe: str) -> None:
+        """Delete a stored series"""
+        series_dir = self._series_dir(provider, symbol, timeframe)
+        with self._locked(series_dir, exclusive=True):
+            for column in CANDLE_COLUMNS:
+                path = self._column_path(series_dir, column)
+                if os.path.exists(path):
+                    os.truncate(path, 0)
@@ -1,16 +1,32 @@
 import os
 import pandas as pd
 import requests
+import threading
 import time
 from datetime import datetime, timedelta
-from typing import Optional
-from config import API_BASE_URL, TIMEFRAME
-import yfinance as yf
+from typing import Any, Dict, List, Optional, Tuple
+from config import (
+    API_BASE_URL, TIMEFRAME, CANDLE_STORE_ENABLED, CANDLE_STORE_DIR,
+    BINANCE_KLINES_PAGE_LIMIT, CANDLE_GAP_FILL_MAX_PAGES, HTTP_READ_TIMEOUT
+)
+from api.candle_store import CandleStore
+from api.http_pool import HostPool, HostUnavailable, create_session
+from utils.helpers import timeframe_to_seconds
+from utils.rate_limiter import acquire, binance_weight, current_priority, get_rate_limiter, request_priority
+from utils.shared_cache import get_shared_cache, market_data_expiry
 
 class ExchangeClient:
-    def __init__(self, base_url: str = API_BASE_URL):
+    def __init__(self, base_url: str = API_BASE_URL, candle_store: Optional[CandleStore] = None):
         self.base_url = base_url
-        self.session = requests.Session()
+        # One keep-alive pool for every upstream; Binance calls are hedged across mirrors
+        self.session = create_session()
+        self.binance = HostPool(self._binance_hosts(), self.session, on_response=self._track_binance_usage)
+        self.last_error = None
+        if candle_store is None and CANDLE_STORE_ENABLED:
+            candle_store = CandleStore(CANDLE_STORE_DIR)
+        self.candle_store = candle_store
+        # (symbol, interval) -> open_time up to which the stored history has been backfilled
+        self._backfill_from: Dict[Tuple[str, str], pd.Timestamp] = {}
         
     def get_historical_data(self, symbol: str, timeframe: str = TIMEFRAME, 
                           limit: int = 200) -> Optional[pd.DataFrame]:
@@ -36,77 +52,34 @@ class ExchangeClient:
             
             binance_timeframe = timeframe_map.get(timeframe, '1h')
             
-            params = {
-                'symbol': symbol,
-                'interval': binance_timeframe,
-                'limit': limit
-            }
-            
-            # Try multiple Binance hosts to avoid geo blocks
-            default_hosts = [
-                "https://data-api.binance.vision/api/v3",  # public mirrored data host
-                "https://api.binance.com/api/v3"
-            ]
-            # Allow override via env (comma-separated)
-            env_hosts = os.getenv("BINANCE_BASE_URLS")
-            hosts = [h.strip() for h in env_hosts.split(",") if h.strip()] if env_hosts else default_hosts
-
-            # Set a simple User-Agent to avoid being blocked by some CDNs
-            headers = {"User-Agent": "Mozilla/5.0 (compatible; TradingBot/1.0)"}
-
-            last_error = None
-            for host in hosts:
-                url = f"{host}/klines"
-                print(f"[DEBUG] Fetching data from {url} with params: {params}")
+            df = None
+            if self.candle_store is not None:
                 try:
-                    response = self.session.get(
-                        url,
-                        params=params,
-                        timeout=30,
-                        headers=headers
-                    )
-                    print(f"[DEBUG] Response status: {response.status_code} for host {host}")
-                    if response.status_code == 200:
-                        data = response.json()
-                        print(f"[DEBUG] Received {len(data)} candles from {host}")
-                        if not data:
-                            last_error = "Empty response"
-                            continue
-                        df = pd.DataFrame(data, columns=[
-                            'open_time', 'open', 'high', 'low', 'close', 'volume',
-                            'close_time', 'quote_volume', 'trades', 'taker_buy_base',
-                            'taker_buy_quote', 'ignore'
-                        ])
-                        df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
-                        df['close_time'] = pd.to_datetime(df['close_time'], unit='ms')
-                        numeric_columns = ['open', 'high', 'low', 'close', 'volume', 'quote_volume']
-                        for col in numeric_columns:
-                            df[col] = pd.to_numeric(df[col], errors='coerce')
-                        df.set_index('open_time', inplace=True)
-                        df = df.sort_index()
-                        self.last_provider = "binance"
-                        return df
-                    else:
-                        try:
-                            body = response.text[:200]
-                        except Exception:
-                            body = "<no-body>"
-                        last_error = f"Status {response.status_code} Body {body}"
-                        print(f"[DEBUG] Binance host {host} failed: {last_error}")
-                except Exception as e:
-                    last_error = str(e)
-                    print(f"[DEBUG] Exception calling {host}: {e}")
-
-            print(f"[WARN] All Binance hosts failed. Last error: {last_error}")
+                    df = self._get_binance_with_store(symbol, binance_timeframe, limit)
+                except OSError as e:
+                    print(f"[WARN] Candle store unavailable, fetching directly: {e}")
+            if df is None:
+                df = self._fetch_binance_klines({
+                    'symbol': symbol,
+                    'interval': binance_timeframe,
+                    'limit': limit
+                })
+            if df is not None:
+                self.last_provider = "binance"
+                return df
+
+            print(f"[WARN] All Binance hosts failed. Last error: {self.last_error}")
             # Fallback to yfinance if all Binance hosts fail
             df = self._fallback_historical_yf(symbol, timeframe, limit)
             if df is not None and not df.empty:
                 self.last_provider = "yfinance"
+                self._store_candles("yfinance", symbol, timeframe, df)
                 return df
             # If yfinance also fails, try CoinGecko
             df = self._fallback_historical_coingecko(symbol, timeframe, limit)
             if df is not None and not df.empty:
                 self.last_provider = "coingecko"
+                self._store_candles("coingecko", symbol, timeframe, df)
             return df
         except requests.exceptions.RequestException as e:
             print(f"Network error fetching historical data from Binance: {e}")
@@ -122,6 +95,155 @@ class ExchangeClient:
                 return df
             return self._fallback_historical_coingecko(symbol, timeframe, limit)
 
+    def _binance_hosts(self) -> List[str]:
+        # Try multiple Binance hosts to avoid geo blocks
+        default_hosts = [
+            "https://data-api.binance.vision/api/v3",  # public mirrored data host
+            self.base_url
+        ]
+        # Allow override via env (comma-separated)
+        env_hosts = os.getenv("BINANCE_BASE_URLS")
+        return [h.strip() for h in env_hosts.split(",") if h.strip()] if env_hosts else default_hosts
+
+    def _track_binance_usage(self, host: str, response: requests.Response) -> None:
+        """Feed Binance's own weight accounting and bans back into the shared budget"""
+        limiter = get_rate_limiter()
+        if limiter is None:
+            return
+        used = response.headers.get('X-MBX-USED-WEIGHT-1M')
+        if used is not None:
+            limiter.sync_used('binance', float(used))
+        if response.status_code in (418, 429):
+            retry_after = float(response.headers.get('Retry-After') or 60)
+            print(f"[WARN] Binance rate limited {host} ({response.status_code}), pausing {retry_after:.0f}s")
+            limiter.block('binance', retry_after)
+
+    def _get_binance(self, path: str, params: dict, timeout: float = HTTP_READ_TIMEOUT) -> Optional[Any]:
+        """GET a public Binance endpoint from the fastest healthy host; decoded JSON or None"""
+        if not self.wait_for_rate_limit(binance_weight(path, params)):
+            self.last_error = f"Binance request budget exhausted ({path})"
+            print(f"[DEBUG] {self.last_error}")
+            return None
+        try:
+            host, response = self.binance.get(path, params, timeout=timeout)
+        except HostUnavailable as e:
+            self.last_error = str(e)
+            print(f"[DEBUG] Binance {path} failed on every host: {e}")
+            return None
+        print(f"[DEBUG] Response status: {response.status_code} for {host}/{path}")
+        if response.status_code != 200:
+            self.last_error = f"Status {response.status_code} Body {response.text[:200]}"
+            return None
+        data = response.json()
+        if not data:
+            self.last_error = "Empty response"
+            return None
+        return data
+
+    def _fetch_binance_klines(self, params: dict) -> Optional[pd.DataFrame]:
+        """Fetch klines trying each Binance host in turn; None if all fail"""
+        data = self._get_binance("klines", params)
+        if data is None:
+            return None
+        print(f"[DEBUG] Received {len(data)} candles")
+        df = pd.DataFrame(data, columns=[
+            'open_time', 'open', 'high', 'low', 'close', 'volume',
+            'close_time', 'quote_volume', 'trades', 'taker_buy_base',
+            'taker_buy_quote', 'ignore'
+        ])
+        df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
+        df['close_time'] = pd.to_datetime(df['close_time'], unit='ms')
+        numeric_columns = ['open', 'high', 'low', 'close', 'volume', 'quote_volume']
+        for col in numeric_columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+        df.set_index('open_time', inplace=True)
+        df = df.sort_index()
+        return df
+
+    def _get_binance_with_store(self, symbol: str, interval: str, limit: int) -> Optional[pd.DataFrame]:
+        """Serve klines from the local candle store, fetching only newer bars"""
+        store = self.candle_store
+        last_open = store.last_open_time("binance", symbol, interval)
+        if last_open is None or store.count("binance", symbol, interval) < limit:
+            df = self._fetch_binance_klines({'symbol': symbol, 'interval': interval, 'limit': limit})
+            if df is None:
+                return None
+            if last_open is not None and df.index[0] > last_open:
+                # Stored history does not reach the fresh window: keep both, the hole is backfilled
+                print(f"[WARN] Candle gap for {symbol} {interval} after {last_open}, backfilling")
+            store.write("binance", symbol, interval, df)
+            self._backfill_gap(symbol, interval)
+            return store.read("binance", symbol, interval, limit=limit)
+
+        # Gap-fill from the last stored candle (refetched since it may have been still forming)
+        start_ms = int(last_open.value // 10**6)
+        # The first page only asks for the bars opened since then (plus one for clock skew),
+        # so a routine poll costs weight 1 instead of a full page's 5
+        bar_ms = timeframe_to_seconds(interval) * 1000
+        page_limit = max(min(int((time.time() * 1000 - start_ms) // bar_ms) + 2, BINANCE_KLINES_PAGE_LIMIT), 1)
+        for page_number in range(CANDLE_GAP_FILL_MAX_PAGES):
+            # The first page is the normal refresh; further pages are backfill and yield to live calls
+            with request_priority('backfill' if page_number else current_priority()):
+                page = self._fetch_binance_klines({
+                    'symbol': symbol,
+                    'interval': interval,
+                    'startTime': start_ms,
+                    'limit': page_limit
+                })
+            if page is None:
+                return None
+            store.write("binance", symbol, interval, page)
+            if len(page) < page_limit:
+                break
+            start_ms = int(page.index[-1].value // 10**6)
+            page_limit = BINANCE_KLINES_PAGE_LIMIT
+        else:
+            # Serve the newest candles now; the rest of the hole is backfilled on later calls
+            print(f"[WARN] Candle gap for {symbol} {interval} too large, backfilling")
+            df = self._fetch_binance_klines({'symbol': symbol, 'interval': interval, 'limit': limit})
+            if df is None:
+                return None
+            store.write("binance", symbol, interval, df)
+
+        print(f"[DEBUG] Gap-filled {symbol} {interval} from {last_open}")
+        self._backfill_gap(symbol, interval)
+        return store.read("binance", symbol, interval, limit=limit)
+
+    def _backfill_gap(self, symbol: str, interval: str) -> None:
+        """Fetch one page into the oldest hole of the stored history, at backfill priority"""
+        store = self.candle_store
+        key = (symbol, interval)
+        gap = store.find_gap("binance", symbol, interval, timeframe_to_seconds(interval), self._backfill_from.get(key))
+        if gap is None:
+            # Everything up to here is contiguous; later scans start from the newest candle
+            self._backfill_from[key] = store.last_open_time("binance", symbol, interval)
+            return
+        with request_priority('backfill'):
+            page = self._fetch_binance_klines({
+                'symbol': symbol,
+                'interval': interval,
+                'startTime': int(gap.value // 10**6),
+                'limit': BINANCE_KLINES_PAGE_LIMIT
+            })
+        if page is None or page.empty:
+            return
+        store.write("binance", symbol, interval, page)
+        # Past the page even if the hole is still there: the exchange has no candles for it
+        self._backfill_from[key] = page.index[-1]
+
+    def _store_candles(self, provider: str, symbol: str, timeframe: str, df: pd.DataFrame) -> None:
+        """Best-effort copy of fallback provider candles into the local store"""
+        if self.candle_store is None:
+            return
+        try:
+            last_open = self.candle_store.last_open_time(provider, symbol, timeframe)
+            if last_open is not None and df.index[0].tz_localize(None) > last_open:
+                # The stored history is kept; find_gap() reports the hole
+                print(f"[WARN] Candle gap in stored {provider} {symbol} {timeframe} after {last_open}")
+            self.candle_store.write(provider, symbol, timeframe, df)
+        except Exception as e:
+            print(f"[WARN] Could not store {provider} candles: {e}")
+
     def _fallback_historical_yf(self, symbol: str, timeframe: str, limit: int) -> Optional[pd.DataFrame]:
         """Fallback to yfinance when Binance API is unavailable."""
         try:
@@ -149,6 +271,11 @@ class ExchangeClient:
             }
             period = period_map.get(interval, '200d')
 
+            if not acquire('yfinance'):
+                print("[FALLBACK] yfinance request budget exhausted")
+                return None
+            # Imported on first use: yfinance is only needed when Binance is unavailable
+            import yfinance as yf
             df = yf.download(yf_symbol, interval=interval, period=period, progress=False)
             if df is None or df.empty:
                 print("[FALLBACK] yfinance returned empty DataFrame")
@@ -223,7 +350,10 @@ class ExchangeClient:
 
             params = { 'vs_currency': vs_currency, 'days': days }
             print(f"[FALLBACK-CG] Fetching CoinGecko OHLC for {cg_id} days={days}")
-            r = requests.get(url, params=params, timeout=20)
+            if not acquire('coingecko'):
+                print("[FALLBACK-CG] CoinGecko request budget exhausted")
+                return None
+            r = self.session.get(url, params=params, timeout=20)
             if r.status_code != 200:
                 print(f"[FALLBACK-CG] CoinGecko error {r.status_code}: {r.text[:200]}")
                 return None
@@ -258,18 +388,12 @@ class ExchangeClient:
     def get_current_price(self, symbol: str) -> Optional[float]:
         """Get current market price"""
         try:
-            response = self.session.get(
-                f"{self.base_url}/ticker/price",
-                params={'symbol': symbol},
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                return float(data['price'])
-            else:
-                print(f"Error fetching current price: {response.status_code}")
+            with request_priority('live'):
+                data = self._get_binance("ticker/price", {'symbol': symbol})
+            if data is None:
+                print(f"Error fetching current price: {self.last_error}")
                 return None
+            return float(data['price'])
                 
         except Exception as e:
             print(f"Error fetching current price: {e}")
@@ -278,41 +402,74 @@ class ExchangeClient:
     def get_24h_stats(self, symbol: str) -> Optional[dict]:
         """Get 24-hour statistics"""
         try:
-            response = self.session.get(
-                f"{self.base_url}/ticker/24hr",
-                params={'symbol': symbol},
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                return {
-                    'price_change': float(data['priceChange']),
-                    'price_change_percent': float(data['priceChangePercent']),
-                    'weighted_avg_price': float(data['weightedAvgPrice']),
-                    'prev_close_price': float(data['prevClosePrice']),
-                    'last_price': float(data['lastPrice']),
-                    'bid_price': float(data['bidPrice']),
-                    'ask_price': float(data['askPrice']),
-                    'volume': float(data['volume']),
-                    'quote_volume': float(data['quoteVolume']),
-                    'high_price': float(data['highPrice']),
-                    'low_price': float(data['lowPrice'])
-                }
-            else:
-                print(f"Error fetching 24h stats: {response.status_code}")
+            data = self._get_binance("ticker/24hr", {'symbol': symbol})
+            if data is None:
+                print(f"Error fetching 24h stats: {self.last_error}")
                 return None
+            return {
+                'price_change': float(data['priceChange']),
+                'price_change_percent': float(data['priceChangePercent']),
+                'weighted_avg_price': float(data['weightedAvgPrice']),
+                'prev_close_price': float(data['prevClosePrice']),
+                'last_price': float(data['lastPrice']),
+                'bid_price': float(data['bidPrice']),
+                'ask_price': float(data['askPrice']),
+                'volume': float(data['volume']),
+                'quote_volume': float(data['quoteVolume']),
+                'high_price': float(data['highPrice']),
+                'low_price': float(data['lowPrice'])
+            }
                 
         except Exception as e:
             print(f"Error fetching 24h stats: {e}")
             return None
     
-    def wait_for_rate_limit(self, delay: float = 1.0):
-        """Wait to respect rate limits"""
-        time.sleep(delay)
+    def get_top_symbols(self, quote_asset: str = 'USDT', limit: int = 300) -> Optional[List[str]]:
+        """Most traded spot symbols quoted in quote_asset, by 24h quote volume"""
+        data = self._get_binance("ticker/24hr", {}, timeout=30)
+        if data is None:
+            return None
+        # Leveraged tokens (BTCUPUSDT, ETHDOWNUSDT...) track other symbols; skip them
+        excluded = ('UP' + quote_asset, 'DOWN' + quote_asset, 'BULL' + quote_asset, 'BEAR' + quote_asset)
+        tickers = [
+            t for t in data
+            if t.get('symbol', '').endswith(quote_asset) and not t['symbol'].endswith(excluded)
+            and float(t.get('quoteVolume') or 0) > 0
+        ]
+        tickers.sort(key=lambda t: float(t['quoteVolume']), reverse=True)
+        return [t['symbol'] for t in tickers[:limit]]
+
+    def wait_for_rate_limit(self, weight: int = 1, priority: Optional[str] = None) -> bool:
+        """Wait for Binance request budget shared by all workers; False if none came in time"""
+        return acquire('binance', weight, priority)
+
+    def get_cached_historical_data(self, symbol: str, timeframe: str = TIMEFRAME,
+                                   limit: int = 200) -> Optional[pd.DataFrame]:
+        """get_historical_data through the cross-worker cache (one fetch per interval)"""
+        cache = get_shared_cache()
+        if cache is None:
+            return self.get_historical_data(symbol, timeframe, limit)
+        df = cache.get_or_compute(
+            f"klines:{symbol}:{timeframe}:{limit}",
+            lambda: self.get_historical_data(symbol, timeframe, limit),
+            expires_at=lambda: market_data_expiry(timeframe)
+        )
+        # Callers add indicator columns in place; keep the cached frame pristine
+        return df.copy() if df is not None else None
+
+_default_client: Optional[ExchangeClient] = None
+_default_client_lock = threading.Lock()
+
+
+def get_default_client() -> ExchangeClient:
+    """Process-wide ExchangeClient, so connections and host stats are reused"""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = ExchangeClient()
+        return _default_client
 
 # Legacy function to maintain compatibility
 def get_historical_data(symbol: str, timeframe: str = '1h', limit: int = 200) -> Optional[pd.DataFrame]:
     """Legacy function for backward compatibility"""
-    client = ExchangeClient()
-    return client.get_historical_data(symbol, timeframe, limit)
\ No newline at end of file
+    return get_default_client().get_cached_historical_data(symbol, timeframe, limit)
\ No newline at end of file
@@ -0,0 +1,237 @@
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (
+    HTTP_POOL_SIZE, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_HEDGE_DELAY, HTTP_HEDGE_MIN_DELAY,
+    HTTP_BREAKER_THRESHOLD, HTTP_BREAKER_COOLDOWN
+)
+
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; TradingBot/1.0)"}
+# Statuses that say "this host will not serve us right now" rather than "bad request"
+HOST_FAILURE_STATUSES = {403, 418, 429, 451}
+
+
+class HostUnavailable(Exception):
+    """Every host failed or has its circuit open"""
+
+
+def create_session(pool_size: int = HTTP_POOL_SIZE) -> requests.Session:
+    """Session with a keep-alive pool large enough for concurrent callers"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_size, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+
+class CircuitBreaker:
+    """Stops calling a host after repeated failures, retrying it after a cooldown.
+
+    closed -> (threshold consecutive failures) -> open -> (cooldown) ->
+    half-open: one trial request; success closes the circuit, failure
+    reopens it.
+    """
+
+    def __init__(self, threshold: int = HTTP_BREAKER_THRESHOLD, cooldown: float = HTTP_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        return 'half-open' if time.time() - self.opened_at >= self.cooldown else 'open'
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.threshold:
+                self.opened_at = time.time()
+            self._trial_running = False
+
+
+class HostStats:
+    """Latency EWMA and circuit breaker for one host"""
+
+    def __init__(self, host: str, alpha: float = 0.3):
+        self.host = host
+        self.alpha = alpha
+        self.latency: Optional[float] = None
+        self.breaker = CircuitBreaker()
+        self.requests = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+
+    def record(self, latency: float, ok: bool, error: Optional[str] = None) -> None:
+        self.requests += 1
+        if ok:
+            self.latency = latency if self.latency is None else self.alpha * latency + (1 - self.alpha) * self.latency
+            self.breaker.record_success()
+        else:
+            self.errors += 1
+            self.last_error = error
+            # A failure costs at least as much as the time it took to find out
+            self.latency = latency if self.latency is None else max(self.latency, latency)
+            self.breaker.record_failure()
+
+    def record_pending(self, elapsed: float) -> None:
+        """A request still running after `elapsed` seconds: the host is at least that slow"""
+        if self.latency is None or self.latency < elapsed:
+            self.latency = elapsed
+
+
+class HostPool:
+    """Hedged GET requests across mirror hosts.
+
+    Hosts are ranked by observed latency (unknown hosts first, so each gets
+    measured); open circuits are skipped. The best host is asked first and,
+    if it has not answered within the hedge delay, the next one is asked as
+    well; the first good response wins. A slow or geo-blocked host therefore
+    costs at most one hedge delay instead of a full timeout.
+    """
+
+    def __init__(self, hosts: Sequence[str], session: Optional[requests.Session] = None,
+                 hedge_delay: float = HTTP_HEDGE_DELAY, max_workers: int = HTTP_POOL_SIZE,
+                 on_response: Optional[Callable[[str, requests.Response], None]] = None):
+        self.hosts = list(hosts)
+        self.session = session or create_session()
+        self.hedge_delay = hedge_delay
+        self.max_workers = max_workers
+        # Sees every response, including hedged duplicates (e.g. to read rate-limit headers)
+        self.on_response = on_response
+        self.stats: Dict[str, HostStats] = {host: HostStats(host) for host in self.hosts}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ThreadPoolExecutor:
+        # Worker threads do not survive a fork
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='http')
+                    self._pid = os.getpid()
+        return self._executor
+
+    def ranked_hosts(self) -> List[str]:
+        order = {host: i for i, host in enumerate(self.hosts)}
+        # Healthy hosts by latency, then hosts that failed recently
+        return sorted(self.hosts, key=lambda h: (self.stats[h].breaker.failures > 0,
+                                                 self.stats[h].latency or 0.0, order[h]))
+
+    def _delay_after(self, host: str) -> float:
+        latency = self.stats[host].latency
+        if latency is None:
+            return self.hedge_delay
+        return min(self.hedge_delay, max(HTTP_HEDGE_MIN_DELAY, latency * 3))
+
+    def _request(self, host: str, path: str, params: Dict, timeout: Tuple[float, float]) -> requests.Response:
+        started = time.perf_counter()
+        try:
+            response = self.session.get(f"{host}/{path}", params=params, timeout=timeout)
+        except requests.RequestException as e:
+            self.stats[host].record(time.perf_counter() - started, False, str(e))
+            raise
+        ok = response.status_code not in HOST_FAILURE_STATUSES and response.status_code < 500
+        self.stats[host].record(time.perf_counter() - started, ok,
+                                None if ok else f"Status {response.status_code} Body {response.text[:200]}")
+        if self.on_response is not None:
+            try:
+                self.on_response(host, response)
+            except Exception as e:
+                print(f"[WARN] Response hook failed for {host}: {e}")
+        return response
+
+    def get(self, path: str, params: Optional[Dict] = None,
+            timeout: Optional[float] = None) -> Tuple[str, requests.Response]:
+        """(host, response) of the first host to answer; raises HostUnavailable"""
+        params = params or {}
+        request_timeout = (HTTP_CONNECT_TIMEOUT, timeout or HTTP_READ_TIMEOUT)
+        pending = self.ranked_hosts()
+
+        def next_host() -> Optional[str]:
+            # Only ask the breaker when the host is really about to be used (half-open allows one trial)
+            while pending:
+                host = pending.pop(0)
+                if self.stats[host].breaker.allow():
+                    return host
+            return None
+
+        host = next_host()
+        if host is None:
+            raise HostUnavailable(f"All hosts have open circuits: {self.hosts}")
+        pool = self._pool()
+        running: Dict[Future, str] = {}
+        started: Dict[str, float] = {}
+        errors: List[str] = []
+        deadline = time.time() + sum(request_timeout) + self.hedge_delay * len(self.hosts)
+        while True:
+            if host is not None:
+                running[pool.submit(self._request, host, path, params, request_timeout)] = host
+                started[host] = time.time()
+                hedge_at = started[host] + self._delay_after(host)
+                host = None
+            wait_until = min(hedge_at, deadline) if pending else deadline
+            done, _ = wait(list(running), timeout=max(wait_until - time.time(), 0.0), return_when=FIRST_COMPLETED)
+            for future in done:
+                answered = running.pop(future)
+                try:
+                    response = future.result()
+                except requests.RequestException as e:
+                    errors.append(f"{answered}: {e}")
+                    continue
+                if response.status_code in HOST_FAILURE_STATUSES or response.status_code >= 500:
+                    errors.append(f"{answered}: Status {response.status_code} Body {response.text[:200]}")
+                    continue
+                # Slower duplicates finish in the background and still update the host stats
+                return answered, response
+            if time.time() >= deadline:
+                break
+            # Hedge when the current hosts are slow or have already failed
+            if not running or time.time() >= hedge_at:
+                for slow in running.values():
+                    self.stats[slow].record_pending(time.time() - started[slow])
+                host = next_host()
+                if host is None and not running:
+                    break
+        raise HostUnavailable('; '.join(errors) or 'Timed out waiting for hosts')
+
+    def status(self) -> List[Dict]:
+        return [
+            {
+                'host': s.host,
+                'state': s.breaker.state,
+                'latency_ms': round(s.latency * 1000, 1) if s.latency is not None else None,
+                'requests': s.requests,
+                'errors': s.errors,
+                'last_error': s.last_error,
+            }
+            for s in (self.stats[h] for h in self.ranked_hosts())
+        ]
@@ -1,8 +1,13 @@
+import functools
 import os
+import sys
+import time
+import click
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from flask import Flask, render_template, jsonify, request
+from typing import Dict, Mapping, Optional, Tuple
+from flask import Flask, Response, render_template, jsonify, request, stream_with_context
 # Removed heavy, unused imports to reduce deployment size
 # import plotly.graph_objs as go
 # from sklearn.ensemble import RandomForestClassifier
@@ -12,11 +17,27 @@ from flask import Flask, render_template, jsonify, request
 from config import *
 from models.trade import Trade
 from services.indicators import TechnicalIndicators, add_technical_indicators, prepare_features
+from services.streaming_indicators import get_indicator_engine
 from services.risk_management import calculate_position_size, validate_trade_conditions, can_trade_today
 from services.trading import TradingService
-from services.market_analysis import MarketAnalyzer
-from api.client import ExchangeClient, get_historical_data
+from services.trade_ledger import get_trade_ledger
+from services.portfolio_risk import PortfolioRiskManager
+from services.market_analysis import MarketAnalyzer, REGIMES, REGIME_REASONS
+from services.market_context import get_context_engine
+from services.strategy import predict_direction, entry_signal, stop_levels, add_strategy_indicators, market_context_series
+from api.client import ExchangeClient, get_default_client, get_historical_data
+from api.candle_store import CandleStore
 from services.news_analyzer import NewsAnalyzer
+from services.market_poller import MarketDataPoller
+from services.snapshot_stream import SnapshotStream
+from services.scanner import MarketScanner
+from services.chart_payload import CHART_LAYOUT, CandleTrace, chart_config, compact_payload, dumps, level_shapes
+from utils.shared_cache import get_shared_cache
+from utils.helpers import (
+    next_candle_close, timeframe_to_seconds, parse_fields, parse_time_cursor, project, select_fields, time_cursor
+)
+from utils.startup import free_port, import_profile, time_to_healthy
+from utils.http_cache import cached_response
 
 app = Flask(__name__)
 
@@ -25,19 +46,25 @@ import logging
 logging.basicConfig(level=logging.INFO)
 app.logger.setLevel(logging.INFO)
 
-# Initialize services
+# Initialize services (cheap: heavy providers load on first use)
 news_analyzer = NewsAnalyzer()
-trading_service = TradingService()
-exchange_client = ExchangeClient()
-market_analyzer = MarketAnalyzer()
+trading_service = TradingService(get_trade_ledger())
+portfolio_risk = PortfolioRiskManager(INITIAL_BALANCE)
+exchange_client = get_default_client()
+
+def preload_providers():
+    """Import the lazily loaded providers now instead of on first use"""
+    import yfinance  # noqa: F401
+    news_analyzer.backend
+
+if PRELOAD_PROVIDERS:
+    preload_providers()
 
 # Log environment info
 app.logger.info(f"Starting app with SYMBOL={SYMBOL}, TIMEFRAME={TIMEFRAME}")
 app.logger.info(f"API_BASE_URL={API_BASE_URL}")
 
 # Global variables
-daily_trades = 0
-last_trade_day = None
 current_balance = INITIAL_BALANCE
 
 @app.route('/')
@@ -50,520 +77,998 @@ def health():
     """Lightweight health check endpoint"""
     return jsonify({"status": "ok"}), 200
 
-@app.route('/api/data')
-def get_data():
-    """Get trading data and analysis"""
-    try:
-        app.logger.info('Fetching historical data...')
-        df = get_historical_data(SYMBOL, TIMEFRAME, 200)
-        
-        if df is None:
-            app.logger.error('get_historical_data() returned None')
-            return jsonify({'error': 'Failed to fetch data from exchange'}), 500
-            
-        if df.empty:
-            app.logger.error('Received empty DataFrame from get_historical_data()')
-            return jsonify({'error': 'No data available from exchange'}), 500
-            
-        app.logger.info(f'Successfully fetched {len(df)} rows of data')
-        
-        # Add technical indicators
-        df = add_technical_indicators(df)
-        if df is None or df.empty:
-            return jsonify({'error': 'Error processing indicators'}), 500
-            
-        # Asegurarse de que tenemos la columna volume_ratio
-        if 'volume_ma' not in df.columns:
-            df['volume_ma'] = df['volume'].rolling(window=20).mean()
-        df['volume_ratio'] = df['volume'] / df['volume_ma']
-        
-        # Get news sentiment analysis
-        news_analysis = news_analyzer.get_market_context(df, SYMBOL)
-        sentiment_score = news_analysis['sentiment_score']
-        
-        # Adjust sentiment based on crisis alerts
-        if news_analysis['crisis_alerts']:
-            sentiment_score -= 1.0
-            
-        # Get market context with sentiment
-        market_context = market_analyzer.get_market_context(df, sentiment_score)
-        
-        # Prepare ML features
-        features = prepare_features(df)
-        if features is None or features.empty:
-            return jsonify({'error': 'Error preparing features'}), 500
-        
-        # AI prediction
-        ai_prediction = 0  # Default
-        ai_prediction_data = None
-        
-        if len(features) >= 50:
-            # Use recent features for prediction
-            recent_features = features.tail(30)
-            
-            # Simple trend-based prediction for now
-            last_candle = df.iloc[-1]
-            
-            # Determine prediction based on technical indicators
-            is_golden_cross = last_candle['sma_20'] > last_candle['sma_50']
-            is_death_cross = last_candle['sma_20'] < last_candle['sma_50']
-            is_macd_bullish = last_candle['macd'] > last_candle['macd_signal']
-            is_macd_bearish = last_candle['macd'] < last_candle['macd_signal']
-            
-            if is_golden_cross and is_macd_bullish and last_candle['rsi'] < 70:
-                ai_prediction = 1
-            elif is_death_cross and is_macd_bearish and last_candle['rsi'] > 30:
-                ai_prediction = 0
-            
-            # Normalizar confianza a 0-100% basado en fuerza relativa del MACD
-            macd_value = abs(last_candle['macd'])
-            price = float(last_candle['close'])
-            
-            # Escalar MACD relativo al precio para obtener confianza significativa
-            relative_strength = (macd_value / price) * 1000  # Multiplicador para escalar
-            
-            # Limitar entre 30-95% para evitar valores extremos
-            normalized_confidence = min(max(relative_strength, 0.3), 0.95)
-            
-            ai_prediction_data = {
-                'direction': 'ALCISTA' if ai_prediction == 1 else 'BAJISTA',
-                'confidence': normalized_confidence,
-                'change': last_candle['macd']
-            }
-        
-        # Get current price
-        current_price = float(df.iloc[-1]['close']) if not df.empty else 0.0
-        
-        # Check daily trades
-        today = datetime.now().date()
-        global daily_trades, last_trade_day, current_balance
-        
-        if last_trade_day != today:
-            daily_trades = 0
-            last_trade_day = today
+class MarketDataError(Exception):
+    """Raised when the analysis pipeline cannot produce a dashboard payload"""
+
+
+def fetch_news_analysis(results: Optional[Mapping] = None) -> Dict:
+    """Fetch news sentiment for the dashboard symbol"""
+    return news_analyzer.get_market_context(None, SYMBOL)
+
+
+def load_market_frame(symbol: str = SYMBOL, timeframe: str = TIMEFRAME) -> pd.DataFrame:
+    """Dashboard candles of a symbol/timeframe with their technical indicators"""
+    app.logger.info('Fetching historical data...')
+    df = get_historical_data(symbol, timeframe, 200)
+    
+    if df is None:
+        app.logger.error('get_historical_data() returned None')
+        raise MarketDataError('Failed to fetch data from exchange')
         
-        # Check open positions
-        closed_trades, total_pnl = trading_service.check_open_positions(current_price, current_balance)
+    if df.empty:
+        app.logger.error('Received empty DataFrame from get_historical_data()')
+        raise MarketDataError('No data available from exchange')
         
-        # Generate signals based on market context
-        buy_signal = {'active': False, 'price': 0, 'rsi': 0, 'macd': 0, 'id': 0, 'time_iso': ''}
-        sell_signal = {'active': False, 'price': 0, 'rsi': 0, 'macd': 0, 'id': 0, 'time_iso': ''}
-        stop_loss_info = {'active': False, 'entry_price': 0, 'stop_loss': 0, 'take_profit': 0, 'is_buy': False, 'distance_percent': 0}
+    app.logger.info(f'Successfully fetched {len(df)} rows of data')
+    
+    # Add technical indicators (incremental: only new/forming candles are processed)
+    df = get_indicator_engine(symbol, timeframe).update_frame(df)
+    if df is None or df.empty:
+        raise MarketDataError('Error processing indicators')
         
-        # Trading logic
-        can_trade = market_context['can_trade'] and can_trade_today(daily_trades, MAX_DAILY_TRADES)
-        skip_reasons = market_context['blocked_reasons'].copy()
+    # Asegurarse de que tenemos la columna volume_ratio
+    if 'volume_ma' not in df.columns:
+        df['volume_ma'] = df['volume'].rolling(window=20).mean()
+    df['volume_ratio'] = df['volume'] / df['volume_ma']
+    return df
+
+
+def news_sentiment(news_analysis: Mapping) -> Tuple[float, float]:
+    """(current sentiment, sentiment for the market context: 1 lower on crisis alerts)"""
+    # The decayed aggregate is read now rather than frozen at the last news refresh
+    tracker = news_analysis.get('sentiment_tracker')
+    current_sentiment = float(tracker) if tracker is not None else news_analysis['sentiment_score']
+    sentiment_score = current_sentiment
+    
+    # Adjust sentiment based on crisis alerts
+    if news_analysis['crisis_alerts']:
+        sentiment_score -= 1.0
+    return current_sentiment, sentiment_score
+
+
+def news_summary(news_analysis: Mapping, limit: int = 3) -> Dict:
+    """News sentiment summary as shown on the dashboard"""
+    return {
+        'overall_sentiment': news_analysis['overall_sentiment'],
+        'crisis_alerts': len(news_analysis['crisis_alerts']),
+        'sentiment_score': news_sentiment(news_analysis)[0],
+        'crisis_impact': news_analysis['crisis_impact'],
+        'recent_news': news_analysis['news'][:limit] if news_analysis['news'] else []
+    }
+
+
+def position_info(pos: Trade, current_price: float) -> Dict:
+    """An open position marked at current_price"""
+    position_pnl = (current_price - pos.entry_price) * pos.size * (1 if pos.side == 'buy' else -1)
+    position_pnl_percent = ((current_price / pos.entry_price) - 1) * 100 * (1 if pos.side == 'buy' else -1)
+    return {
+        'symbol': pos.symbol,
+        'side': pos.side,
+        'entry_price': float(pos.entry_price),
+        'current_price': float(current_price),
+        'stop_loss': float(pos.stop_loss),
+        'take_profit': float(pos.take_profit),
+        'size': float(pos.size),
+        'pnl': float(position_pnl),
+        'pnl_percent': float(position_pnl_percent),
+        'risk_amount': float(pos.risk_amount),
+        'entry_time': pos.entry_time.isoformat(),
+        'status': pos.status
+    }
+
+
+def trade_info(t: Trade) -> Dict:
+    """A closed trade as listed in the trade history"""
+    return {
+        'id': t.id,
+        'symbol': t.symbol,
+        'side': t.side,
+        'entry_price': float(t.entry_price),
+        'exit_price': float(t.exit_price) if t.exit_price else None,
+        'size': float(t.size),
+        'pnl': float(t.pnl) if t.pnl else 0.0,
+        'pnl_percent': float(t.pnl_percent) if t.pnl_percent else 0.0,
+        'entry_time': t.entry_time.isoformat(),
+        'exit_time': t.exit_time.isoformat() if t.exit_time else None,
+        'status': t.status,
+        'duration': (t.exit_time - t.entry_time).total_seconds() / 60 if t.exit_time else None
+    }
+
+
+def trades_today() -> int:
+    """Trades opened today by every worker (counted in the shared trade ledger)"""
+    return trading_service.trades_opened_since(datetime.combine(datetime.now().date(), datetime.min.time()))
+
+
+def signal_key(df: pd.DataFrame, is_buy: bool) -> str:
+    """Identifies a signal across workers: each worker's poller evaluates the same candle"""
+    return f"{SYMBOL}:{TIMEFRAME}:{'buy' if is_buy else 'sell'}:{df.index[-1].isoformat()}"
+
+
+def build_dashboard_data(news_analysis: Optional[Dict] = None) -> Dict:
+    """Run the full analysis pipeline and return the /api/data payload"""
+    df = load_market_frame()
+    
+    # News sentiment comes from its own (slower) refresh cycle when available
+    if news_analysis is None:
+        news_analysis = fetch_news_analysis()
+    sentiment_score = news_sentiment(news_analysis)[1]
         
-        if not can_trade_today(daily_trades, MAX_DAILY_TRADES):
-            skip_reasons.append("Límite diario de operaciones alcanzado")
+    # Get market context with sentiment
+    market_context = get_context_engine(SYMBOL, TIMEFRAME).get_market_context(df, sentiment_score)
+    
+    # Prepare ML features
+    features = prepare_features(df)
+    if features is None or features.empty:
+        raise MarketDataError('Error preparing features')
+    
+    # AI prediction
+    ai_prediction = 0  # Default
+    ai_prediction_data = None
+    
+    if len(features) >= 50:
+        # Use recent features for prediction
+        recent_features = features.tail(30)
         
-        # Technical indicators
+        # Simple trend-based prediction for now
         last_candle = df.iloc[-1]
-        current_rsi = last_candle['rsi']
-        current_macd = last_candle['macd']
-        current_macd_signal = last_candle['macd_signal']
-        current_adx = last_candle['adx']
-        current_atr = last_candle['atr']
-        
-        # Signal conditions
-        is_golden_cross = last_candle['sma_20'] > last_candle['sma_50']
-        is_death_cross = last_candle['sma_20'] < last_candle['sma_50']
-        is_macd_bullish = current_macd > current_macd_signal
-        is_macd_bearish = current_macd < current_macd_signal
         
-        # Generate signals
-        if can_trade:
-            # Buy signal
-            if is_golden_cross and is_macd_bullish and ai_prediction == 1:
-                entry_price = current_price
-                stop_loss = entry_price - (current_atr * ATR_MULTIPLIER)
-                take_profit = entry_price + (current_atr * ATR_MULTIPLIER * MIN_RISK_REWARD)
-                
-                if validate_trade_conditions(df, is_buy=True):
-                    trade = trading_service.execute_trade(
-                        SYMBOL, True, entry_price, stop_loss, take_profit,
-                        current_balance=current_balance
-                    )
-                    if trade:
-                        buy_signal.update({
-                            'active': True,
-                            'price': round(float(entry_price), 4),
-                            'rsi': round(float(current_rsi), 2),
-                            'macd': round(float(current_macd), 6),
-                            'id': int(datetime.now().timestamp() * 1000),
-                            'time_iso': datetime.now().isoformat()
-                        })
-                        
-                        stop_loss_info.update({
-                            'active': True,
-                            'entry_price': round(float(entry_price), 4),
-                            'stop_loss': round(float(stop_loss), 4),
-                            'take_profit': round(float(take_profit), 4),
-                            'is_buy': True,
-                            'distance_percent': round(abs((entry_price - stop_loss) / entry_price * 100), 2)
-                        })
-                        daily_trades += 1
-            
-            # Sell signal
-            if is_death_cross and is_macd_bearish and ai_prediction == 0:
-                entry_price = current_price
-                stop_loss = entry_price + (current_atr * ATR_MULTIPLIER)
-                take_profit = entry_price - (current_atr * ATR_MULTIPLIER * MIN_RISK_REWARD)
-                
-                if validate_trade_conditions(df, is_buy=False):
-                    trade = trading_service.execute_trade(
-                        SYMBOL, False, entry_price, stop_loss, take_profit,
-                        current_balance=current_balance
-                    )
-                    if trade:
-                        sell_signal.update({
-                            'active': True,
-                            'price': round(float(entry_price), 4),
-                            'rsi': round(float(current_rsi), 2),
-                            'macd': round(float(current_macd), 6),
-                            'id': int(datetime.now().timestamp() * 1000),
-                            'time_iso': datetime.now().isoformat()
-                        })
-                        
-                        stop_loss_info.update({
-                            'active': True,
-                            'entry_price': round(float(entry_price), 4),
-                            'stop_loss': round(float(stop_loss), 4),
-                            'take_profit': round(float(take_profit), 4),
-                            'is_buy': False,
-                            'distance_percent': round(abs((entry_price - stop_loss) / entry_price * 100), 2)
-                        })
-                        daily_trades += 1
-        
-        # Prepare chart data
-        x_axis = df.index.to_series().dt.strftime('%Y-%m-%d %H:%M:%S').tolist()
+        # Determine prediction based on technical indicators
+        ai_prediction = predict_direction(last_candle)
         
-        # Create candlestick trace
-        trace_candlestick = {
-            'type': 'candlestick',
-            'x': x_axis,
-            'open': df['open'].fillna(0).astype(float).round(8).tolist(),
-            'high': df['high'].fillna(0).astype(float).round(8).tolist(),
-            'low': df['low'].fillna(0).astype(float).round(8).tolist(),
-            'close': df['close'].fillna(0).astype(float).round(8).tolist(),
-            'name': 'Precio',
-            'yaxis': 'y2',
-            'increasing': {'line': {'color': '#00C853'}},
-            'decreasing': {'line': {'color': '#FF3D00'}}
-        }
-        
-        # Add SL/TP lines if active
-        data = [trace_candlestick]
-        if stop_loss_info['active']:
-            data.extend([
-                {
-                    'x': x_axis,
-                    'y': [stop_loss_info['stop_loss']] * len(x_axis),
-                    'type': 'scatter',
-                    'mode': 'lines',
-                    'line': {'color': 'rgba(255, 0, 0, 0.7)', 'width': 2, 'dash': 'dash'},
-                    'name': 'Stop Loss',
-                    'yaxis': 'y2'
-                },
-                {
-                    'x': x_axis,
-                    'y': [stop_loss_info['take_profit']] * len(x_axis),
-                    'type': 'scatter',
-                    'mode': 'lines',
-                    'line': {'color': 'rgba(0, 200, 0, 0.7)', 'width': 2, 'dash': 'dash'},
-                    'name': 'Take Profit',
-                    'yaxis': 'y2'
-                },
-                {
-                    'x': x_axis,
-                    'y': [stop_loss_info['entry_price']] * len(x_axis),
-                    'type': 'scatter',
-                    'mode': 'lines',
-                    'line': {'color': 'rgba(255, 165, 0, 0.7)', 'width': 2, 'dash': 'solid'},
-                    'name': 'Precio de Entrada',
-                    'yaxis': 'y2'
-                }
-            ])
+        # Normalizar confianza a 0-100% basado en fuerza relativa del MACD
+        macd_value = abs(last_candle['macd'])
+        price = float(last_candle['close'])
         
-        # Determine signal text
-        if buy_signal['active'] and sell_signal['active']:
-            signal_text = "AMBAS SEÑALES"
-        elif buy_signal['active']:
-            signal_text = "COMPRA ACTIVA"
-        elif sell_signal['active']:
-            signal_text = "VENTA ACTIVA"
-        else:
-            signal_text = "SIN SEÑALES"
+        # Escalar MACD relativo al precio para obtener confianza significativa
+        relative_strength = (macd_value / price) * 1000  # Multiplicador para escalar
         
-        # Calculate account metrics
-        open_positions = trading_service.get_open_positions()
-        total_pnl = trading_service.get_total_pnl()
+        # Limitar entre 30-95% para evitar valores extremos
+        normalized_confidence = min(max(relative_strength, 0.3), 0.95)
         
-        open_positions_info = []
-        for pos_id, pos in open_positions.items():
-            position_pnl = (current_price - pos.entry_price) * pos.size * (1 if pos.side == 'buy' else -1)
-            position_pnl_percent = ((current_price / pos.entry_price) - 1) * 100 * (1 if pos.side == 'buy' else -1)
+        ai_prediction_data = {
+            'direction': 'ALCISTA' if ai_prediction == 1 else 'BAJISTA',
+            'confidence': normalized_confidence,
+            'change': last_candle['macd']
+        }
+    
+    # Get current price
+    current_price = float(df.iloc[-1]['close']) if not df.empty else 0.0
+    
+    # Check daily trades (opened by any worker)
+    daily_trades = trades_today()
+    
+    # Check open positions
+    closed_trades, total_pnl = trading_service.check_open_positions(current_price, current_balance)
+    
+    # Generate signals based on market context
+    buy_signal = {'active': False, 'price': 0, 'rsi': 0, 'macd': 0, 'id': 0, 'time_iso': ''}
+    sell_signal = {'active': False, 'price': 0, 'rsi': 0, 'macd': 0, 'id': 0, 'time_iso': ''}
+    stop_loss_info = {'active': False, 'entry_price': 0, 'stop_loss': 0, 'take_profit': 0, 'is_buy': False, 'distance_percent': 0}
+    
+    # Trading logic
+    can_trade = market_context['can_trade'] and can_trade_today(daily_trades, MAX_DAILY_TRADES)
+    skip_reasons = market_context['blocked_reasons'].copy()
+    
+    if not can_trade_today(daily_trades, MAX_DAILY_TRADES):
+        skip_reasons.append("Límite diario de operaciones alcanzado")
+    
+    # Portfolio risk: the scanner feeds every symbol's candles when it scans TIMEFRAME
+    if not (SCANNER_ENABLED and TIMEFRAME in SCANNER_TIMEFRAMES):
+        portfolio_risk.observe(df[['close']].rename(columns={'close': SYMBOL}))
+    portfolio_risk.update_balance(current_balance)
+    portfolio_risk.set_positions(trading_service.get_open_positions().values(), {SYMBOL: current_price})
+    
+    # Technical indicators
+    last_candle = df.iloc[-1]
+    current_rsi = last_candle['rsi']
+    current_macd = last_candle['macd']
+    current_macd_signal = last_candle['macd_signal']
+    current_adx = last_candle['adx']
+    current_atr = last_candle['atr']
+    
+    # Signal conditions (shared with the backtester, see services/strategy.py)
+    signal = entry_signal(last_candle, ai_prediction)
+    
+    # Generate signals
+    if can_trade:
+        # Buy signal
+        if signal is True:
+            entry_price = current_price
+            stop_loss, take_profit = stop_levels(entry_price, current_atr, is_buy=True)
             
-            open_positions_info.append({
-                'symbol': pos.symbol,
-                'side': pos.side,
-                'entry_price': float(pos.entry_price),
-                'current_price': float(current_price),
-                'stop_loss': float(pos.stop_loss),
-                'take_profit': float(pos.take_profit),
-                'size': float(pos.size),
-                'pnl': float(position_pnl),
-                'pnl_percent': float(position_pnl_percent),
-                'risk_amount': float(pos.risk_amount),
-                'entry_time': pos.entry_time.isoformat(),
-                'status': pos.status
-            })
-        
-        # Calculate performance metrics
-        trade_history = trading_service.get_trade_history()
-        winning_trades = [t for t in trade_history if t.pnl and t.pnl > 0]
-        losing_trades = [t for t in trade_history if t.pnl and t.pnl <= 0]
-        win_rate = (len(winning_trades) / len(trade_history) * 100) if trade_history else 0
-        
-        total_profit = sum(t.pnl for t in winning_trades if t.pnl) if winning_trades else 0
-        total_loss = abs(sum(t.pnl for t in losing_trades if t.pnl)) if losing_trades else 0
-        profit_factor = (total_profit / total_loss) if total_loss > 0 else 0
-        
-        # Calculate risk metrics
-        current_risk = RISK_PER_TRADE * 100
-        risk_reward_ratio = MIN_RISK_REWARD
+            risk = portfolio_risk.evaluate(SYMBOL, True, entry_price, stop_loss)
+            if risk['size'] <= 0:
+                skip_reasons.append("Límite de riesgo de cartera alcanzado")
+            elif validate_trade_conditions(df, is_buy=True):
+                trade = trading_service.execute_trade(
+                    SYMBOL, True, entry_price, stop_loss, take_profit, size=risk['size'],
+                    current_balance=current_balance, signal_key=signal_key(df, is_buy=True)
+                )
+                if trade:
+                    buy_signal.update({
+                        'active': True,
+                        'price': round(float(entry_price), 4),
+                        'rsi': round(float(current_rsi), 2),
+                        'macd': round(float(current_macd), 6),
+                        'id': int(datetime.now().timestamp() * 1000),
+                        'time_iso': datetime.now().isoformat()
+                    })
+                    
+                    stop_loss_info.update({
+                        'active': True,
+                        'entry_price': round(float(entry_price), 4),
+                        'stop_loss': round(float(stop_loss), 4),
+                        'take_profit': round(float(take_profit), 4),
+                        'is_buy': True,
+                        'distance_percent': round(abs((entry_price - stop_loss) / entry_price * 100), 2)
+                    })
+                    daily_trades += 1
         
-        if last_candle is not None and 'atr' in last_candle and 'close' in last_candle:
-            try:
-                position_size = calculate_position_size(
-                    current_price, 
-                    current_price - (current_atr * ATR_MULTIPLIER),
-                    current_balance * RISK_PER_TRADE
+        # Sell signal
+        if signal is False:
+            entry_price = current_price
+            stop_loss, take_profit = stop_levels(entry_price, current_atr, is_buy=False)
+            
+            risk = portfolio_risk.evaluate(SYMBOL, False, entry_price, stop_loss)
+            if risk['size'] <= 0:
+                skip_reasons.append("Límite de riesgo de cartera alcanzado")
+            elif validate_trade_conditions(df, is_buy=False):
+                trade = trading_service.execute_trade(
+                    SYMBOL, False, entry_price, stop_loss, take_profit, size=risk['size'],
+                    current_balance=current_balance, signal_key=signal_key(df, is_buy=False)
                 )
-            except Exception:
-                position_size = 0.0
-        else:
+                if trade:
+                    sell_signal.update({
+                        'active': True,
+                        'price': round(float(entry_price), 4),
+                        'rsi': round(float(current_rsi), 2),
+                        'macd': round(float(current_macd), 6),
+                        'id': int(datetime.now().timestamp() * 1000),
+                        'time_iso': datetime.now().isoformat()
+                    })
+                    
+                    stop_loss_info.update({
+                        'active': True,
+                        'entry_price': round(float(entry_price), 4),
+                        'stop_loss': round(float(stop_loss), 4),
+                        'take_profit': round(float(take_profit), 4),
+                        'is_buy': False,
+                        'distance_percent': round(abs((entry_price - stop_loss) / entry_price * 100), 2)
+                    })
+                    daily_trades += 1
+    
+    # Create candlestick trace
+    data = [CandleTrace(df)]
+    
+    # Determine signal text
+    if buy_signal['active'] and sell_signal['active']:
+        signal_text = "AMBAS SEÑALES"
+    elif buy_signal['active']:
+        signal_text = "COMPRA ACTIVA"
+    elif sell_signal['active']:
+        signal_text = "VENTA ACTIVA"
+    else:
+        signal_text = "SIN SEÑALES"
+    
+    # Calculate account metrics
+    open_positions = trading_service.get_open_positions()
+    total_pnl = trading_service.get_total_pnl()
+    
+    open_positions_info = [position_info(pos, current_price) for pos in open_positions.values()]
+    
+    # Calculate performance metrics (running totals, O(1) per request)
+    performance = trading_service.get_performance()
+    win_rate = performance['win_rate']
+    
+    # Calculate risk metrics
+    current_risk = RISK_PER_TRADE * 100
+    risk_reward_ratio = MIN_RISK_REWARD
+    
+    if last_candle is not None and 'atr' in last_candle and 'close' in last_candle:
+        try:
+            position_size = calculate_position_size(
+                current_price, 
+                current_price - (current_atr * ATR_MULTIPLIER),
+                current_balance * RISK_PER_TRADE
+            )
+        except Exception:
             position_size = 0.0
-        
-        # Calculate signal score based on technical indicators
-        score = 0.0
-        if current_rsi:
-            if current_rsi < 30:
-                score += 0.3  # Oversold for buy
-            elif current_rsi > 70:
-                score -= 0.3  # Overbought for sell
-        
-        if current_macd and current_macd_signal:
-            if current_macd > current_macd_signal:
-                score += 0.2  # MACD bullish
-            else:
-                score -= 0.2  # MACD bearish
-        
-        if last_candle['sma_20'] and last_candle['sma_50']:
-            if last_candle['sma_20'] > last_candle['sma_50']:
-                score += 0.2  # Golden cross
-            else:
-                score -= 0.2  # Death cross
-        
-        if current_adx and current_adx > 25:
-            score += 0.1  # Strong trend
-        
-        if ai_prediction == 1:
-            score += 0.2  # AI bullish
-        elif ai_prediction == 0:
-            score -= 0.2  # AI bearish
-
-        # Prepare response
-        response_data = {
-            'indicators': {
-                'adx': float(current_adx),
-                'rsi': float(current_rsi),
-                'macd': float(current_macd),
-                'macd_signal': float(current_macd_signal),
-                'sma_20': float(last_candle['sma_20']),
-                'sma_50': float(last_candle['sma_50']),
-                'atr': float(current_atr),
-                'trend_strength': market_context['trend']['direction'],
-                'ai_prediction': {
-                    'prediction': 'ALCISTA' if ai_prediction == 1 else 'BAJISTA',
-                    'confidence': ai_prediction_data['confidence'] if ai_prediction_data else 0,
-                    'accuracy': trading_service.get_win_rate() / 100,
-                    'success_rate': trading_service.get_win_rate() / 100
-                },
-                'risk_management': {
-                    'risk_reward_ratio': float(risk_reward_ratio),
-                    'position_size': float(position_size),
-                    'trade_risk': float(current_risk)
-                },
-                'volume_analysis': {
-                    'ratio': float(last_candle.get('volume_ratio', 1.0)),
-                    'alert': False,
-                    'current_volume': float(last_candle.get('volume', 0)),
-                    'average_volume': float(last_candle.get('volume_ma', 0)),
-                    'percentile': float(np.mean(df['volume_ratio'].iloc[-50:] <= last_candle.get('volume_ratio', 1.0))),
-                    'momentum': float((last_candle.get('volume_ratio', 1.0) / df['volume_ratio'].iloc[-2] - 1) * 100) if len(df) > 1 else 0.0
-                },
-                'volume_ratio': float(last_candle.get('volume_ratio', 1.0)),
-                'score': float(score),
-                'adx': float(current_adx),
-                'rsi': float(current_rsi),
-                'macd': float(current_macd),
-                'macd_signal': float(current_macd_signal),
-                'sma_20': float(last_candle['sma_20']),
-                'sma_50': float(last_candle['sma_50']),
-                'atr': float(current_atr),
-                'trend_strength': market_context['trend']['direction'],
-                'balance': float(current_balance),
-                'daily_trades': daily_trades,
-                'max_daily_trades': MAX_DAILY_TRADES
+    else:
+        position_size = 0.0
+    
+    # Calculate signal score based on technical indicators
+    score = 0.0
+    if current_rsi:
+        if current_rsi < 30:
+            score += 0.3  # Oversold for buy
+        elif current_rsi > 70:
+            score -= 0.3  # Overbought for sell
+    
+    if current_macd and current_macd_signal:
+        if current_macd > current_macd_signal:
+            score += 0.2  # MACD bullish
+        else:
+            score -= 0.2  # MACD bearish
+    
+    if last_candle['sma_20'] and last_candle['sma_50']:
+        if last_candle['sma_20'] > last_candle['sma_50']:
+            score += 0.2  # Golden cross
+        else:
+            score -= 0.2  # Death cross
+    
+    if current_adx and current_adx > 25:
+        score += 0.1  # Strong trend
+    
+    if ai_prediction == 1:
+        score += 0.2  # AI bullish
+    elif ai_prediction == 0:
+        score -= 0.2  # AI bearish
+
+    # Prepare response
+    response_data = {
+        'indicators': {
+            'adx': float(current_adx),
+            'rsi': float(current_rsi),
+            'macd': float(current_macd),
+            'macd_signal': float(current_macd_signal),
+            'sma_20': float(last_candle['sma_20']),
+            'sma_50': float(last_candle['sma_50']),
+            'atr': float(current_atr),
+            'trend_strength': market_context['trend']['direction'],
+            'ai_prediction': {
+                'prediction': 'ALCISTA' if ai_prediction == 1 else 'BAJISTA',
+                'confidence': ai_prediction_data['confidence'] if ai_prediction_data else 0,
+                'accuracy': win_rate / 100,
+                'success_rate': win_rate / 100
             },
-            'market_context': market_context,
-            'news_analysis': {
-                'overall_sentiment': news_analysis['overall_sentiment'],
-                'crisis_alerts': len(news_analysis['crisis_alerts']),
-                'sentiment_score': news_analysis['sentiment_score'],
-                'crisis_impact': news_analysis['crisis_impact'],
-                'recent_news': news_analysis['news'][:3] if news_analysis['news'] else []
+            'risk_management': {
+                'risk_reward_ratio': float(risk_reward_ratio),
+                'position_size': float(position_size),
+                'trade_risk': float(current_risk)
             },
-            'graph': {
-                'data': data,
-                'layout': {
-                    'template': 'plotly_dark',
-                    'title': {
-                        'text': f"{SYMBOL} - Análisis en Tiempo Real<br><sub>Señal actual: {signal_text}</sub>",
-                        'x': 0.5,
-                        'xanchor': 'center',
-                        'font': {'color': '#e0e0e0'}
-                    },
-                    'font': {'size': 16, 'color': '#e0e0e0', 'family': 'Arial'},
-                    'plot_bgcolor': '#121212',
-                    'paper_bgcolor': '#1e1e1e',
-                    'xaxis': {
-                        'title': {'text': '<b>Fecha</b>', 'font': {'color': '#e0e0e0'}},
-                        'rangeslider': {
-                            'visible': True,
-                            'thickness': 0.1,
-                            'bgcolor': 'rgba(0,0,0,0.3)',
-                            'bordercolor': 'rgba(255, 255, 255, 0.1)'
-                        },
-                        'type': 'date',
-                        'gridcolor': 'rgba(255, 255, 255, 0.1)',
-                        'showline': True,
-                        'linecolor': 'rgba(255, 255, 255, 0.3)',
-                        'mirror': True,
-                        'tickfont': {'color': '#a0a0a0'},
-                        'zerolinecolor': 'rgba(255, 255, 255, 0.1)'
-                    },
-                    'yaxis': {
-                        'title': {'text': '<b>Precio (USDT)</b>', 'font': {'color': '#e0a0a0'}},
-                        'gridcolor': 'rgba(255, 255, 255, 0.08)',
-                        'showline': True,
-                        'linecolor': 'rgba(255, 255, 255, 0.2)',
-                        'mirror': True,
-                        'tickfont': {'color': '#a0a0a0'}
-                    },
-                    'showlegend': True,
-                    'legend': {
-                        'orientation': 'h',
-                        'yanchor': 'bottom',
-                        'y': 1.02,
-                        'xanchor': 'right',
-                        'x': 1,
-                        'bgcolor': 'rgba(0,0,0,0.7)',
-                        'font': {'color': 'white'}
-                    },
-                    'template': 'plotly_dark',
-                    'plot_bgcolor': 'rgba(0,0,0,0.3)',
-                    'paper_bgcolor': 'rgba(0,0,0,0.5)',
-                    'height': 700,
-                    'margin': {'l': 60, 'r': 30, 't': 100, 'b': 60},
-                    'hovermode': 'x unified',
-                    'hoverlabel': {
-                        'bgcolor': 'rgba(0,0,0,0.9)',
-                        'font_size': 12,
-                        'font_color': 'white'
-                    }
-                }
+            'volume_analysis': {
+                'ratio': float(last_candle.get('volume_ratio', 1.0)),
+                'alert': False,
+                'current_volume': float(last_candle.get('volume', 0)),
+                'average_volume': float(last_candle.get('volume_ma', 0)),
+                'percentile': float(np.mean(df['volume_ratio'].iloc[-50:] <= last_candle.get('volume_ratio', 1.0))),
+                'momentum': float((last_candle.get('volume_ratio', 1.0) / df['volume_ratio'].iloc[-2] - 1) * 100) if len(df) > 1 else 0.0
             },
-            'signal': signal_text,
-            'buy_signal': buy_signal,
-            'sell_signal': sell_signal,
-            'last_price': float(current_price),
+            'volume_ratio': float(last_candle.get('volume_ratio', 1.0)),
+            'score': float(score),
+            'adx': float(current_adx),
             'rsi': float(current_rsi),
             'macd': float(current_macd),
             'macd_signal': float(current_macd_signal),
             'sma_20': float(last_candle['sma_20']),
             'sma_50': float(last_candle['sma_50']),
-            'bb_upper': float(last_candle.get('bb_upper', 0)),
-            'bb_lower': float(last_candle.get('bb_lower', 0)),
-            'adx': float(current_adx),
             'atr': float(current_atr),
-            'ai_prediction': int(ai_prediction),
-            'trend_status': market_context['trend']['direction'],
-            'account_info': {
-                'balance': float(current_balance),
-                'equity': float(current_balance + total_pnl),
-                'used_margin': sum(float(pos['size'] * pos['entry_price'] * 0.1) for pos in open_positions_info),
-                'free_margin': float((current_balance + total_pnl) - sum(pos['size'] * pos['entry_price'] * 0.1 for pos in open_positions_info)),
-                'margin_level': float(((current_balance + total_pnl) / sum(pos['size'] * pos['entry_price'] * 0.1 for pos in open_positions_info) * 100)) if open_positions_info else 0.0,
-                'daily_trades': daily_trades,
-                'max_daily_trades': MAX_DAILY_TRADES,
-                'total_pnl': float(total_pnl),
-                'win_rate': float(trading_service.get_win_rate())
-            },
-            'trading_info': {
-                'open_positions': open_positions_info,
-                'recent_trades': [{
-                    'id': t.id,
-                    'symbol': t.symbol,
-                    'side': t.side,
-                    'entry_price': float(t.entry_price),
-                    'exit_price': float(t.exit_price) if t.exit_price else None,
-                    'size': float(t.size),
-                    'pnl': float(t.pnl) if t.pnl else 0.0,
-                    'pnl_percent': float(t.pnl_percent) if t.pnl_percent else 0.0,
-                    'entry_time': t.entry_time.isoformat(),
-                    'exit_time': t.exit_time.isoformat() if t.exit_time else None,
-                    'status': t.status,
-                    'duration': (t.exit_time - t.entry_time).total_seconds() / 60 if t.exit_time else None
-                } for t in trading_service.get_trade_history()[-5:]]
+            'trend_strength': market_context['trend']['direction'],
+            'balance': float(current_balance),
+            'daily_trades': daily_trades,
+            'max_daily_trades': MAX_DAILY_TRADES
+        },
+        'market_context': market_context,
+        'news_analysis': news_summary(news_analysis),
+        'graph': {
+            'data': data,
+            'layout': {
+                **CHART_LAYOUT,
+                # SL/TP lines as shapes: a few scalars instead of full-length traces in every update
+                'shapes': level_shapes(stop_loss_info),
+                'title': {
+                    'text': f"{SYMBOL} - Análisis en Tiempo Real<br><sub>Señal actual: {signal_text}</sub>",
+                    'x': 0.5,
+                    'xanchor': 'center',
+                    'font': {'color': '#e0e0e0'}
+                }
             }
+        },
+        'signal': signal_text,
+        'buy_signal': buy_signal,
+        'sell_signal': sell_signal,
+        'last_price': float(current_price),
+        'rsi': float(current_rsi),
+        'macd': float(current_macd),
+        'macd_signal': float(current_macd_signal),
+        'sma_20': float(last_candle['sma_20']),
+        'sma_50': float(last_candle['sma_50']),
+        'bb_upper': float(last_candle.get('bb_upper', 0)),
+        'bb_lower': float(last_candle.get('bb_lower', 0)),
+        'adx': float(current_adx),
+        'atr': float(current_atr),
+        'ai_prediction': int(ai_prediction),
+        'trend_status': market_context['trend']['direction'],
+        'account_info': {
+            'balance': float(current_balance),
+            'equity': float(current_balance + total_pnl),
+            'used_margin': sum(float(pos['size'] * pos['entry_price'] * 0.1) for pos in open_positions_info),
+            'free_margin': float((current_balance + total_pnl) - sum(pos['size'] * pos['entry_price'] * 0.1 for pos in open_positions_info)),
+            'margin_level': float(((current_balance + total_pnl) / sum(pos['size'] * pos['entry_price'] * 0.1 for pos in open_positions_info) * 100)) if open_positions_info else 0.0,
+            'daily_trades': daily_trades,
+            'max_daily_trades': MAX_DAILY_TRADES,
+            'total_pnl': float(total_pnl),
+            'win_rate': float(win_rate),
+            'performance': performance
+        },
+        'trading_info': {
+            'open_positions': open_positions_info,
+            'recent_trades': [trade_info(t) for t in trading_service.get_trade_history(5)]
         }
-        
-        response_data['stop_loss_info'] = stop_loss_info
-        
-        return jsonify(response_data)
-        
+    }
+    
+    response_data['stop_loss_info'] = stop_loss_info
+    
+    return response_data
+    
+
+
+def error_payload(message: str) -> Dict:
+    """Empty dashboard payload carrying an error message"""
+    return {
+        'error': message,
+        'graph': {'data': [], 'layout': {}},
+        'buy_signal': {'active': False, 'price': 0, 'rsi': 0, 'macd': 0, 'id': 0, 'time_iso': ''},
+        'sell_signal': {'active': False, 'price': 0, 'rsi': 0, 'macd': 0, 'id': 0, 'time_iso': ''},
+        'stop_loss_info': {'active': False, 'entry_price': 0, 'stop_loss': 0, 'take_profit': 0, 'is_buy': False, 'distance_percent': 0},
+        'last_price': 0,
+        'rsi': 0,
+        'macd': 0,
+        'macd_signal': 0,
+        'sma_20': 0,
+        'sma_50': 0,
+        'bb_upper': 0,
+        'bb_lower': 0
+    }
+
+
+# Background refresh: news and market analysis run on their own cadences and
+# /api/data only serves the latest precomputed snapshot
+market_poller = MarketDataPoller(TIMEFRAME, serialize=app.json.dumps)
+market_poller.add_task('news', fetch_news_analysis, interval=NEWS_UPDATE_INTERVAL, triggers=('market',))
+market_poller.add_task(
+    'market', lambda results: build_dashboard_data(results.get('news')),
+    interval=UPDATE_INTERVAL, align_to_candle=True, publish=True
+)
+market_scanner = MarketScanner(
+    exchange_client, SCANNER_TIMEFRAMES, SCANNER_SYMBOLS, universe_size=SCANNER_UNIVERSE_SIZE,
+    quote_asset=SCANNER_QUOTE_ASSET, max_concurrency=SCANNER_MAX_CONCURRENCY,
+    risk_manager=portfolio_risk, risk_timeframe=TIMEFRAME,
+    positions=lambda: trading_service.get_open_positions().values()
+)
+
+
+def run_market_scan(results: Optional[Mapping] = None) -> Dict:
+    """Scan the symbol universe once per cycle across all workers"""
+    cache = get_shared_cache()
+    if cache is None:
+        return market_scanner.scan()
+    expires_at = lambda: min([time.time() + SCANNER_INTERVAL] + [next_candle_close(tf) for tf in SCANNER_TIMEFRAMES])
+    return cache.get_or_compute('scanner:results', market_scanner.scan, expires_at=expires_at)
+
+
+if SCANNER_ENABLED:
+    market_poller.add_task('scan', run_market_scan, interval=SCANNER_INTERVAL, align_to_candle=True)
+snapshot_stream = SnapshotStream(
+    market_poller, serialize=app.json.dumps, heartbeat=STREAM_HEARTBEAT,
+    max_duration=STREAM_MAX_DURATION, retry_ms=STREAM_RETRY_MS
+)
+
+
+def encode_compact(payload: Mapping) -> bytes:
+    return dumps(compact_payload(payload))
+
+
+def json_response(payload) -> Response:
+    """JSON response with an ETag and compression (see utils.http_cache)"""
+    return cached_response(app.json.dumps(payload).encode('utf-8'))
+
+
+@app.route('/api/data')
+def get_data():
+    """Get trading data and analysis (?format=compact: binary candle columns, see /api/chart-config)"""
+    try:
+        compact = request.args.get('format') == 'compact'
+        if not BACKGROUND_POLLER_ENABLED:
+            payload = build_dashboard_data()
+            return cached_response(encode_compact(payload)) if compact else json_response(payload)
+
+        snapshot = market_poller.ensure_started().wait_for_snapshot(SNAPSHOT_WAIT_TIMEOUT)
+        if snapshot is None:
+            return jsonify(error_payload('Datos de mercado aún no disponibles, reintentando...')), 503
+        # ETag and compressed bodies are computed once per snapshot and representation
+        variant = 'compact' if compact else 'full'
+        body = snapshot.encode('compact', encode_compact) if compact else snapshot.body
+        return cached_response(body, memo=lambda name, compute: snapshot.encode(f'{variant}:{name}', lambda _: compute()))
+
+    except MarketDataError as e:
+        app.logger.error(str(e))
+        return jsonify({'error': str(e)}), 500
     except Exception as e:
         import traceback
         print("Error in get_data:")
         print(str(e))
         print(traceback.format_exc())
-        return jsonify({
-            'error': f'Error interno del servidor: {str(e)}',
-            'graph': {'data': [], 'layout': {}},
-            'buy_signal': {'active': False, 'price': 0, 'rsi': 0, 'macd': 0, 'id': 0, 'time_iso': ''},
-            'sell_signal': {'active': False, 'price': 0, 'rsi': 0, 'macd': 0, 'id': 0, 'time_iso': ''},
-            'stop_loss_info': {'active': False, 'entry_price': 0, 'stop_loss': 0, 'take_profit': 0, 'is_buy': False, 'distance_percent': 0},
-            'last_price': 0,
-            'rsi': 0,
-            'macd': 0,
-            'macd_signal': 0,
-            'sma_20': 0,
-            'sma_50': 0,
-            'bb_upper': 0,
-            'bb_lower': 0
-        }), 500
+        return jsonify(error_payload(f'Error interno del servidor: {str(e)}')), 500
+
+@app.route('/api/chart-config')
+def get_chart_config():
+    """Static chart layout and trace styles for the compact /api/data payload"""
+    response = jsonify(chart_config())
+    response.cache_control.public = True
+    response.cache_control.max_age = 3600
+    return response
+
+@app.route('/api/stream')
+def stream_data():
+    """Push snapshot deltas to the dashboard as server-sent events"""
+    if not (STREAM_ENABLED and BACKGROUND_POLLER_ENABLED):
+        return jsonify({'error': 'Streaming disabled'}), 404
+    market_poller.ensure_started()
+    last_event_id = request.headers.get('Last-Event-ID')
+    return Response(
+        stream_with_context(snapshot_stream.events(last_event_id)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/scan')
+def get_scan():
+    """Multi-symbol scan ranked by signal, tradability and trend strength"""
+    if not SCANNER_ENABLED:
+        return jsonify({'error': 'Scanner disabled'}), 404
+    if BACKGROUND_POLLER_ENABLED:
+        scan = market_poller.ensure_started().results.get('scan')
+        if scan is None:
+            return jsonify({'error': 'Escaneo en curso, reintentando...'}), 503
+    else:
+        scan = run_market_scan()
+
+    results = scan['results']
+    timeframe = request.args.get('timeframe')
+    if timeframe:
+        results = [r for r in results if r['timeframe'] == timeframe]
+    signal = request.args.get('signal')
+    if signal == 'any':
+        results = [r for r in results if r['signal']]
+    elif signal:
+        results = [r for r in results if r['signal'] == signal]
+    limit = request.args.get('limit', type=int)
+    if limit:
+        results = results[:limit]
+    return json_response({**scan, 'results': results})
+
+
+def build_regime_history(symbol: str, timeframe: str, bars: int, sentiment: float) -> Dict:
+    """Regime bands and per-candle regimes over the newest `bars` candles"""
+    df = get_historical_data(symbol, timeframe, bars)
+    if df is None or df.empty:
+        raise MarketDataError(f'No data available for {symbol} {timeframe}')
+    df = add_strategy_indicators(df[['open', 'high', 'low', 'close', 'volume']].astype(float))
+    context = market_context_series(df, sentiment_score=sentiment)
+    time_format = lambda t: t.strftime('%Y-%m-%d %H:%M:%S')  # same as the chart's x axis
+    bands = MarketAnalyzer.regime_bands(context)
+    for band in bands:
+        band['start'], band['end'] = time_format(band['start']), time_format(band['end'])
+    return {
+        'symbol': symbol,
+        'timeframe': timeframe,
+        'bars': len(context),
+        'bands': bands,
+        'series': {
+            'time': context.index.to_series().dt.strftime('%Y-%m-%d %H:%M:%S').tolist(),
+            'regime': context['regime'].astype(str).tolist(),
+            'confidence': context['confidence'].round(4).tolist(),
+            'reasons': context['reasons'].tolist(),
+        },
+    }
+
+
+@app.route('/api/regimes')
+def get_regimes():
+    """Market regime (crisis, sideways, weak trend or trend direction) of every candle.
+
+    Returns contiguous regime bands for chart overlays; ?series=1 adds the
+    per-candle regime, confidence and reason mask (bits of 'reason_names').
+    """
+    symbol = request.args.get('symbol', SYMBOL).upper()
+    timeframe = request.args.get('timeframe', TIMEFRAME)
+    bars = max(min(request.args.get('bars', REGIME_HISTORY_BARS, type=int), REGIME_HISTORY_MAX_BARS), 1)
+    sentiment = request.args.get('sentiment', 0.0, type=float)
+    try:
+        timeframe_to_seconds(timeframe)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    compute = lambda: build_regime_history(symbol, timeframe, bars, sentiment)
+    cache = get_shared_cache()
+    try:
+        # Only the default request is shared: any other bars/sentiment would add a cache row per value
+        if cache is None or bars != REGIME_HISTORY_BARS or sentiment != 0.0:
+            history = compute()
+        else:
+            history = cache.get_or_compute(f'regimes:{symbol}:{timeframe}', compute,
+                                           expires_at=lambda: next_candle_close(timeframe))
+    except MarketDataError as e:
+        return jsonify({'error': str(e)}), 500
+
+    payload = {**history, 'regimes': REGIMES, 'reason_names': REGIME_REASONS}
+    if request.args.get('series') != '1':
+        payload.pop('series')
+    return json_response(payload)
+
+
+@app.route('/api/risk')
+def get_portfolio_risk():
+    """Exposure and parametric VaR of the open positions"""
+    return json_response(portfolio_risk.summary())
+
+
+# Granular data endpoints: each computes only its part of /api/data.
+# ?fields=a,b.c keeps only those (dot-nested) fields, ?since= (epoch ms or ISO
+# date) only returns data from that time on and 'cursor' is the value to pass next.
+
+def data_endpoint(view):
+    """JSON view: bad parameters (ValueError) give a 400, unavailable market data a 500;
+    (body, status) tuples are passed through"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            payload = view(*args, **kwargs)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except MarketDataError as e:
+            app.logger.error(str(e))
+            return jsonify({'error': str(e)}), 500
+        return payload if isinstance(payload, tuple) else json_response(payload)
+    return wrapper
+
+
+def market_args() -> Tuple[str, str]:
+    """?symbol= and ?timeframe=, the dashboard's by default"""
+    symbol = request.args.get('symbol', SYMBOL).upper()
+    timeframe = request.args.get('timeframe', TIMEFRAME)
+    timeframe_to_seconds(timeframe)
+    return symbol, timeframe
+
+
+def limit_arg(default: int, maximum: int) -> int:
+    return max(min(request.args.get('limit', default, type=int), maximum), 1)
+
+
+def frame_since(df: pd.DataFrame, since: Optional[pd.Timestamp]) -> pd.DataFrame:
+    """Candles of df from `since` on, the forming candle included, on a naive UTC index"""
+    if df.index.tz is not None:
+        df = df.tz_convert(None)
+    return df if since is None else df[df.index >= since]
+
+
+def column_values(values: pd.Series) -> list:
+    """A column as a JSON list, NaN as null"""
+    return [None if v != v else v for v in values.to_numpy(dtype=float).tolist()]
+
+
+def epoch_ms(index: pd.DatetimeIndex) -> list:
+    return index.values.astype('datetime64[ms]').astype(np.int64).tolist()
+
+
+@app.route('/api/candles')
+@data_endpoint
+def get_candles():
+    """OHLCV columns, times in epoch ms; no indicators, news or chart are computed"""
+    symbol, timeframe = market_args()
+    since = parse_time_cursor(request.args.get('since'))
+    df = get_historical_data(symbol, timeframe, limit_arg(API_CANDLES_LIMIT, API_CANDLES_MAX_LIMIT))
+    if df is None or df.empty:
+        raise MarketDataError(f'No data available for {symbol} {timeframe}')
+    cursor = time_cursor(frame_since(df, None).index[-1])
+    df = frame_since(df, since)
+    columns = {'time': lambda: epoch_ms(df.index)}
+    columns.update({column: (lambda column=column: column_values(df[column]))
+                    for column in ('open', 'high', 'low', 'close', 'volume')})
+    return {'symbol': symbol, 'timeframe': timeframe, 'cursor': cursor,
+            **select_fields(columns, request.args.get('fields'))}
+
+
+@app.route('/api/indicators')
+@data_endpoint
+def get_indicators():
+    """Indicator values of the latest candle; with ?since= one list per indicator from the cursor on"""
+    symbol, timeframe = market_args()
+    since = parse_time_cursor(request.args.get('since'))
+    df = frame_since(load_market_frame(symbol, timeframe), None)
+    cursor = time_cursor(df.index[-1])
+    columns = get_indicator_engine(symbol, timeframe).columns + ['volume_ratio']
+    if since is None:
+        values = {column: (lambda column=column: column_values(df[column].iloc[-1:])[0]) for column in columns}
+        time_value = cursor
+    else:
+        df = frame_since(df, since)
+        values = {column: (lambda column=column: column_values(df[column])) for column in columns}
+        time_value = epoch_ms(df.index)
+    return {'symbol': symbol, 'timeframe': timeframe, 'cursor': cursor, 'time': time_value,
+            'values': select_fields(values, request.args.get('fields'))}
+
+
+@app.route('/api/context')
+@data_endpoint
+def get_context():
+    """Market context (trend, sideways, volatility, crisis, can_trade).
+
+    Sentiment comes from the news already fetched for the symbol, so this
+    never scrapes news sources.
+    """
+    symbol, timeframe = market_args()
+    df = load_market_frame(symbol, timeframe)
+    sentiment_score = news_sentiment(news_analyzer.get_market_context(None, symbol, refresh=False))[1]
+    context = get_context_engine(symbol, timeframe).get_market_context(df, sentiment_score)
+    sections = {name: (lambda value=value: value) for name, value in context.items()}
+    return {'symbol': symbol, 'timeframe': timeframe, 'time': time_cursor(frame_since(df, None).index[-1]),
+            **select_fields(sections, request.args.get('fields'))}
+
+
+@app.route('/api/account')
+@data_endpoint
+def get_account():
+    """Balance, performance and open positions; prices are only fetched for equity and P&L fields"""
+    positions = list(trading_service.get_open_positions().values())
+    prices: Dict[str, float] = {}
+
+    def marked_positions() -> list:
+        for symbol in {pos.symbol for pos in positions} - prices.keys():
+            df = get_historical_data(symbol, TIMEFRAME, 200)  # shares the dashboard's cached candles
+            if df is None or df.empty:
+                raise MarketDataError(f'No price available for {symbol}')
+            prices[symbol] = float(df['close'].iloc[-1])
+        return [position_info(pos, prices[pos.symbol]) for pos in positions]
+
+    total_pnl = lambda: sum(pos['pnl'] for pos in marked_positions())
+    used_margin = lambda: sum(float(pos.size * pos.entry_price * 0.1) for pos in positions)
+    equity = lambda: float(current_balance + total_pnl())
+    sections = {
+        'balance': lambda: float(current_balance),
+        'equity': equity,
+        'used_margin': used_margin,
+        'free_margin': lambda: equity() - used_margin(),
+        'margin_level': lambda: equity() / used_margin() * 100 if positions else 0.0,
+        'daily_trades': trades_today,
+        'max_daily_trades': lambda: MAX_DAILY_TRADES,
+        'total_pnl': lambda: float(total_pnl()),
+        'win_rate': lambda: float(trading_service.get_performance()['win_rate']),
+        'performance': trading_service.get_performance,
+        'open_positions': marked_positions,
+    }
+    return select_fields(sections, request.args.get('fields'))
+
+
+@app.route('/api/news')
+@data_endpoint
+def get_news():
+    """News sentiment and headlines of the dashboard symbol, from the poller's last news refresh"""
+    if BACKGROUND_POLLER_ENABLED:
+        news_analysis = market_poller.ensure_started().results.get('news')
+        if news_analysis is None:
+            return jsonify({'error': 'Noticias aún no disponibles, reintentando...'}), 503
+    else:
+        news_analysis = fetch_news_analysis()
+    summary = news_summary(news_analysis, limit=5)
+    return select_fields({name: (lambda value=value: value) for name, value in summary.items()},
+                         request.args.get('fields'))
+
+
+@app.route('/api/trades')
+@data_endpoint
+def get_trades():
+    """Closed trades, oldest first; ?since= is the cursor of a previous response (trades closed after it,
+    the oldest `limit` first), ?fields= applies to each trade"""
+    since = request.args.get('since')
+    if since is not None and not since.isdigit():
+        raise ValueError(f"Invalid cursor: {since}")
+    trades, cursor = trading_service.get_trades_after(int(since) if since else None,
+                                                      limit_arg(API_TRADES_LIMIT, API_TRADES_MAX_LIMIT))
+    records = [trade_info(t) for t in trades]
+    fields = parse_fields(request.args.get('fields'))
+    if fields and records and not fields.keys() <= records[0].keys():
+        raise ValueError(f"Unknown fields: {', '.join(fields.keys() - records[0].keys())}")
+    return {'cursor': cursor, 'trades': project(records, fields)}
 
 @app.route('/api/reset')
 def reset_trading():
     """Reset trading state for testing"""
-    global daily_trades, current_balance
-    daily_trades = 0
+    global current_balance
     current_balance = INITIAL_BALANCE
-    trading_service = TradingService()  # Reset trading service
+    trading_service.reset()  # Shared by all workers through the trade ledger
     return jsonify({'success': True, 'message': 'Trading reset successfully'})
 
+@app.cli.command('backtest')
+@click.option('--symbol', default=SYMBOL, show_default=True)
+@click.option('--timeframe', default=TIMEFRAME, show_default=True)
+@click.option('--provider', default='binance', show_default=True, help='Candle store series to replay')
+@click.option('--csv', 'csv_path', default=None, help='Read OHLCV candles from a CSV instead of the candle store')
+@click.option('--bars', type=int, default=None, help='Only replay the newest N candles')
+@click.option('--sentiment', type=float, default=0.0, show_default=True, help='News sentiment assumed for every bar')
+@click.option('--close-only', is_flag=True, help='Check SL/TP against closes instead of candle high/low')
+@click.option('--export', 'export_path', default=None, help='Write every simulated trade to this CSV')
+@click.option('--fills', 'fills_timeframe', default=None,
+              help='Also fill the trades over stored candles of this lower timeframe (e.g. 1m) '
+                   'with slippage, fees and partial fills')
+@click.option('--regime', 'regimes', multiple=True, type=click.Choice(REGIMES),
+              help='Only take signals on bars in this market regime (repeatable)')
+def backtest_command(symbol, timeframe, provider, csv_path, bars, sentiment, close_only, export_path, fills_timeframe,
+                     regimes):
+    """Replay the dashboard strategy over stored candles"""
+    from services.backtest import Backtester
+    from services.execution import ExecutionSimulator, bars_to_ticks
+    from services.trade_stats import TradeStats
+
+    if csv_path:
+        df = pd.read_csv(csv_path, index_col=0, parse_dates=True)
+        if bars:
+            df = df.tail(bars)
+    else:
+        df = CandleStore(CANDLE_STORE_DIR).read(provider, symbol, timeframe, limit=bars)
+    if df is None or df.empty:
+        raise click.ClickException(f'No candles for {symbol} {timeframe}')
+
+    started = time.perf_counter()
+    result = Backtester(sentiment_score=sentiment, intrabar=not close_only, symbol=symbol, regimes=regimes).run(df)
+    elapsed = time.perf_counter() - started
+
+    click.echo(f'{symbol} {timeframe}: {len(df)} candles from {df.index[0]} to {df.index[-1]} in {elapsed:.2f}s')
+    for name, value in result.stats.items():
+        click.echo(f'  {name:>22}: {value:.2f}' if isinstance(value, float) else f'  {name:>22}: {value}')
+    trades = result.trades
+    if fills_timeframe:
+        bar = pd.Timedelta(seconds=timeframe_to_seconds(timeframe))
+        fills = CandleStore(CANDLE_STORE_DIR).read(provider, symbol, fills_timeframe,
+                                                   start=df.index[0], end=df.index[-1] + bar)
+        if fills is None or fills.empty:
+            raise click.ClickException(f'No {fills_timeframe} candles for {symbol} to fill against')
+        started = time.perf_counter()
+        times, prices, volumes = bars_to_ticks(fills)
+        # The strategy enters at the signal candle's close
+        trades = ExecutionSimulator().run(result.trades, times, prices, volumes,
+                                          submit_times=result.trades.column('entry_time') + bar.to_timedelta64())
+        elapsed = time.perf_counter() - started
+        stats = TradeStats()
+        closed = trades.data[trades.mask(status='closed')]
+        for row in np.sort(closed, order='exit_time', kind='stable'):
+            stats.add(float(row['pnl']), float(row['pnl_percent']))
+        click.echo(f'Filled over {len(prices)} ticks from {len(fills)} {fills_timeframe} candles in {elapsed:.2f}s '
+                   f'({len(prices) / max(elapsed, 1e-9) * 60 / 1e6:.1f}M ticks/min), '
+                   f'fees {float(trades.column("fees").sum()):.2f}')
+        for name, value in stats.summary().items():
+            click.echo(f'  {name:>22}: {value:.2f}' if isinstance(value, float) else f'  {name:>22}: {value}')
+    if export_path:
+        trades.to_csv(export_path)
+        click.echo(f'{len(trades)} trades written to {export_path}')
+
+def _parse_dimension(text: str):
+    """'name=1,2,3' -> values, 'name=1.5:3' -> (low, high) range"""
+    name, _, spec = text.partition('=')
+    number = lambda v: int(v) if v.strip().lstrip('-').isdigit() else float(v)
+    if ':' in spec:
+        low, high = spec.split(':', 1)
+        return name.strip(), (number(low), number(high))
+    return name.strip(), [number(v) for v in spec.split(',') if v.strip()]
+
+@app.cli.command('optimize')
+@click.option('--param', 'dimensions', multiple=True, required=True,
+              help="Parameter to vary: name=v1,v2,... or name=low:high (e.g. atr_multiplier=1.5:3)")
+@click.option('--method', type=click.Choice(['grid', 'random', 'adaptive']), default='grid', show_default=True)
+@click.option('--samples', type=int, default=64, show_default=True, help='Configurations per random/adaptive round')
+@click.option('--rounds', type=int, default=4, show_default=True, help='Adaptive rounds')
+@click.option('--objective', default='profit_factor', show_default=True)
+@click.option('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+@click.option('--symbol', default=SYMBOL, show_default=True)
+@click.option('--timeframe', default=TIMEFRAME, show_default=True)
+@click.option('--provider', default='binance', show_default=True)
+@click.option('--csv', 'csv_path', default=None)
+@click.option('--bars', type=int, default=None)
+@click.option('--top', type=int, default=20, show_default=True)
+@click.option('--seed', type=int, default=None)
+def optimize_command(dimensions, method, samples, rounds, objective, workers, symbol, timeframe,
+                     provider, csv_path, bars, top, seed):
+    """Sweep strategy parameters over stored candles in parallel"""
+    from services.optimizer import Optimizer
+
+    if csv_path:
+        df = pd.read_csv(csv_path, index_col=0, parse_dates=True)
+        if bars:
+            df = df.tail(bars)
+    else:
+        df = CandleStore(CANDLE_STORE_DIR).read(provider, symbol, timeframe, limit=bars)
+    if df is None or df.empty:
+        raise click.ClickException(f'No candles for {symbol} {timeframe}')
+    space = dict(_parse_dimension(d) for d in dimensions)
+
+    started = time.perf_counter()
+    with Optimizer(df, workers=workers, objective=objective) as optimizer:
+        if method == 'grid':
+            report = optimizer.grid(space)
+        elif method == 'random':
+            report = optimizer.random(space, samples, seed=seed)
+        else:
+            report = optimizer.adaptive(space, rounds=rounds, samples_per_round=samples, seed=seed)
+    elapsed = time.perf_counter() - started
+
+    click.echo(f'{len(report)} configurations over {len(df)} candles in {elapsed:.1f}s')
+    columns = [c for c in report.columns if c in space] + [
+        c for c in ('total_trades', 'win_rate', 'profit_factor', 'total_pnl', 'max_drawdown_percent', 'error')
+        if c in report.columns]
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        click.echo(report[columns].head(top).to_string(index=False, float_format=lambda v: f'{v:.3f}'))
+
+@app.cli.command('sentiment-bench')
+@click.option('--file', 'path', default=None, help='Headlines to score, one per line (default: synthetic corpus)')
+@click.option('--count', type=int, default=20000, show_default=True, help='Synthetic headlines to generate')
+@click.option('--backend', 'backends', multiple=True, help='Backends to compare (default: all registered)')
+@click.option('--reference', default='textblob', show_default=True, help='Backend whose labels count as correct')
+def sentiment_bench_command(path, count, backends, reference):
+    """Compare sentiment backends: throughput and sentiment_label agreement"""
+    from services.sentiment import SENTIMENT_BACKENDS, benchmark, synthetic_headlines
+
+    if path:
+        with open(path, encoding='utf-8') as f:
+            texts = [line.strip() for line in f if line.strip()]
+    else:
+        texts = synthetic_headlines(count)
+    report = benchmark(texts, backends or list(SENTIMENT_BACKENDS), reference=reference,
+                       threshold=news_analyzer.sentiment_threshold)
+
+    click.echo(f'{len(texts)} headlines, labels compared against {reference}')
+    for name, row in report.items():
+        labels = ' '.join(f'{label}={n}' for label, n in row['labels'].items())
+        click.echo(f"  {name:>10}: {row['per_second']:>12,.0f}/s  load {row['load_seconds']:.2f}s  "
+                   f"agreement {row['label_agreement']:.1%}  {labels}")
+
+@app.cli.command('import-profile')
+@click.option('--module', default='app', show_default=True)
+@click.option('--top', type=int, default=25, show_default=True)
+@click.option('--sort', 'sort_by', type=click.Choice(['cumulative', 'self']), default='cumulative', show_default=True)
+@click.option('--preload', is_flag=True, help='Profile with PRELOAD_PROVIDERS=1')
+def import_profile_command(module, top, sort_by, preload):
+    """Import-time profile of the app (python -X importtime), slowest modules first"""
+    try:
+        rows = import_profile(module, env={'PRELOAD_PROVIDERS': '1' if preload else '0'})
+    except RuntimeError as e:
+        raise click.ClickException(f'Importing {module} failed: {e}')
+    total = next((r['cumulative'] for r in reversed(rows) if r['module'] == module), 0.0)
+    click.echo(f'import {module}: {total:.3f}s, {len(rows)} modules')
+    click.echo(f"  {'cumulative':>10} {'self':>8}  module")
+    # Top-level entries only for the cumulative view, otherwise parents repeat their children
+    candidates = rows if sort_by == 'self' else [r for r in rows if r['depth'] <= 1 and r['module'] != module]
+    for row in sorted(candidates, key=lambda r: r[sort_by], reverse=True)[:top]:
+        click.echo(f"  {row['cumulative']:>9.3f}s {row['self']:>7.3f}s  {row['module']}")
+
+@app.cli.command('cold-start')
+@click.option('--runs', type=int, default=3, show_default=True)
+@click.option('--server', type=click.Choice(['gunicorn', 'flask']), default='gunicorn', show_default=True)
+@click.option('--target', type=float, default=COLD_START_TARGET, show_default=True,
+              help='Fail when the median time to a healthy /health is above this (seconds)')
+@click.option('--preload', is_flag=True, help='Start with PRELOAD_PROVIDERS=1')
+def cold_start_command(runs, server, target, preload):
+    """Measure time from process start to the first 200 from /health"""
+    timings = []
+    for _ in range(runs):
+        port = free_port()
+        if server == 'gunicorn':
+            command = [sys.executable, '-m', 'gunicorn', '--workers', '1', '--threads', '8',
+                       '--bind', f'127.0.0.1:{port}', 'app:app']
+        else:
+            command = [sys.executable, '-c', f'from app import app; app.run(port={port})']
+        try:
+            timings.append(time_to_healthy(command, f'http://127.0.0.1:{port}/health',
+                                           env={'PRELOAD_PROVIDERS': '1' if preload else '0'}))
+        except (RuntimeError, TimeoutError) as e:
+            raise click.ClickException(str(e))
+        click.echo(f'  run {len(timings)}: {timings[-1]:.2f}s')
+    median = float(np.median(timings))
+    click.echo(f'time to healthy /health ({server}): median {median:.2f}s, target {target:.2f}s')
+    if median > target:
+        raise click.ClickException(f'Cold start {median:.2f}s is above the {target:.2f}s target')
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 8080))
     app.run(host='0.0.0.0', port=port, debug=False)
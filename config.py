@@ -1,4 +1,5 @@
 # Configuration file for Forex Trading Bot
+import os
 
 # Exchange Configuration
 EXCHANGE = 'binance'
@@ -43,9 +44,137 @@ MA_SLOW = 50
 API_BASE_URL = 'https://api.binance.com/api/v3'
 UPDATE_INTERVAL = 60  # seconds
 
+# HTTP Configuration (pooled, hedged requests across BINANCE_BASE_URLS)
+HTTP_POOL_SIZE = 32  # keep-alive connections per host
+HTTP_CONNECT_TIMEOUT = 3.05  # seconds
+HTTP_READ_TIMEOUT = 10  # seconds
+HTTP_HEDGE_DELAY = 1.0  # seconds before also asking the next host
+HTTP_HEDGE_MIN_DELAY = 0.15  # lower bound when hedging after 3x a host's usual latency
+HTTP_BREAKER_THRESHOLD = 3  # consecutive failures that open a host's circuit
+HTTP_BREAKER_COOLDOWN = 60  # seconds before a failed host is tried again
+
+# Local Storage Configuration
+DATA_DIR = os.getenv('DATA_DIR', 'data')
+CANDLE_STORE_ENABLED = os.getenv('CANDLE_STORE_ENABLED', '1') == '1'
+CANDLE_STORE_DIR = os.path.join(DATA_DIR, 'candles')
+BINANCE_KLINES_PAGE_LIMIT = 1000
+CANDLE_GAP_FILL_MAX_PAGES = 50  # Beyond this the newest candles are fetched and the hole backfilled later
+
+# Shared Cache Configuration (one upstream fetch per interval across all workers)
+SHARED_CACHE_ENABLED = os.getenv('SHARED_CACHE_ENABLED', '1') == '1'
+SHARED_CACHE_PATH = os.path.join(DATA_DIR, 'shared_cache.sqlite3')
+SHARED_CACHE_DECODED_MAX = 256  # decoded values kept per process (least recently used evicted)
+SHARED_CACHE_STALE_GRACE = 24 * 3600  # seconds an expired entry is kept as the fallback for a failed refresh
+MARKET_DATA_MAX_AGE = UPDATE_INTERVAL  # seconds; 0 = refresh only when the candle closes
+NEWS_CACHE_TTL = 300  # seconds
+
+# Sentiment Backend ('textblob' = original scorer, 'lexicon' = fast lexicon model with crypto terms,
+# 'pattern' = same model without them)
+SENTIMENT_BACKEND = os.getenv('SENTIMENT_BACKEND', 'textblob')
+
+# Sentiment Cache Configuration (scores keyed by headline content, kept across restarts)
+SENTIMENT_CACHE_ENABLED = os.getenv('SENTIMENT_CACHE_ENABLED', '1') == '1'
+SENTIMENT_CACHE_PATH = os.path.join(DATA_DIR, 'sentiment_cache.sqlite3')
+SENTIMENT_CACHE_SIZE = 20000  # entries kept on disk (least recently used evicted)
+SENTIMENT_CACHE_MEMORY_SIZE = 2048  # entries kept decoded in each worker
+SENTIMENT_CACHE_TTL = 30 * 24 * 3600  # seconds
+
+# Rate Limit Configuration (token buckets shared by all workers)
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', '1') == '1'
+RATE_LIMIT_PATH = os.path.join(DATA_DIR, 'rate_limits.sqlite3')
+RATE_LIMITS = {  # provider: (budget, seconds)
+    'binance': (5000, 60),  # request weight; Binance allows 6000/min per IP
+    'coingecko': (25, 60),  # public API allows ~30 calls/min
+    'yfinance': (60, 60),
+    'reddit': (10, 60),  # unauthenticated JSON API
+    'twitter': (60, 900),  # recent search, basic tier
+}
+RATE_LIMIT_RESERVES = {  # share of each budget a priority must leave for more urgent ones
+    'live': 0.0,  # current prices
+    'market': 0.1,  # dashboard candles
+    'backfill': 0.3,  # gap-fill pages, scanner
+    'news': 0.3,
+}
+RATE_LIMIT_MAX_WAIT = 10  # seconds a request queues for budget before giving up
+
+# Portfolio Risk Configuration (exposure, correlation-aware sizing and VaR across symbols)
+PORTFOLIO_COVARIANCE_WINDOW = 200  # bars of returns in the rolling covariance
+PORTFOLIO_VAR_CONFIDENCE = 0.99
+PORTFOLIO_VAR_LIMIT = 0.05  # one-bar VaR allowed, as a share of the balance
+PORTFOLIO_MAX_EXPOSURE = 3.0  # gross notional allowed, as a multiple of the balance
+
+# Execution Simulation (live paper fills, and backtests replayed over 1m candles or ticks: flask backtest --fills 1m)
+EXECUTION_TAKER_FEE = 0.001  # market and stop fills (Binance spot: 0.1%)
+EXECUTION_MAKER_FEE = 0.001  # take-profit limit fills
+EXECUTION_SLIPPAGE_BPS = 2.0  # adverse slippage on market and stop fills
+EXECUTION_PARTICIPATION = 0.1  # share of each tick's volume an order may take; 0 = always fill in full
+
+# Trade Ledger Configuration (append-only trade log shared by all workers, kept across restarts)
+TRADE_LEDGER_ENABLED = os.getenv('TRADE_LEDGER_ENABLED', '1') == '1'
+TRADE_LEDGER_PATH = os.path.join(DATA_DIR, 'trade_ledger.sqlite3')
+# NORMAL = fsync batched at WAL checkpoints (survives process crashes), FULL = fsync every trade
+TRADE_LEDGER_SYNC = os.getenv('TRADE_LEDGER_SYNC', 'NORMAL')
+TRADE_LEDGER_SNAPSHOT_EVERY = 1000  # events between state snapshots; recovery replays at most this many
+TRADE_HISTORY_MEMORY = 500  # closed trades kept in each worker, older ones are read from the ledger
+
+# Startup Configuration
+# yfinance and TextBlob load on first use; preloading them suits gunicorn --preload,
+# where workers then share the imported modules
+PRELOAD_PROVIDERS = os.getenv('PRELOAD_PROVIDERS', '0') == '1'
+COLD_START_TARGET = 3.0  # seconds from process start to the first healthy /health ('flask cold-start')
+
+# Background Poller Configuration
+BACKGROUND_POLLER_ENABLED = os.getenv('BACKGROUND_POLLER_ENABLED', '1') == '1'
+NEWS_UPDATE_INTERVAL = 300  # seconds
+CANDLE_CLOSE_DELAY = 2  # seconds after a candle closes before refreshing
+SNAPSHOT_WAIT_TIMEOUT = 25  # seconds a request waits for the very first snapshot
+SNAPSHOT_HISTORY = 8  # recent snapshots kept so reconnecting streams get a delta
+
+# HTTP Caching (ETag revalidation and compression of data endpoints)
+HTTP_COMPRESSION_ENABLED = os.getenv('HTTP_COMPRESSION_ENABLED', '1') == '1'
+HTTP_COMPRESS_MIN_SIZE = 1024  # bytes; smaller bodies are sent as is
+HTTP_GZIP_LEVEL = 6
+HTTP_BROTLI_QUALITY = 5  # brotli is used when the package is installed
+
+# Streaming Configuration (/api/stream server-sent events)
+STREAM_ENABLED = os.getenv('STREAM_ENABLED', '1') == '1'
+STREAM_HEARTBEAT = 15  # seconds between keep-alive comments
+STREAM_MAX_DURATION = 300  # seconds before the server closes and the browser reconnects
+STREAM_RETRY_MS = 3000
+
+# Regime History (/api/regimes)
+REGIME_HISTORY_BARS = 500  # candles classified by default
+REGIME_HISTORY_MAX_BARS = 5000
+
+# Granular Data Endpoints (/api/candles, /api/indicators, /api/trades, ...)
+API_CANDLES_LIMIT = 200  # candles returned by default
+API_CANDLES_MAX_LIMIT = 1000
+API_TRADES_LIMIT = 50
+API_TRADES_MAX_LIMIT = 1000
+
+# Scanner Configuration (/api/scan)
+SCANNER_ENABLED = os.getenv('SCANNER_ENABLED', '1') == '1'
+# Comma-separated symbols; empty scans the most traded SCANNER_QUOTE_ASSET pairs
+SCANNER_SYMBOLS = [s.strip().upper() for s in os.getenv('SCANNER_SYMBOLS', '').split(',') if s.strip()]
+SCANNER_UNIVERSE_SIZE = 300
+SCANNER_QUOTE_ASSET = 'USDT'
+SCANNER_TIMEFRAMES = ['1h', '4h']
+SCANNER_MAX_CONCURRENCY = 16  # simultaneous upstream requests
+SCANNER_INTERVAL = 900  # seconds; scans also run right after each candle close
+
 # News Configuration
 NEWS_SOURCES = ['crypto_news', 'twitter', 'reddit']
 SENTIMENT_THRESHOLD = 0.1
+# JSON-lines file of news items; when set it replaces NEWS_SOURCES (offline testing)
+NEWS_REPLAY_FILE = os.getenv('NEWS_REPLAY_FILE', '')
+NEWS_ITEMS_PER_SOURCE = 25
+NEWS_BATCH_SIZE = 32  # items scored together
+NEWS_DUPLICATE_THRESHOLD = 0.8  # estimated title similarity (Jaccard) treated as the same story
+NEWS_MAX_AGE = 7 * 24 * 3600  # seconds; older items are ignored
+NEWS_SENTIMENT_HALF_LIFE = 6 * 3600  # seconds for a headline's weight to halve
+NEWS_SENTIMENT_PRIOR_WEIGHT = 0.5  # neutral weight the aggregate falls back to without fresh news
+NEWS_REDDIT_SUBREDDITS = ['CryptoCurrency', 'CryptoMarkets']
+TWITTER_BEARER_TOKEN = os.getenv('TWITTER_BEARER_TOKEN', '')
 
 # Sideways Market Detection
 SIDEWAYS_ATR_THRESHOLD = 0.5
@@ -1,7 +1,11 @@
-from dataclasses import dataclass
-from datetime import datetime
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
 from typing import Optional
 
+def utc_now() -> datetime:
+    """Current time as a naive UTC datetime, the way trade times are stored"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
 @dataclass
 class Trade:
     id: int
@@ -18,7 +22,23 @@ class Trade:
     pnl_percent: Optional[float] = None
     risk_amount: float = 0.0
     status: str = 'open'  # 'open', 'closed', 'cancelled'
+    fees: float = 0.0  # trading fees, already deducted from pnl
     
     def __post_init__(self):
         if self.entry_time is None:
-            self.entry_time = datetime.now()
\ No newline at end of file
+            self.entry_time = utc_now()
+    def to_dict(self) -> dict:
+        """JSON-safe representation (datetimes as ISO strings)"""
+        data = asdict(self)
+        for name in ('entry_time', 'exit_time'):
+            if data[name] is not None:
+                data[name] = data[name].isoformat()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Trade':
+        data = dict(data)
+        for name in ('entry_time', 'exit_time'):
+            if data.get(name) is not None:
+                data[name] = datetime.fromisoformat(data[name])
+        return cls(**data)
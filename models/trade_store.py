@@ -0,0 +1,278 @@
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+
+from models.trade import Trade
+
+SIDES = {'buy': 1, 'sell': -1}
+STATUSES = ('open', 'closed', 'cancelled')
+
+# One row per trade, ~102 bytes; NaN / NaT stand for None
+TRADE_DTYPE = np.dtype([
+    ('id', 'i8'), ('symbol', 'i4'), ('side', 'i1'), ('status', 'i1'),
+    ('entry_price', 'f8'), ('exit_price', 'f8'), ('size', 'f8'),
+    ('stop_loss', 'f8'), ('take_profit', 'f8'),
+    ('entry_time', 'M8[us]'), ('exit_time', 'M8[us]'),
+    ('pnl', 'f8'), ('pnl_percent', 'f8'), ('risk_amount', 'f8'), ('fees', 'f8'),
+])
+FLOAT_FIELDS = ('entry_price', 'exit_price', 'size', 'stop_loss', 'take_profit', 'pnl', 'pnl_percent', 'risk_amount',
+                'fees')
+OPTIONAL_FIELDS = ('exit_price', 'pnl', 'pnl_percent')
+
+
+def _to_datetime64(value: Optional[datetime]) -> np.datetime64:
+    return np.datetime64('NaT', 'us') if value is None else np.datetime64(value, 'us')
+
+
+class TradeView:
+    """A row of a TradeStore, read and written like a Trade.
+
+    Views address their row by position, so they stay valid while rows are
+    only appended; keep_last() invalidates the views it moves.
+    """
+
+    __slots__ = ('_store', '_row')
+
+    def __init__(self, store: 'TradeStore', row: int):
+        self._store = store
+        self._row = row
+
+    def _get(self, name: str):
+        return self._store._data[name][self._row]
+
+    def _set(self, name: str, value):
+        self._store._data[name][self._row] = value
+
+    @property
+    def id(self) -> int:
+        return int(self._get('id'))
+
+    @id.setter
+    def id(self, value: int):
+        self._set('id', value)
+
+    @property
+    def symbol(self) -> str:
+        return self._store.symbols[self._get('symbol')]
+
+    @symbol.setter
+    def symbol(self, value: str):
+        self._set('symbol', self._store._symbol_code(value))
+
+    @property
+    def side(self) -> str:
+        return 'buy' if self._get('side') > 0 else 'sell'
+
+    @side.setter
+    def side(self, value: str):
+        self._set('side', SIDES[value])
+
+    @property
+    def status(self) -> str:
+        return STATUSES[self._get('status')]
+
+    @status.setter
+    def status(self, value: str):
+        self._set('status', STATUSES.index(value))
+
+    def to_trade(self) -> Trade:
+        return Trade(**{name: getattr(self, name) for name in TRADE_DTYPE.names})
+
+    def __repr__(self) -> str:
+        return f"TradeView({self.to_trade()!r})"
+
+
+def _float_property(name: str) -> property:
+    optional = name in OPTIONAL_FIELDS
+
+    def getter(self):
+        value = float(self._get(name))
+        return None if optional and np.isnan(value) else value
+
+    def setter(self, value):
+        self._set(name, np.nan if value is None else value)
+
+    return property(getter, setter)
+
+
+def _time_property(name: str) -> property:
+    def getter(self):
+        value = self._get(name)
+        return None if np.isnat(value) else value.astype(datetime)
+
+    def setter(self, value):
+        self._set(name, _to_datetime64(value))
+
+    return property(getter, setter)
+
+
+for _name in FLOAT_FIELDS:
+    setattr(TradeView, _name, _float_property(_name))
+for _name in ('entry_time', 'exit_time'):
+    setattr(TradeView, _name, _time_property(_name))
+
+
+class TradeStore:
+    """Trades held column-wise in one growable NumPy structured array.
+
+    Symbols, sides and statuses are stored as small integer codes, times as
+    datetime64, so a trade takes about a fifth of the memory of a Trade
+    dataclass and analytics run on whole columns. Indexing and iteration
+    yield TradeView rows that behave like Trade objects.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self._data = np.zeros(capacity, dtype=TRADE_DTYPE)
+        self._size = 0
+        self.symbols: List[str] = []
+        self._symbol_codes: Dict[str, int] = {}
+
+    @classmethod
+    def from_trades(cls, trades: Iterable[Trade]) -> 'TradeStore':
+        store = cls()
+        for trade in trades:
+            store.append(trade)
+        return store
+
+    def _symbol_code(self, symbol: str) -> int:
+        code = self._symbol_codes.get(symbol)
+        if code is None:
+            code = self._symbol_codes[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        return code
+
+    def _reserve(self, extra: int):
+        needed = self._size + extra
+        if needed > len(self._data):
+            grown = np.zeros(max(needed, 2 * len(self._data)), dtype=TRADE_DTYPE)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def data(self) -> np.ndarray:
+        """Structured array of the stored rows (a view, not a copy)"""
+        return self._data[:self._size]
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes
+
+    def column(self, name: str) -> np.ndarray:
+        return self.data[name]
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[TradeView, List[TradeView]]:
+        if isinstance(index, slice):
+            return [TradeView(self, row) for row in range(*index.indices(self._size))]
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError('trade index out of range')
+        return TradeView(self, index)
+
+    def __iter__(self) -> Iterator[TradeView]:
+        return (TradeView(self, row) for row in range(self._size))
+
+    def append(self, trade: Trade) -> TradeView:
+        self._reserve(1)
+        view = TradeView(self, self._size)
+        self._size += 1
+        for name in TRADE_DTYPE.names:
+            setattr(view, name, getattr(trade, name))
+        return view
+
+    def extend(self, columns: Dict[str, Union[np.ndarray, float, str]]) -> None:
+        """Append many trades from column arrays (scalars are broadcast).
+
+        'symbol' may be a string or array of strings, 'side' 'buy'/'sell'
+        strings or a boolean is-buy array, 'status' status strings; times are
+        anything NumPy converts to datetime64. Missing columns stay empty.
+        """
+        n = max((len(v) for v in columns.values() if np.ndim(v) > 0), default=1)
+        self._reserve(n)
+        rows = self._data[self._size:self._size + n]
+        rows[:] = np.zeros(1, dtype=TRADE_DTYPE)
+        for name in OPTIONAL_FIELDS:
+            rows[name] = np.nan
+        rows['exit_time'] = np.datetime64('NaT')
+        for name, values in columns.items():
+            if name == 'symbol':
+                if isinstance(values, str):
+                    values = self._symbol_code(values)
+                else:
+                    values = [self._symbol_code(s) for s in values]
+            elif name == 'side':
+                values = np.asarray(values)
+                values = np.where(values, 1, -1) if values.dtype == bool else [SIDES[s] for s in values]
+            elif name == 'status':
+                values = STATUSES.index(values) if isinstance(values, str) else [STATUSES.index(s) for s in values]
+            rows[name] = values
+        self._size += n
+
+    def keep_last(self, n: int) -> None:
+        """Drop all but the newest n rows"""
+        if self._size > n:
+            self._data[:n] = self._data[self._size - n:self._size]
+            self._size = n
+
+    def to_trades(self, index: slice = slice(None)) -> List[Trade]:
+        return [view.to_trade() for view in self[index]]
+
+    def mask(self, status: Optional[str] = None, side: Optional[str] = None, symbol: Optional[str] = None,
+             start: Optional[datetime] = None, end: Optional[datetime] = None,
+             time_field: str = 'entry_time') -> np.ndarray:
+        """Boolean row mask; start/end bound `time_field` as [start, end)"""
+        data = self.data
+        selected = np.ones(self._size, dtype=bool)
+        if status is not None:
+            selected &= data['status'] == STATUSES.index(status)
+        if side is not None:
+            selected &= data['side'] == SIDES[side]
+        if symbol is not None:
+            selected &= data['symbol'] == self._symbol_codes.get(symbol, -1)
+        if start is not None:
+            selected &= data[time_field] >= _to_datetime64(start)
+        if end is not None:
+            selected &= data[time_field] < _to_datetime64(end)
+        return selected
+
+    def filter(self, **criteria) -> 'TradeStore':
+        """New store with the rows matching mask(**criteria)"""
+        selected = self.data[self.mask(**criteria)]
+        store = TradeStore(max(len(selected), 1))
+        store._data[:len(selected)] = selected
+        store._size = len(selected)
+        store.symbols = list(self.symbols)
+        store._symbol_codes = dict(self._symbol_codes)
+        return store
+
+    def realized_pnl(self) -> float:
+        return float(np.nansum(self.column('pnl')))
+
+    def unrealized_pnl(self, mark_price: Union[float, Dict[str, float]]) -> np.ndarray:
+        """Per-row P&L of open trades at mark_price (one price, or one per symbol); 0 for other rows"""
+        data = self.data
+        if isinstance(mark_price, dict):
+            prices = np.array([mark_price.get(s, np.nan) for s in self.symbols])[data['symbol']]
+        else:
+            prices = np.full(self._size, float(mark_price))
+        is_open = data['status'] == STATUSES.index('open')
+        pnl = (prices - data['entry_price']) * data['size'] * data['side']
+        return np.where(is_open, np.nan_to_num(pnl), 0.0)
+
+    def to_frame(self):
+        """pandas DataFrame with readable symbol/side/status columns"""
+        import pandas as pd
+
+        data = self.data
+        frame = pd.DataFrame({name: data[name] for name in TRADE_DTYPE.names})
+        frame['symbol'] = np.array(self.symbols, dtype=object)[data['symbol']] if self.symbols else ''
+        frame['side'] = np.where(data['side'] > 0, 'buy', 'sell')
+        frame['status'] = np.array(STATUSES, dtype=object)[data['status']]
+        return frame
+
+    def to_csv(self, path: str) -> None:
+        self.to_frame().to_csv(path, index=False)
@@ -0,0 +1,223 @@
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from config import INITIAL_BALANCE, SYMBOL
+from models.trade import Trade
+from models.trade_store import TradeStore
+from services.portfolio_risk import PortfolioRiskManager
+from services.strategy import DEFAULT_PARAMS, StrategyParams, add_strategy_indicators, generate_signals
+from services.trade_stats import TradeStats
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+# Bars every open trade is checked against in the first, fully vectorized pass
+EXIT_SCAN_WINDOW = 64
+
+
+def find_exits(high: np.ndarray, low: np.ndarray, entries: np.ndarray, is_buy: np.ndarray,
+               stop_loss: np.ndarray, take_profit: np.ndarray,
+               window: int = EXIT_SCAN_WINDOW) -> Tuple[np.ndarray, np.ndarray]:
+    """First bar after each entry whose range reaches the stop loss or take profit.
+
+    Returns (exit_index, exit_price), with -1/NaN for trades still open at
+    the end of the data. When both levels fall inside the same bar the stop
+    loss wins, as in TradingService.check_open_positions. Most trades resolve
+    within `window` bars, so they are all scanned at once as a 2-D block;
+    the few survivors continue in growing chunks one trade at a time.
+    """
+    n = len(high)
+    exit_index = np.full(len(entries), -1, dtype=np.int64)
+    exit_price = np.full(len(entries), np.nan)
+    if len(entries) == 0:
+        return exit_index, exit_price
+
+    # Buys stop out on the low and take profit on the high, sells the reverse
+    offsets = np.arange(1, window + 1)
+    rows = entries[:, None] + offsets
+    in_range = rows < n
+    rows = np.minimum(rows, n - 1)
+    bar_low, bar_high = low[rows], high[rows]
+    buy = is_buy[:, None]
+    hit_stop = in_range & np.where(buy, bar_low <= stop_loss[:, None], bar_high >= stop_loss[:, None])
+    hit_target = in_range & np.where(buy, bar_high >= take_profit[:, None], bar_low <= take_profit[:, None])
+    hit = hit_stop | hit_target
+    resolved = hit.any(axis=1)
+    first = hit.argmax(axis=1)
+    k = np.flatnonzero(resolved)
+    exit_index[k] = entries[k] + 1 + first[k]
+    exit_price[k] = np.where(hit_stop[k, first[k]], stop_loss[k], take_profit[k])
+
+    for k in np.flatnonzero(~resolved):
+        start = int(entries[k]) + 1 + window
+        size = window * 4
+        sl, tp = stop_loss[k], take_profit[k]
+        while start < n:
+            stop = min(start + size, n)
+            if is_buy[k]:
+                stops, targets = low[start:stop] <= sl, high[start:stop] >= tp
+            else:
+                stops, targets = high[start:stop] >= sl, low[start:stop] <= tp
+            hits = np.flatnonzero(stops | targets)
+            if len(hits):
+                j = hits[0]
+                exit_index[k] = start + j
+                exit_price[k] = sl if stops[j] else tp
+                break
+            start = stop
+            size *= 4
+    return exit_index, exit_price
+
+
+@dataclass
+class BacktestResult:
+    symbol: str
+    params: StrategyParams
+    trades: TradeStore
+    stats: Dict[str, float]
+    equity: pd.Series = field(repr=False)
+
+
+class Backtester:
+    """Replays the dashboard strategy over a candle history.
+
+    Signals for every bar come from services.strategy in one vectorized
+    pass; SL/TP fills are then resolved per trade with NumPy scans. The
+    result holds the same trades TradingService would have produced, in a
+    columnar TradeStore and stamped with candle times instead of wall-clock times,
+    but filled at the signal close and the SL/TP levels without costs; run
+    them through ExecutionSimulator (backtest --fills) for the slippage, fees
+    and gaps paper trading pays. As on the live dashboard, several positions
+    may be open at once and every trade is sized by a PortfolioRiskManager:
+    a fixed share of the initial balance, reduced to keep the VaR and gross
+    exposure of the positions open at its bar within limits; a signal with
+    no room left is not traded. With `regimes`, only signals on
+    bars in one of those market regimes (services.market_analysis.REGIMES)
+    are traded.
+    """
+
+    def __init__(self, params: StrategyParams = DEFAULT_PARAMS, initial_balance: float = INITIAL_BALANCE,
+                 sentiment_score: Union[float, pd.Series] = 0.0, intrabar: bool = True, symbol: str = SYMBOL,
+                 regimes: Optional[Sequence[str]] = None):
+        self.params = params
+        self.initial_balance = initial_balance
+        self.sentiment_score = sentiment_score
+        # intrabar: fill against each candle's high/low; otherwise only closes are checked
+        self.intrabar = intrabar
+        self.symbol = symbol
+        self.regimes = regimes
+
+    def prepare(self, df: pd.DataFrame) -> pd.DataFrame:
+        """OHLCV candles plus the strategy indicators"""
+        return add_strategy_indicators(df[OHLCV_COLUMNS].astype(float), self.params)
+
+    def run(self, df: pd.DataFrame) -> BacktestResult:
+        """Backtest raw OHLCV candles"""
+        prepared = self.prepare(df)
+        return self.run_prepared(prepared, generate_signals(prepared, self.params, self.sentiment_score))
+
+    def run_prepared(self, df: pd.DataFrame, signals: pd.DataFrame) -> BacktestResult:
+        """Backtest candles that already carry indicators and signals"""
+        entry = signals['entry'].to_numpy()
+        if self.regimes:
+            entry = entry & signals['regime'].isin(self.regimes).to_numpy()
+        entries = np.flatnonzero(entry)
+        is_buy = signals['is_buy'].to_numpy()[entries]
+        entry_price = signals['entry_price'].to_numpy()[entries]
+        stop_loss = signals['stop_loss'].to_numpy()[entries]
+        take_profit = signals['take_profit'].to_numpy()[entries]
+
+        close = df['close'].to_numpy(dtype=float)
+        high = df['high'].to_numpy(dtype=float) if self.intrabar else close
+        low = df['low'].to_numpy(dtype=float) if self.intrabar else close
+        exit_index, exit_price = find_exits(high, low, entries, is_buy, stop_loss, take_profit)
+
+        # Same sizing and P&L formulas as the dashboard / TradingService.close_position
+        size = self._sizes(close, entries, is_buy, entry_price, stop_loss, exit_index)
+        traded = size > 0
+        entries, is_buy, entry_price, stop_loss, take_profit, exit_index, exit_price, size = (
+            values[traded] for values in (entries, is_buy, entry_price, stop_loss, take_profit, exit_index,
+                                          exit_price, size)
+        )
+        risk_amount = self.initial_balance * self.params.risk_per_trade
+        direction = np.where(is_buy, 1.0, -1.0)
+        pnl = (exit_price - entry_price) * size * direction
+        pnl_percent = pnl / (entry_price * size) * 100
+
+        is_closed = exit_index >= 0
+        times = df.index.to_numpy()
+        trades = TradeStore(len(entries))
+        trades.extend({
+            'id': np.arange(1, len(entries) + 1),
+            'symbol': self.symbol,
+            'side': is_buy.astype(bool),
+            'entry_price': entry_price,
+            'exit_price': np.where(is_closed, exit_price, np.nan),
+            'size': size,
+            'stop_loss': stop_loss,
+            'take_profit': take_profit,
+            'entry_time': times[entries],
+            'exit_time': np.where(is_closed, times[np.maximum(exit_index, 0)], np.datetime64('NaT')),
+            'pnl': np.where(is_closed, pnl, np.nan),
+            'pnl_percent': np.where(is_closed, pnl_percent, np.nan),
+            'risk_amount': risk_amount,
+            'status': np.where(is_closed, 'closed', 'open'),
+        })
+
+        closed = np.flatnonzero(exit_index >= 0)
+        closed = closed[np.argsort(exit_index[closed], kind='stable')]
+        equity = pd.Series(
+            self.initial_balance + np.cumsum(pnl[closed]),
+            index=df.index[exit_index[closed]], name='balance'
+        )
+        return BacktestResult(self.symbol, self.params, trades,
+                              self._stats(trades, closed, len(df)), equity)
+
+    def _sizes(self, close: np.ndarray, entries: np.ndarray, is_buy: np.ndarray, entry_price: np.ndarray,
+               stop_loss: np.ndarray, exit_index: np.ndarray) -> np.ndarray:
+        """PortfolioRiskManager.evaluate() size of each entry, 0 where the dashboard would skip it.
+
+        Replays what the dashboard sees at each entry bar: the covariance
+        window of the returns up to that bar, and the trades taken before it
+        that have not exited by then, marked at its close.
+        """
+        manager = PortfolioRiskManager(self.initial_balance)
+        manager.risk_per_trade = self.params.risk_per_trade
+        manager.covariance.add_symbols([self.symbol])
+        returns = np.concatenate([[0.0], close[1:] / close[:-1] - 1])[:, None]
+        sizes = np.zeros(len(entries))
+        open_trades = []
+        for k, bar in enumerate(entries.tolist()):
+            # A position exiting on this bar is closed before the signal is evaluated
+            open_trades = [j for j in open_trades if exit_index[j] < 0 or exit_index[j] > bar]
+            manager.covariance.load_rows(returns[1:bar + 1])
+            manager.set_positions(
+                [Trade(id=j + 1, symbol=self.symbol, side='buy' if is_buy[j] else 'sell',
+                       entry_price=float(entry_price[j]), size=float(sizes[j])) for j in open_trades],
+                {self.symbol: float(close[bar])}
+            )
+            sizes[k] = manager.evaluate(self.symbol, bool(is_buy[k]), float(entry_price[k]), float(stop_loss[k]))['size']
+            if sizes[k] > 0:
+                open_trades.append(k)
+        return sizes
+
+    def _stats(self, trades: TradeStore, closed: np.ndarray, bars: int) -> Dict[str, float]:
+        # Same running statistics as TradingService, fed in closing order
+        stats = TradeStats(self.initial_balance, keep_equity=False)
+        for pnl, pnl_percent in zip(trades.column('pnl')[closed].tolist(), trades.column('pnl_percent')[closed].tolist()):
+            stats.add(pnl, pnl_percent)
+        return {
+            'bars': bars,
+            'total_trades': len(trades),
+            'closed_trades': stats.count,
+            'open_trades': len(trades) - stats.count,
+            'win_rate': stats.win_rate,
+            'profit_factor': stats.profit_factor,
+            'total_pnl': stats.total_pnl,
+            'final_balance': stats.balance,
+            'max_drawdown': stats.max_drawdown,
+            'max_drawdown_percent': stats.max_drawdown_percent,
+            'sharpe_ratio': stats.sharpe_ratio,
+            'sortino_ratio': stats.sortino_ratio,
+        }
@@ -0,0 +1,138 @@
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from services.strategy import DEFAULT_PARAMS, StrategyParams
+
+OHLCV_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+
+def stack_candles(frames: Sequence[pd.DataFrame], bars: int) -> Dict[str, np.ndarray]:
+    """Right-align the newest `bars` candles of each frame into (symbols x bars) arrays.
+
+    Shorter histories are padded with NaN on the left, which every indicator
+    below treats like pandas treats rows before the first candle.
+    """
+    stacked = {column: np.full((len(frames), bars), np.nan) for column in OHLCV_COLUMNS}
+    for row, df in enumerate(frames):
+        tail = df.iloc[-bars:]
+        for column in OHLCV_COLUMNS:
+            stacked[column][row, bars - len(tail):] = tail[column].to_numpy(dtype=float)
+    return stacked
+
+
+def _rolling(values: np.ndarray, window: int, reduce) -> np.ndarray:
+    """Rolling reduction along the bar axis; NaN until a full window (like pandas)"""
+    out = np.full(values.shape, np.nan)
+    if values.shape[1] >= window:
+        out[:, window - 1:] = reduce(sliding_window_view(values, window, axis=1), axis=-1)
+    return out
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    return _rolling(values, window, np.mean)
+
+
+def rolling_std(values: np.ndarray, window: int) -> np.ndarray:
+    return _rolling(values, window, lambda w, axis: np.std(w, axis=axis, ddof=1))
+
+
+def rolling_max(values: np.ndarray, window: int) -> np.ndarray:
+    return _rolling(values, window, np.max)
+
+
+def rolling_min(values: np.ndarray, window: int) -> np.ndarray:
+    return _rolling(values, window, np.min)
+
+
+def ema(values: np.ndarray, span: int) -> np.ndarray:
+    """ewm(span, adjust=False).mean() per row, starting at each row's first value"""
+    alpha = 2.0 / (span + 1)
+    out = np.empty(values.shape)
+    state = np.full(values.shape[0], np.nan)
+    for i in range(values.shape[1]):
+        x = values[:, i]
+        state = np.where(np.isnan(state), x, np.where(np.isnan(x), state, alpha * x + (1 - alpha) * state))
+        out[:, i] = state
+    return out
+
+
+def diff(values: np.ndarray) -> np.ndarray:
+    out = np.full(values.shape, np.nan)
+    out[:, 1:] = values[:, 1:] - values[:, :-1]
+    return out
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    prev_close = np.full(close.shape, np.nan)
+    prev_close[:, 1:] = close[:, :-1]
+    # fmax skips NaN like DataFrame.max(axis=1), so the first bar is high - low
+    return np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+
+
+def batch_indicators(candles: Dict[str, np.ndarray], params: StrategyParams = DEFAULT_PARAMS) -> Dict[str, np.ndarray]:
+    """TechnicalIndicators.add_all_indicators for many symbols at once.
+
+    Takes the (symbols x bars) arrays from stack_candles and returns arrays of
+    the same shape under the same column names, so row i equals running the
+    pandas implementation on symbol i alone.
+    """
+    high, low, close, volume = candles['high'], candles['low'], candles['close'], candles['volume']
+    out: Dict[str, np.ndarray] = {}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        delta = diff(close)
+        # pandas turns the first bar's NaN delta into 0; padding bars stay NaN
+        padding = np.isnan(close)
+        gain = rolling_mean(np.where(padding, np.nan, np.where(delta > 0, delta, 0.0)), params.rsi_period)
+        loss = rolling_mean(np.where(padding, np.nan, np.where(delta < 0, -delta, 0.0)), params.rsi_period)
+        out['rsi'] = 100 - (100 / (1 + gain / loss))
+
+        out['macd'] = ema(close, params.macd_fast) - ema(close, params.macd_slow)
+        out['macd_signal'] = ema(out['macd'], params.macd_signal)
+        out['macd_histogram'] = out['macd'] - out['macd_signal']
+
+        out['bb_middle'] = rolling_mean(close, params.bb_period)
+        bb_std = rolling_std(close, params.bb_period)
+        out['bb_upper'] = out['bb_middle'] + bb_std * params.bb_std
+        out['bb_lower'] = out['bb_middle'] - bb_std * params.bb_std
+        out['bb_high'] = out['bb_upper']
+        out['bb_low'] = out['bb_lower']
+
+        for period in sorted({params.sma_short, params.sma_long}):
+            out[f'sma_{period}'] = rolling_mean(close, period)
+
+        plus_dm = diff(high)
+        minus_dm = diff(low)
+        plus_dm[plus_dm < 0] = 0
+        minus_dm[minus_dm > 0] = 0
+        minus_dm = np.abs(minus_dm)
+        tr = true_range(high, low, close)
+        adx_atr = rolling_mean(tr, params.adx_period)
+        plus_di = 100 * (rolling_mean(plus_dm, params.adx_period) / adx_atr)
+        minus_di = 100 * (rolling_mean(minus_dm, params.adx_period) / adx_atr)
+        dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+        out['adx'] = rolling_mean(dx, params.adx_period)
+        out['atr'] = rolling_mean(tr, params.atr_period)
+
+        out['volume_ma'] = rolling_mean(volume, 20)
+        out['support'] = rolling_min(low, 50)
+        out['resistance'] = rolling_max(high, 50)
+    return out
+
+
+def indicator_frames(frames: Sequence[pd.DataFrame], bars: int,
+                     params: StrategyParams = DEFAULT_PARAMS) -> List[pd.DataFrame]:
+    """Each frame's newest `bars` candles with indicator columns, computed as one batch"""
+    if not frames:
+        return []
+    indicators = batch_indicators(stack_candles(frames, bars), params)
+    result = []
+    for row, df in enumerate(frames):
+        tail = df.iloc[-bars:]
+        offset = bars - len(tail)
+        columns = pd.DataFrame({column: values[row, offset:] for column, values in indicators.items()},
+                               index=tail.index)
+        result.append(pd.concat([tail, columns], axis=1))
+    return result
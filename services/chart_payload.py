@@ -0,0 +1,177 @@
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Dict, List, Mapping
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib encoder is used instead
+    orjson = None
+
+CANDLE_COLUMNS = ('open', 'high', 'low', 'close')
+
+# Price chart layout; only the title changes between payloads
+CHART_LAYOUT = {
+    'template': 'plotly_dark',
+    'font': {'size': 16, 'color': '#e0e0e0', 'family': 'Arial'},
+    'plot_bgcolor': 'rgba(0,0,0,0.3)',
+    'paper_bgcolor': 'rgba(0,0,0,0.5)',
+    'xaxis': {
+        'title': {'text': '<b>Fecha</b>', 'font': {'color': '#e0e0e0'}},
+        'rangeslider': {
+            'visible': True,
+            'thickness': 0.1,
+            'bgcolor': 'rgba(0,0,0,0.3)',
+            'bordercolor': 'rgba(255, 255, 255, 0.1)'
+        },
+        'type': 'date',
+        'gridcolor': 'rgba(255, 255, 255, 0.1)',
+        'showline': True,
+        'linecolor': 'rgba(255, 255, 255, 0.3)',
+        'mirror': True,
+        'tickfont': {'color': '#a0a0a0'},
+        'zerolinecolor': 'rgba(255, 255, 255, 0.1)'
+    },
+    'yaxis': {
+        'title': {'text': '<b>Precio (USDT)</b>', 'font': {'color': '#e0a0a0'}},
+        'gridcolor': 'rgba(255, 255, 255, 0.08)',
+        'showline': True,
+        'linecolor': 'rgba(255, 255, 255, 0.2)',
+        'mirror': True,
+        'tickfont': {'color': '#a0a0a0'}
+    },
+    'showlegend': True,
+    'legend': {
+        'orientation': 'h',
+        'yanchor': 'bottom',
+        'y': 1.02,
+        'xanchor': 'right',
+        'x': 1,
+        'bgcolor': 'rgba(0,0,0,0.7)',
+        'font': {'color': 'white'}
+    },
+    'height': 700,
+    'margin': {'l': 60, 'r': 30, 't': 100, 'b': 60},
+    'hovermode': 'x unified',
+    'hoverlabel': {
+        'bgcolor': 'rgba(0,0,0,0.9)',
+        'font_size': 12,
+        'font_color': 'white'
+    }
+}
+
+CANDLE_STYLE = {
+    'type': 'candlestick',
+    'name': 'Precio',
+    'yaxis': 'y2',
+    'increasing': {'line': {'color': '#00C853'}},
+    'decreasing': {'line': {'color': '#FF3D00'}}
+}
+
+# Horizontal price levels of the active trade (keys of stop_loss_info)
+LEVEL_STYLES = {
+    'stop_loss': {'name': 'Stop Loss', 'line': {'color': 'rgba(255, 0, 0, 0.7)', 'width': 2, 'dash': 'dash'}},
+    'take_profit': {'name': 'Take Profit', 'line': {'color': 'rgba(0, 200, 0, 0.7)', 'width': 2, 'dash': 'dash'}},
+    'entry_price': {'name': 'Precio de Entrada',
+                    'line': {'color': 'rgba(255, 165, 0, 0.7)', 'width': 2, 'dash': 'solid'}},
+}
+
+
+def level_shapes(stop_loss_info: Mapping[str, Any]) -> List[Dict[str, Any]]:
+    """SL/TP/entry levels of the active trade as full-width horizontal line shapes"""
+    if not stop_loss_info.get('active'):
+        return []
+    return [{
+        'type': 'line',
+        'xref': 'paper',
+        'x0': 0,
+        'x1': 1,
+        'yref': 'y2',
+        'y0': stop_loss_info[level],
+        'y1': stop_loss_info[level],
+        'line': style['line'],
+    } for level, style in LEVEL_STYLES.items()]
+
+
+class CandleTrace(dict):
+    """The chart's candlestick trace, keeping the frame's columns as arrays for compact_graph()"""
+
+    def __init__(self, df: pd.DataFrame):
+        index = df.index.tz_localize(None) if df.index.tz is not None else df.index  # as drawn: wall time
+        self.columns = {
+            'time': index.values.astype('datetime64[ms]').astype(np.int64),
+            **{column: df[column].fillna(0).to_numpy(dtype=float) for column in CANDLE_COLUMNS},
+        }
+        super().__init__(
+            CANDLE_STYLE,
+            x=index.strftime('%Y-%m-%d %H:%M:%S').tolist(),
+            **{column: self.columns[column].round(8).tolist() for column in CANDLE_COLUMNS},
+        )
+
+
+def chart_config() -> Dict[str, Any]:
+    """Static chart settings, fetched once by clients of the compact payload"""
+    return {'layout': CHART_LAYOUT, 'candles': CANDLE_STYLE, 'levels': LEVEL_STYLES}
+
+
+def encode_array(values: np.ndarray) -> str:
+    """Base64 of the values as little-endian float64 (a JS Float64Array)"""
+    return base64.b64encode(np.ascontiguousarray(values, dtype='<f8').tobytes()).decode('ascii')
+
+
+def compact_graph(graph: Mapping[str, Any], stop_loss_info: Mapping[str, Any]) -> Dict[str, Any]:
+    """The compact form of a full /api/data graph.
+
+    Candle columns become base64 Float64Arrays and times epoch milliseconds
+    (the chart's naive timestamps read as UTC, exact in a float64), encoded
+    straight from the frame's arrays when the trace is a CandleTrace; the
+    SL/TP/entry shapes become bare price levels, and the layout is reduced
+    to its title, the rest being in chart_config().
+    """
+    data = graph.get('data') or []
+    compact = {
+        'format': 'compact',
+        'title': (graph.get('layout') or {}).get('title', {}).get('text', ''),
+        'candles': None,
+        'levels': {},
+    }
+    if data:
+        trace = data[0]
+        columns = getattr(trace, 'columns', None)
+        if columns is None:  # a trace without its frame columns, e.g. read back from JSON
+            columns = {
+                'time': np.array(trace['x'], dtype='datetime64[ms]').astype(np.int64),
+                **{column: np.asarray(trace[column], dtype=float) for column in CANDLE_COLUMNS},
+            }
+        compact['candles'] = {
+            'length': len(columns['time']),
+            **{name: encode_array(values) for name, values in columns.items()},
+        }
+    if stop_loss_info.get('active'):
+        compact['levels'] = {name: stop_loss_info[name] for name in LEVEL_STYLES}
+    return compact
+
+
+def compact_payload(payload: Mapping[str, Any]) -> Dict[str, Any]:
+    """A full /api/data payload with its graph in compact form"""
+    return {**payload, 'graph': compact_graph(payload.get('graph') or {}, payload.get('stop_loss_info') or {})}
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    """Compact JSON bytes, through orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=_default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
@@ -0,0 +1,206 @@
+import math
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import EXECUTION_TAKER_FEE, EXECUTION_MAKER_FEE, EXECUTION_SLIPPAGE_BPS, EXECUTION_PARTICIPATION
+from models.trade_store import TradeStore, STATUSES
+from services.trigger_index import TriggerIndex
+
+# Ticks scanned at once while nothing is pending and no level is near
+SCAN_CHUNK = 4096
+
+
+@dataclass(frozen=True)
+class ExecutionCosts:
+    taker_fee: float = EXECUTION_TAKER_FEE
+    maker_fee: float = EXECUTION_MAKER_FEE
+    slippage_bps: float = EXECUTION_SLIPPAGE_BPS
+    participation: float = EXECUTION_PARTICIPATION
+
+    def market_price(self, price: float, buying: bool) -> float:
+        """Fill price of a market (or stop) order at `price`, after adverse slippage"""
+        return price * (1 + self.slippage_bps / 1e4 * (1 if buying else -1))
+
+    def exit_fill(self, is_buy: bool, price: float, level: float, is_stop: bool) -> Tuple[float, float]:
+        """(fill price, fee rate) closing a position whose stop loss or take profit
+        `level` was reached, when the market trades at `price`.
+
+        A price at or beyond the level fills there: the stop as a market order,
+        gap and slippage included, the take profit as a limit order at a price
+        at least as good as its level. A level only touched inside the range
+        since the last check fills at the level itself.
+        """
+        reached = (price - level) * (1 if is_buy else -1)
+        fill = price if (reached <= 0 if is_stop else reached >= 0) else level
+        if is_stop:
+            return self.market_price(fill, buying=not is_buy), self.taker_fee
+        return fill, self.maker_fee
+
+
+def bars_to_ticks(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Approximate the trades inside OHLCV bars as four ticks per bar.
+
+    Rising bars are walked open -> low -> high -> close and falling bars
+    open -> high -> low -> close, each tick carrying a quarter of the bar's
+    volume and spaced a quarter of the bar apart. Returns (times, prices,
+    volumes) with datetime64[us] times.
+    """
+    o, h, l, c, v = (df[column].to_numpy(dtype=float) for column in ('open', 'high', 'low', 'close', 'volume'))
+    rising = c >= o
+    prices = np.column_stack([o, np.where(rising, l, h), np.where(rising, h, l), c]).ravel()
+    opens = df.index.to_numpy().astype('datetime64[us]')
+    if len(opens) > 1:
+        step = np.median(np.diff(opens)) // 4
+    else:
+        step = np.timedelta64(15, 's')
+    times = (opens[:, None] + step * np.arange(4)).ravel()
+    return times, prices, np.repeat(v / 4, 4)
+
+
+def _next_active(prices: np.ndarray, i: int, stop: int, lower: float, upper: float) -> int:
+    """First tick in [i, stop) at or beyond a trigger band edge, else stop"""
+    if lower == -math.inf and upper == math.inf:
+        return stop
+    chunk = SCAN_CHUNK
+    while i < stop:
+        end = min(i + chunk, stop)
+        segment = prices[i:end]
+        hits = np.flatnonzero((segment <= lower) | (segment >= upper))
+        if len(hits):
+            return i + int(hits[0])
+        i = end
+        chunk *= 2
+    return stop
+
+
+class ExecutionSimulator:
+    """Replays planned trades against a tick stream with realistic fills.
+
+    Entries are market orders filled from the first tick at or after their
+    submission time. Once fully entered, stop losses and take profits are
+    watched through a TriggerIndex: a stop becomes a market order filled at
+    the triggering tick's price (so gaps are paid in full) and a take profit
+    a limit order filled at that price, never worse than its level. Market
+    fills pay slippage and the taker fee, limit fills the maker fee, and
+    with a participation rate each tick fills at most that share of its
+    volume, leaving the rest for the following ticks. Stretches where
+    nothing is pending are skipped with vectorized scans over the prices.
+    """
+
+    def __init__(self, costs: ExecutionCosts = ExecutionCosts()):
+        self.costs = costs
+
+    def run(self, trades: TradeStore, times: np.ndarray, prices: np.ndarray,
+            volumes: Optional[np.ndarray] = None, submit_times: Optional[np.ndarray] = None) -> TradeStore:
+        """Fill `trades` (side, size, stop_loss, take_profit; submitted at
+        submit_times, default entry_time) and return them as executed"""
+        costs = self.costs
+        plan = trades.data
+        n = len(plan)
+        times = np.asarray(times).astype('datetime64[us]')
+        prices = np.asarray(prices, dtype=float)
+        limited = costs.participation > 0 and volumes is not None
+        capacity = np.asarray(volumes, dtype=float) * costs.participation if limited else None
+        slip = costs.slippage_bps / 1e4
+
+        submit = plan['entry_time'] if submit_times is None else np.asarray(submit_times).astype('datetime64[us]')
+        queue = np.argsort(submit, kind='stable')
+        first_tick = np.searchsorted(times, submit[queue], side='left')
+
+        direction = plan['side'].astype(float)
+        size = plan['size']
+        entered = np.zeros(n)
+        entry_value = np.zeros(n)
+        exited = np.zeros(n)
+        exit_value = np.zeros(n)
+        fees = np.zeros(n)
+        entry_tick = np.full(n, -1)
+        exit_tick = np.full(n, -1)
+        # k -> (level, is_stop) for positions whose exit is being filled
+        exiting = {}
+        entering = deque()
+        index = TriggerIndex()
+        next_order = 0
+        n_ticks = len(prices)
+        i = int(first_tick[0]) if n else n_ticks
+
+        while i < n_ticks:
+            if not entering and not exiting:
+                upcoming = int(first_tick[next_order]) if next_order < n else n_ticks
+                i = max(i, _next_active(prices, i, upcoming, *index.band())) if len(index) else max(i, upcoming)
+                if i >= n_ticks:
+                    break
+            price = prices[i]
+            available = capacity[i] if limited else math.inf
+            while next_order < n and first_tick[next_order] <= i:
+                entering.append(int(queue[next_order]))
+                next_order += 1
+
+            for trade_id, level, reason in index.triggered(price):
+                index.remove(trade_id)
+                exiting[int(trade_id)] = (level, reason == 'stop_loss')
+            for k in list(exiting):
+                if available <= 0:
+                    break
+                level, is_stop = exiting[k]
+                if is_stop:
+                    fill_price, fee_rate = price * (1 - slip * direction[k]), costs.taker_fee
+                elif (price - level) * direction[k] >= 0:
+                    fill_price, fee_rate = price, costs.maker_fee
+                else:  # price moved back through the limit
+                    continue
+                quantity = min(entered[k] - exited[k], available)
+                available -= quantity
+                exited[k] += quantity
+                exit_value[k] += quantity * fill_price
+                fees[k] += quantity * fill_price * fee_rate
+                if entered[k] - exited[k] <= 1e-12 * entered[k]:
+                    exit_tick[k] = i
+                    del exiting[k]
+
+            while entering and available > 0:
+                k = entering[0]
+                fill_price = price * (1 + slip * direction[k])
+                quantity = min(size[k] - entered[k], available)
+                available -= quantity
+                if entry_tick[k] < 0:
+                    entry_tick[k] = i
+                entered[k] += quantity
+                entry_value[k] += quantity * fill_price
+                fees[k] += quantity * fill_price * costs.taker_fee
+                if size[k] - entered[k] <= 1e-12 * size[k]:
+                    entering.popleft()
+                    index.add(str(k), direction[k] > 0, entry_value[k] / entered[k], entered[k],
+                              plan['stop_loss'][k], plan['take_profit'][k])
+            i += 1
+
+        return self._executed(trades, times, entered, entry_value, exited, exit_value, fees, entry_tick, exit_tick)
+
+    @staticmethod
+    def _executed(trades: TradeStore, times, entered, entry_value, exited, exit_value, fees,
+                  entry_tick, exit_tick) -> TradeStore:
+        plan = trades.data
+        closed = exit_tick >= 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            entry_price = np.where(entered > 0, entry_value / entered, np.nan)
+            exit_price = np.where(closed, exit_value / exited, np.nan)
+            pnl = np.where(closed, (exit_value - entry_value) * plan['side'] - fees, np.nan)
+            pnl_percent = pnl / entry_value * 100
+
+        executed = trades.filter()
+        data = executed.data
+        data['size'] = entered
+        data['entry_price'] = entry_price
+        data['exit_price'] = exit_price
+        data['entry_time'] = np.where(entry_tick >= 0, times[np.maximum(entry_tick, 0)], np.datetime64('NaT'))
+        data['exit_time'] = np.where(closed, times[np.maximum(exit_tick, 0)], np.datetime64('NaT'))
+        data['pnl'] = pnl
+        data['pnl_percent'] = pnl_percent
+        data['fees'] = fees
+        data['status'] = np.where(closed, STATUSES.index('closed'),
+                                  np.where(entered > 0, STATUSES.index('open'), STATUSES.index('cancelled')))
+        return executed
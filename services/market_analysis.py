@@ -9,6 +9,15 @@ from config import (
     CRISIS_SENTIMENT_THRESHOLD
 )
 
+# Regime labels of context_series(), in priority order
+REGIMES = ('crisis', 'sideways', 'weak_trend', 'bullish', 'bearish', 'neutral')
+# Bit i of context_series()['reasons'] stands for REGIME_REASONS[i]
+REGIME_REASONS = (
+    'ADX bajo', 'Rango de precios estrecho', 'Volatilidad baja', 'Consolidación en MA',
+    'Alta volatilidad', 'Sentimiento negativo', 'Caída rápida de precios', 'Volumen alto con caída de precios',
+    'Tendencia débil',
+)
+
 class MarketAnalyzer:
     
     @staticmethod
@@ -102,14 +111,15 @@ class MarketAnalyzer:
             return {'is_sideways': False, 'confidence': 0, 'reasons': [str(e)]}
     
     @staticmethod
-    def calculate_volatility(df: pd.DataFrame, period: int = 20) -> Dict[str, float]:
-        """Calculate market volatility metrics"""
+    def calculate_volatility(df: pd.DataFrame, period: int = 20, returns: pd.Series = None) -> Dict[str, float]:
+        """Calculate market volatility metrics (returns: df['close'].pct_change(), if already computed)"""
         try:
             if len(df) < period:
                 return {'current_volatility': 0, 'avg_volatility': 0, 'volatility_ratio': 1}
             
             # Calculate rolling volatility
-            returns = df['close'].pct_change()
+            if returns is None:
+                returns = df['close'].pct_change()
             current_vol = returns.tail(period).std() * np.sqrt(252)  # Annualized
             avg_vol = returns.rolling(period).std().mean() * np.sqrt(252)
             
@@ -126,9 +136,16 @@ class MarketAnalyzer:
             return {'current_volatility': 0, 'avg_volatility': 0, 'volatility_ratio': 1}
     
     @staticmethod
-    def detect_crisis_conditions(df: pd.DataFrame, sentiment_score: float = 0) -> Dict[str, any]:
-        """Detect crisis market conditions"""
+    def detect_crisis_conditions(df: pd.DataFrame, sentiment_score: float = 0, volatility: Dict = None,
+                                 returns: pd.Series = None) -> Dict[str, any]:
+        """Detect crisis market conditions
+
+        sentiment_score may also be a live aggregate (e.g. DecayedSentiment),
+        read once here via float(). volatility and returns are reused when
+        the caller already computed them.
+        """
         try:
+            sentiment_score = float(sentiment_score)
             if df.empty:
                 return {'is_crisis': False, 'confidence': 0, 'reasons': []}
             
@@ -136,7 +153,10 @@ class MarketAnalyzer:
             confidence = 0
             
             # Check volatility spike
-            volatility = MarketAnalyzer.calculate_volatility(df)
+            if returns is None:
+                returns = df['close'].pct_change()
+            if volatility is None:
+                volatility = MarketAnalyzer.calculate_volatility(df, returns=returns)
             if volatility['volatility_ratio'] > 2.0:
                 reasons.append(f"Alta volatilidad ({volatility['current_volatility']:.2%})")
                 confidence += 0.3
@@ -147,7 +167,7 @@ class MarketAnalyzer:
                 confidence += 0.3
             
             # Check rapid price decline
-            recent_returns = df['close'].pct_change().tail(5)
+            recent_returns = returns.tail(5)
             if recent_returns.min() < -0.05:  # 5% decline in 5 periods
                 reasons.append("Caída rápida de precios")
                 confidence += 0.4
@@ -175,11 +195,16 @@ class MarketAnalyzer:
     
     @staticmethod
     def get_market_context(df: pd.DataFrame, sentiment_score: float = 0) -> Dict[str, any]:
-        """Get comprehensive market context"""
+        """Get comprehensive market context
+
+        Recomputes everything from df; services.market_context keeps the same
+        context incrementally for a polled symbol/timeframe.
+        """
         trend = MarketAnalyzer.analyze_trend(df)
         sideways = MarketAnalyzer.detect_sideways_market(df)
-        volatility = MarketAnalyzer.calculate_volatility(df)
-        crisis = MarketAnalyzer.detect_crisis_conditions(df, sentiment_score)
+        returns = df['close'].pct_change()
+        volatility = MarketAnalyzer.calculate_volatility(df, returns=returns)
+        crisis = MarketAnalyzer.detect_crisis_conditions(df, sentiment_score, volatility, returns)
         
         # Determine trading recommendation
         blocked_reasons = []
@@ -201,4 +226,126 @@ class MarketAnalyzer:
             'market_status': 'normal' if not blocked_reasons else 'blocked',
             'blocked_reasons': blocked_reasons,
             'can_trade': len(blocked_reasons) == 0
-        }
\ No newline at end of file
+        }
+    
+    @staticmethod
+    def context_series(df: pd.DataFrame, sentiment_score=0.0, lookback: int = 200,
+                       sideways_atr_threshold: float = SIDEWAYS_ATR_THRESHOLD,
+                       sideways_adx_threshold: float = SIDEWAYS_ADX_THRESHOLD,
+                       sideways_min_bars: int = SIDEWAYS_MIN_BARS,
+                       crisis_sentiment_threshold: float = CRISIS_SENTIMENT_THRESHOLD,
+                       sma_column: str = 'sma_20', volatility_period: int = 20,
+                       trend_column: str = 'sma_50') -> pd.DataFrame:
+        """Vectorized get_market_context() for every bar of df.
+
+        Row i holds what get_market_context() reports for the `lookback`
+        candles ending at bar i, so a whole history is classified in a few
+        rolling passes instead of one call per bar. sentiment_score may be a
+        scalar or a Series aligned with df.
+
+        Each bar also gets a regime label (REGIMES, first that applies:
+        crisis, sideways, weak trend, then the SMA trend direction), its
+        confidence (the crisis or sideways confidence; for trends ADX / 50,
+        for a weak trend 1 - ADX / 20) and the blocked reasons as a bit mask
+        over REGIME_REASONS (see decode_reasons).
+        """
+        close = df['close']
+        n = sideways_min_bars
+        
+        # Sideways: same four checks as detect_sideways_market, over the last n bars
+        close_mean = close.rolling(n, min_periods=1).mean()
+        avg_adx = df['adx'].rolling(n, min_periods=1).mean()
+        price_range = (df['high'].rolling(n, min_periods=1).max() - df['low'].rolling(n, min_periods=1).min()) / close_mean
+        atr_ratio = df['atr'].rolling(n, min_periods=1).mean() / close_mean
+        consolidating = df[sma_column].rolling(n, min_periods=2).std() < close.rolling(n, min_periods=2).std() * 0.5
+        sideways_reasons = ((avg_adx < sideways_adx_threshold).astype(int)
+                            + (price_range < sideways_atr_threshold).astype(int)
+                            + (atr_ratio < sideways_atr_threshold).astype(int)
+                            + consolidating.astype(int))
+        enough_bars = np.arange(len(df)) >= n - 1
+        is_sideways = (sideways_reasons >= 2) & enough_bars
+        sideways_mask = (1 * (avg_adx < sideways_adx_threshold) + 2 * (price_range < sideways_atr_threshold)
+                         + 4 * (atr_ratio < sideways_atr_threshold) + 8 * consolidating)
+        
+        # Volatility: the window's first return is NaN, so its rolling std
+        # covers the last (lookback - period) values of the period-std series
+        returns = close.pct_change()
+        rolling_vol = returns.rolling(volatility_period).std() * np.sqrt(252)
+        avg_vol = rolling_vol.rolling(max(lookback - volatility_period, 1), min_periods=1).mean()
+        volatility_ratio = (rolling_vol / avg_vol).where(avg_vol > 0, 1.0)
+        volatility_ratio[np.arange(len(df)) < volatility_period - 1] = 1.0
+        
+        # Crisis: same weights as detect_crisis_conditions
+        recent_min_return = returns.rolling(5, min_periods=1).min()
+        volume_spike = df['volume'].rolling(5, min_periods=1).max() > df['volume'].rolling(20, min_periods=1).mean() * 2
+        sentiment = pd.Series(sentiment_score, index=df.index, dtype=float) if np.isscalar(sentiment_score) \
+            else pd.Series(sentiment_score, dtype=float).reindex(df.index)
+        crisis_checks = (volatility_ratio > 2.0, sentiment < crisis_sentiment_threshold,
+                         recent_min_return < -0.05, volume_spike & (recent_min_return < -0.03))
+        crisis_confidence = sum(weight * check for weight, check in zip((0.3, 0.3, 0.4, 0.3), crisis_checks))
+        is_crisis = crisis_confidence > 0.5
+        crisis_mask = sum((16 << i) * check for i, check in enumerate(crisis_checks))
+        
+        adx = df['adx']
+        weak_trend = adx < 20
+        
+        # Regime: the same precedence the dashboard shows (crisis, sideways, weak trend, direction)
+        short, long_ = df[sma_column].to_numpy(dtype=float), df[trend_column].to_numpy(dtype=float)
+        sideways_confidence = (sideways_reasons / 3.0).clip(upper=1.0).where(enough_bars, 0.0)
+        codes = np.select(
+            [is_crisis, is_sideways, weak_trend, short > long_, short < long_],
+            [0, 1, 2, 3, 4], default=5
+        )
+        trend_confidence = (adx / 50).clip(0.0, 1.0)
+        confidence = np.select(
+            [is_crisis, is_sideways, weak_trend],
+            [crisis_confidence.clip(upper=1.0), sideways_confidence, (1 - adx / 20).clip(0.0, 1.0)],
+            default=trend_confidence.fillna(0.0)
+        )
+        reasons = (sideways_mask.where(is_sideways, 0) + crisis_mask.where(is_crisis, 0)
+                   + (256 * weak_trend)).astype(np.int64)
+        
+        return pd.DataFrame({
+            'avg_adx': avg_adx,
+            'price_range': price_range,
+            'atr_ratio': atr_ratio,
+            'volatility_ratio': volatility_ratio,
+            'sideways_confidence': sideways_confidence,
+            'is_sideways': is_sideways,
+            'crisis_confidence': crisis_confidence.clip(upper=1.0),
+            'is_crisis': is_crisis,
+            'weak_trend': weak_trend,
+            'can_trade': ~(is_sideways | is_crisis | weak_trend),
+            'regime': pd.Categorical.from_codes(codes, REGIMES),
+            'confidence': confidence,
+            'reasons': reasons,
+        }, index=df.index)
+
+    @staticmethod
+    def decode_reasons(mask: int) -> List[str]:
+        """REGIME_REASONS set in a context_series() reasons mask"""
+        return [reason for i, reason in enumerate(REGIME_REASONS) if mask >> i & 1]
+
+    @staticmethod
+    def regime_bands(context: pd.DataFrame) -> List[Dict[str, any]]:
+        """Runs of consecutive bars with the same regime in a context_series() frame.
+
+        Each band has its first and last bar time, bar count, mean
+        confidence and every reason seen in it, e.g. for chart overlays.
+        """
+        if context.empty:
+            return []
+        codes = context['regime'].cat.codes.to_numpy()
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(codes)) + 1))
+        ends = np.append(starts[1:], len(codes))
+        confidence = np.add.reduceat(context['confidence'].to_numpy(dtype=float), starts) / (ends - starts)
+        reasons = np.bitwise_or.reduceat(context['reasons'].to_numpy(), starts)
+        index = context.index
+        return [{
+            'regime': REGIMES[codes[start]],
+            'start': index[start],
+            'end': index[end - 1],
+            'bars': int(end - start),
+            'confidence': round(float(confidence[i]), 4),
+            'reasons': MarketAnalyzer.decode_reasons(int(reasons[i])),
+        } for i, (start, end) in enumerate(zip(starts, ends))]
@@ -0,0 +1,219 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    SIDEWAYS_ATR_THRESHOLD, SIDEWAYS_ADX_THRESHOLD, SIDEWAYS_MIN_BARS, CRISIS_SENTIMENT_THRESHOLD
+)
+from services.market_analysis import MarketAnalyzer
+from services.streaming_indicators import RollingStats, RollingExtreme
+
+NAN = float('nan')
+
+# Columns a candle contributes to the context
+CONTEXT_COLUMNS = ['close', 'high', 'low', 'volume', 'adx', 'atr', 'sma_20']
+
+
+class MarketContextEngine:
+    """MarketAnalyzer.get_market_context() for one symbol/timeframe, in O(1) per candle.
+
+    Works like StreamingIndicators: closed candles are committed to rolling
+    windows (the sideways window, returns and their rolling volatility, the
+    crisis windows) and the last, still forming candle is only previewed, so
+    a poll costs a handful of window updates instead of rescanning the frame.
+    Returns and the rolling volatility are computed once and shared by the
+    volatility and crisis checks. The trend, sideways and volatility analysis
+    is memoized per forming candle, so re-reading an unchanged frame only
+    re-applies the crisis rules for the current sentiment score.
+
+    The average volatility spans the whole frame like calculate_volatility(),
+    so the engine reseeds when the frame length changes.
+    """
+
+    def __init__(self, sideways_min_bars: int = SIDEWAYS_MIN_BARS, volatility_period: int = 20):
+        self.sideways_min_bars = sideways_min_bars
+        self.volatility_period = volatility_period
+        self._lock = threading.Lock()
+        self.reset(0)
+
+    def reset(self, length: int) -> None:
+        """Drop all state; `length` is the frame length the engine follows"""
+        n = self.sideways_min_bars
+        self.length = length
+        self._adx = RollingStats(n)
+        self._atr = RollingStats(n)
+        self._close = RollingStats(n)
+        self._sma = RollingStats(n)
+        self._high = RollingExtreme(n, 'max')
+        self._low = RollingExtreme(n, 'min')
+        self._volatility = RollingStats(self.volatility_period)
+        self._avg_volatility = RollingStats(max(length - self.volatility_period, 1))
+        self._min_return = RollingExtreme(5, 'min')
+        self._max_volume = RollingExtreme(5, 'max')
+        self._volume = RollingStats(20)
+        self._prev_close = NAN
+        self._pending: Optional[Tuple] = None  # (timestamp, *CONTEXT_COLUMNS)
+        self._memo_key = None
+        self._memo: Optional[Dict] = None
+
+    @property
+    def last_timestamp(self):
+        """Timestamp of the most recent (possibly forming) candle"""
+        return self._pending[0] if self._pending else None
+
+    def _bar(self, bar: Tuple, commit: bool) -> Dict[str, float]:
+        """Window statistics with this bar as the newest, advancing state when commit"""
+        _, close, high, low, volume, adx, atr, sma = bar
+        ret = close / self._prev_close - 1 if self._prev_close else NAN
+        close_mean, close_std = self._close.mean_std(close, commit)
+        _, sma_std = self._sma.mean_std(sma, commit)
+        _, current_vol = self._volatility.mean_std(ret, commit)
+        stats = {
+            'avg_adx': self._adx.mean(adx, commit),
+            'atr_mean': self._atr.mean(atr, commit),
+            'close_mean': close_mean,
+            'close_std': close_std,
+            'sma_std': sma_std,
+            'high': self._high.value(high, commit),
+            'low': self._low.value(low, commit),
+            'current_vol': current_vol,
+            'avg_vol': self._avg_volatility.mean(current_vol, commit),
+            'min_return': self._min_return.value(ret, commit),
+            'max_volume': self._max_volume.value(volume, commit),
+            'volume_mean': self._volume.mean(volume, commit),
+        }
+        if commit:
+            self._prev_close = close
+        return stats
+
+    def _sync(self, df: pd.DataFrame) -> None:
+        """Commit the candles of df that closed since the last call"""
+        index = df.index
+        start = None
+        if self._pending is not None and len(df) == self.length:
+            position = int(index.searchsorted(self._pending[0]))
+            if position < len(index) and index[position] == self._pending[0]:
+                start = position
+        if start is None:
+            self.reset(len(df))
+            start = 0
+        # Column by column: selecting the columns as a frame copies all of df
+        values = np.column_stack([df[column].to_numpy(dtype=float)[start:] for column in CONTEXT_COLUMNS])
+        for i in range(start, len(index)):
+            bar = (index[i], *values[i - start])
+            if self._pending is not None and bar[0] != self._pending[0]:
+                self._bar(self._pending, commit=True)
+            self._pending = bar
+
+    def _analysis(self, df: pd.DataFrame, stats: Dict[str, float]) -> Dict:
+        """The sentiment-free part of the context: trend, sideways and volatility"""
+        # Same rules and messages as MarketAnalyzer.get_market_context
+        trend = MarketAnalyzer.analyze_trend(df)
+
+        reasons = []
+        avg_adx = stats['avg_adx']
+        if avg_adx < SIDEWAYS_ADX_THRESHOLD:
+            reasons.append(f"ADX bajo ({avg_adx:.1f} < {SIDEWAYS_ADX_THRESHOLD})")
+        price_range = (stats['high'] - stats['low']) / stats['close_mean']
+        atr_ratio = stats['atr_mean'] / stats['close_mean']
+        if price_range < SIDEWAYS_ATR_THRESHOLD:
+            reasons.append(f"Rango de precios estrecho ({price_range:.2%})")
+        if atr_ratio < SIDEWAYS_ATR_THRESHOLD:
+            reasons.append(f"Volatilidad baja (ATR ratio: {atr_ratio:.2%})")
+        if stats['sma_std'] < stats['close_std'] * 0.5:
+            reasons.append("Consolidación en MA")
+        sideways = {
+            'is_sideways': len(reasons) >= 2,
+            'confidence': min(len(reasons) / 3.0, 1.0),
+            'reasons': reasons,
+            'avg_adx': float(avg_adx),
+            'price_range': float(price_range),
+            'atr_ratio': float(atr_ratio)
+        }
+
+        current_vol = stats['current_vol'] * np.sqrt(252)
+        avg_vol = stats['avg_vol'] * np.sqrt(252)
+        volatility = {
+            'current_volatility': float(current_vol),
+            'avg_volatility': float(avg_vol),
+            'volatility_ratio': float(current_vol / avg_vol if avg_vol > 0 else 1)
+        }
+        return {'stats': stats, 'trend': trend, 'sideways': sideways, 'volatility': volatility}
+
+    @staticmethod
+    def _context(analysis: Dict, sentiment_score: float) -> Dict:
+        """The context for a sentiment score, from an _analysis() of the frame"""
+        stats, trend = analysis['stats'], analysis['trend']
+        sideways, volatility = analysis['sideways'], analysis['volatility']
+        crisis_reasons: List[str] = []
+        confidence = 0
+        if volatility['volatility_ratio'] > 2.0:
+            crisis_reasons.append(f"Alta volatilidad ({volatility['current_volatility']:.2%})")
+            confidence += 0.3
+        if sentiment_score < CRISIS_SENTIMENT_THRESHOLD:
+            crisis_reasons.append(f"Sentimiento negativo ({sentiment_score:.2f})")
+            confidence += 0.3
+        if stats['min_return'] < -0.05:
+            crisis_reasons.append("Caída rápida de precios")
+            confidence += 0.4
+        if stats['max_volume'] > stats['volume_mean'] * 2 and stats['min_return'] < -0.03:
+            crisis_reasons.append("Volumen alto con caída de precios")
+            confidence += 0.3
+        crisis = {
+            'is_crisis': confidence > 0.5,
+            'confidence': min(confidence, 1.0),
+            'reasons': crisis_reasons,
+            'volatility': volatility,
+            'sentiment_score': sentiment_score
+        }
+
+        blocked_reasons = []
+        if sideways['is_sideways']:
+            blocked_reasons.extend(sideways['reasons'])
+        if crisis['is_crisis']:
+            blocked_reasons.extend(crisis['reasons'])
+        if trend['adx'] < 20:
+            blocked_reasons.append("Tendencia débil")
+
+        return {
+            'trend': trend,
+            'sideways': sideways,
+            'volatility': volatility,
+            'crisis': crisis,
+            'market_status': 'normal' if not blocked_reasons else 'blocked',
+            'blocked_reasons': blocked_reasons,
+            'can_trade': len(blocked_reasons) == 0
+        }
+
+    def get_market_context(self, df: pd.DataFrame, sentiment_score: float = 0) -> Dict:
+        """get_market_context() for a frame of this symbol/timeframe with indicators.
+
+        Frames too short for every window to fill are handed to the stateless
+        MarketAnalyzer.get_market_context().
+        """
+        sentiment_score = float(sentiment_score)
+        if len(df) < max(50, self.sideways_min_bars, self.volatility_period + 2):
+            return MarketAnalyzer.get_market_context(df, sentiment_score)
+        with self._lock:
+            self._sync(df)
+            key = (self._pending, float(df['sma_50'].iat[-1]))
+            if key != self._memo_key:
+                self._memo = self._analysis(df, self._bar(self._pending, commit=False))
+                self._memo_key = key
+            return self._context(self._memo, sentiment_score)
+
+
+_engines: Dict[Tuple[str, str], MarketContextEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_context_engine(symbol: str, timeframe: str) -> MarketContextEngine:
+    """Get (or create) the market context engine for a symbol/timeframe pair"""
+    key = (symbol, timeframe)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = _engines[key] = MarketContextEngine()
+        return engine
@@ -0,0 +1,183 @@
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from config import CANDLE_CLOSE_DELAY, SNAPSHOT_HISTORY
+from utils.helpers import next_candle_close
+
+
+@dataclass(frozen=True)
+class MarketSnapshot:
+    """Immutable, pre-serialized result of one analysis cycle"""
+    version: int
+    created_at: float
+    payload: Mapping[str, Any]
+    body: bytes
+    encodings: Dict[str, bytes] = field(default_factory=dict, compare=False, repr=False)
+
+    def encode(self, name: str, encoder: Callable[[Mapping[str, Any]], bytes]) -> bytes:
+        """Body in another encoding of the payload, computed once per snapshot"""
+        body = self.encodings.get(name)
+        if body is None:
+            body = self.encodings[name] = encoder(self.payload)
+        return body
+
+
+@dataclass
+class PollerTask:
+    name: str
+    func: Callable[[Mapping[str, Any]], Any]
+    interval: float
+    align_to_candle: bool = False
+    publish: bool = False
+    triggers: Tuple[str, ...] = ()
+    wake: threading.Event = field(default_factory=threading.Event)
+    last_run: float = 0.0
+    last_error: Optional[str] = None
+
+
+class MarketDataPoller:
+    """Background scheduler that keeps market data fresh off the request path.
+
+    Each task runs in its own daemon thread on its own cadence; results are
+    kept by task name and passed (read-only) to every task. The result of a
+    publishing task becomes the current MarketSnapshot, serialized once so
+    requests only have to hand out bytes. A failed run keeps the previous
+    snapshot, so the dashboard never waits on upstream health.
+    """
+
+    def __init__(self, timeframe: str, serialize: Callable[[Any], str]):
+        self.timeframe = timeframe
+        self.serialize = serialize
+        self.tasks: Dict[str, PollerTask] = {}
+        self.results: Dict[str, Any] = {}
+        self._snapshot: Optional[MarketSnapshot] = None
+        self._history: deque = deque(maxlen=SNAPSHOT_HISTORY)
+        self._version = 0
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._pid: Optional[int] = None
+        # Versions are only meaningful within one process; the instance id tells them apart
+        self.instance = uuid.uuid4().hex[:8]
+        self._start_lock = threading.Lock()
+
+    def add_task(self, name: str, func: Callable[[Mapping[str, Any]], Any], interval: float,
+                 align_to_candle: bool = False, publish: bool = False,
+                 triggers: Tuple[str, ...] = ()) -> None:
+        """Register a task; align_to_candle also runs it right after each candle close"""
+        self.tasks[name] = PollerTask(name, func, interval, align_to_candle, publish, tuple(triggers))
+
+    def ensure_started(self) -> 'MarketDataPoller':
+        """Start the task threads once per process (threads do not survive a fork)"""
+        if self._pid == os.getpid():
+            return self
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self._stop.clear()
+                self._threads = []
+                if self._pid is not None or self._snapshot is None:
+                    self.instance = uuid.uuid4().hex[:8]
+                for task in self.tasks.values():
+                    thread = threading.Thread(target=self._run_task, args=(task,),
+                                              name=f"poller-{task.name}", daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+                self._pid = os.getpid()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        for task in self.tasks.values():
+            task.wake.set()
+        self._pid = None
+
+    def trigger(self, name: str) -> None:
+        """Run a task as soon as possible"""
+        task = self.tasks.get(name)
+        if task is not None:
+            task.wake.set()
+
+    def _next_delay(self, task: PollerTask) -> float:
+        now = time.time()
+        due = task.last_run + task.interval
+        if task.align_to_candle:
+            due = min(due, next_candle_close(self.timeframe, task.last_run) + CANDLE_CLOSE_DELAY)
+        return max(due - now, 0.0)
+
+    def _run_task(self, task: PollerTask) -> None:
+        while not self._stop.is_set():
+            task.wake.clear()
+            task.last_run = time.time()
+            self.run_once(task.name)
+            task.wake.wait(self._next_delay(task))
+
+    def run_once(self, name: str) -> Any:
+        """Run one task synchronously, storing (and publishing) its result"""
+        task = self.tasks[name]
+        try:
+            result = task.func(MappingProxyType(self.results))
+        except Exception as e:
+            task.last_error = str(e)
+            print(f"[POLLER] Task {name} failed: {e}")
+            return None
+        task.last_error = None
+        self.results[name] = result
+        if task.publish:
+            self.publish(result)
+        for other in task.triggers:
+            self.trigger(other)
+        return result
+
+    def publish(self, payload: Dict[str, Any]) -> MarketSnapshot:
+        """Make payload the current snapshot"""
+        body = self.serialize(payload)
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        with self._condition:
+            self._version += 1
+            self._snapshot = MarketSnapshot(self._version, time.time(), MappingProxyType(payload), body)
+            self._history.append(self._snapshot)
+            self._condition.notify_all()
+            return self._snapshot
+
+    @property
+    def snapshot(self) -> Optional[MarketSnapshot]:
+        return self._snapshot
+
+    def get_snapshot(self, version: int) -> Optional[MarketSnapshot]:
+        """A recent snapshot by version, if still in the history"""
+        for snapshot in reversed(self._history):
+            if snapshot.version == version:
+                return snapshot
+        return None
+
+    def wait_for_snapshot(self, timeout: float = 0.0, after_version: int = 0) -> Optional[MarketSnapshot]:
+        """Current snapshot newer than after_version, waiting up to timeout seconds"""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._snapshot is not None and self._snapshot.version > after_version,
+                timeout=timeout
+            )
+            snapshot = self._snapshot
+        if snapshot is None or snapshot.version <= after_version:
+            return None
+        return snapshot
+
+    def status(self) -> Dict[str, Any]:
+        """Task timings and errors for health reporting"""
+        snapshot = self._snapshot
+        return {
+            'running': self._pid == os.getpid(),
+            'snapshot_version': snapshot.version if snapshot else 0,
+            'snapshot_age': round(time.time() - snapshot.created_at, 3) if snapshot else None,
+            'tasks': {
+                name: {'last_run': task.last_run, 'interval': task.interval, 'last_error': task.last_error}
+                for name, task in self.tasks.items()
+            }
+        }
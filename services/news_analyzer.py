@@ -1,14 +1,18 @@
-import requests
+import bisect
+import hashlib
 import json
+import re
 import pandas as pd
-from datetime import datetime, timedelta
 from typing import Dict, List, Optional
-import yfinance as yf
-from textblob import TextBlob
-import numpy as np
+from config import NEWS_SOURCES, NEWS_REPLAY_FILE, SENTIMENT_BACKEND, SENTIMENT_THRESHOLD
+from services.news_pipeline import NewsPipeline, NewsSource, build_sources
+from services.sentiment import SentimentBackend, get_sentiment_backend, sentiment_label
+from utils.sentiment_cache import get_sentiment_cache
 
 class NewsAnalyzer:
-    def __init__(self):
+    def __init__(self, backend: Optional[SentimentBackend] = None, sources: Optional[List[NewsSource]] = None):
+        # Puntuador intercambiable (ver services/sentiment.py); se carga al primer uso
+        self._backend = backend
         self.news_api_key = None  # Puedes agregar tu API key de Alpha Vantage o NewsAPI
         self.sentiment_threshold = 0.3
         self.crisis_keywords = [
@@ -17,66 +21,119 @@ class NewsAnalyzer:
             'sanctions', 'regulation', 'ban', 'hack', 'scandal',
             'volatility', 'plunge', 'plummet', 'tumble', 'sell-off'
         ]
+        self._compile_crisis_matcher()
+        if sources is None:
+            sources = build_sources(NEWS_SOURCES, NEWS_REPLAY_FILE)
+        self.pipeline = NewsPipeline(sources, self.analyze_sentiments)
+
+    def _compile_crisis_matcher(self):
+        """Un único regex para todas las palabras clave de crisis.
+
+        En cada posición el lookahead encuentra la palabra clave más larga que
+        empieza ahí; las palabras contenidas en ella (p. ej. 'ban' en
+        'bankruptcy') se cuentan a través de `_crisis_implied`, así el
+        resultado es el mismo que buscar cada palabra con `in`.
+        """
+        keywords = sorted({k.lower() for k in self.crisis_keywords}, key=len, reverse=True)
+        self._crisis_pattern = re.compile('(?=(' + '|'.join(map(re.escape, keywords)) + '))')
+        self._crisis_implied = {k: {other for other in keywords if other in k} for k in keywords}
+        # Cambiar palabras clave o umbral invalida los resultados guardados
+        signature = json.dumps([sorted(keywords), self.sentiment_threshold])
+        self._scorer_signature = hashlib.sha1(signature.encode('utf-8')).hexdigest()[:12]
+        self._sentiment_namespace = None
+
+    @property
+    def backend(self) -> SentimentBackend:
+        """Puntuador configurado; TextBlob y los léxicos se cargan aquí y no al importar"""
+        if self._backend is None:
+            self._backend = get_sentiment_backend(SENTIMENT_BACKEND)
+        return self._backend
         
-    def get_crypto_news(self, symbol: str = 'BTC') -> List[Dict]:
-        """Obtiene noticias relevantes de criptomonedas"""
-        try:
-            # Usar yfinance para obtener noticias de criptomonedas
-            ticker = yf.Ticker(f"{symbol}-USD")
-            news = ticker.news
-            
-            formatted_news = []
-            for item in news[:10]:  # Limitar a las 10 noticias más recientes
-                news_item = {
-                    'title': item.get('title', ''),
-                    'summary': item.get('summary', ''),
-                    'published': datetime.fromtimestamp(item.get('providerPublishTime', 0)),
-                    'source': item.get('publisher', ''),
-                    'url': item.get('link', ''),
-                    'sentiment': self.analyze_sentiment(item.get('title', '') + ' ' + item.get('summary', ''))
-                }
-                formatted_news.append(news_item)
-                
-            return formatted_news
-        except Exception as e:
-            print(f"Error obteniendo noticias: {e}")
+    def get_crypto_news(self, symbol: str = 'BTC', refresh: bool = True) -> List[Dict]:
+        """Noticias más recientes y únicas de todas las fuentes, con su sentimiento
+        (refresh=False: solo las ya descargadas, sin consultar las fuentes)"""
+        if refresh:
+            self.pipeline.refresh(symbol)
+        return [item.to_dict() for item in self.pipeline.recent(symbol, 10)]
+
+    def _crisis_scores(self, texts: List[str]) -> List[float]:
+        """Intensidad de crisis de varios textos en una sola pasada del regex"""
+        if not texts:
             return []
-    
+        matched = [set() for _ in texts]
+        # Los textos se unen con saltos de línea (ninguna palabra clave los contiene)
+        lowered = [text.lower() for text in texts]
+        starts = []
+        position = 0
+        for text in lowered:
+            starts.append(position)
+            position += len(text) + 1
+        for match in self._crisis_pattern.finditer('\n'.join(lowered)):
+            index = bisect.bisect_right(starts, match.start()) - 1
+            matched[index] |= self._crisis_implied[match.group(1)]
+        return [len(found) / len(self.crisis_keywords) for found in matched]
+
+    def _result(self, polarity: float, subjectivity: float, crisis_score: float) -> Dict:
+        return {
+            'polarity': polarity,
+            'subjectivity': subjectivity,
+            'is_crisis': crisis_score > 0.1,
+            'crisis_intensity': crisis_score,
+            'sentiment_label': sentiment_label(polarity, self.sentiment_threshold)
+        }
+
+    def _sentiment_key(self, text: str) -> str:
+        if self._sentiment_namespace is None:
+            self._sentiment_namespace = f"{self.backend.name}:{self.backend.version}:{self._scorer_signature}"
+        return hashlib.sha1(f"{self._sentiment_namespace}\0{text}".encode('utf-8')).hexdigest()
+
+    def analyze_sentiments(self, texts: List[str]) -> List[Dict]:
+        """Analiza el sentimiento de varios textos; los ya vistos salen de la caché"""
+        cache = get_sentiment_cache()
+        keys = [self._sentiment_key(text) for text in texts]
+        known = cache.get_many(keys) if cache is not None else {}
+        pending = {}
+        for key, text in zip(keys, texts):
+            if key not in known:
+                pending[key] = text
+        scored = {}
+        if pending:
+            texts_to_score = list(pending.values())
+            try:
+                scores = self.backend.score_batch(texts_to_score)
+            except Exception as e:
+                print(f"Error analizando sentimiento ({self.backend.name}): {e}")
+                scores = []
+            for key, (polarity, subjectivity), crisis_score in zip(
+                    pending, scores, self._crisis_scores(texts_to_score)):
+                scored[key] = self._result(polarity, subjectivity, crisis_score)
+        if cache is not None and scored:
+            cache.put_many(scored)
+        neutral = {'polarity': 0, 'subjectivity': 0, 'is_crisis': False, 'crisis_intensity': 0, 'sentiment_label': 'neutral'}
+        # Los textos que no se pudieron puntuar quedan neutrales y no se guardan
+        return [dict(known.get(key) or scored.get(key) or neutral) for key in keys]
+
     def analyze_sentiment(self, text: str) -> Dict:
         """Analiza el sentimiento de un texto"""
-        try:
-            blob = TextBlob(text)
-            polarity = blob.sentiment.polarity
-            
-            # Detectar crisis
-            crisis_score = sum(1 for keyword in self.crisis_keywords 
-                             if keyword.lower() in text.lower()) / len(self.crisis_keywords)
-            
-            return {
-                'polarity': polarity,
-                'subjectivity': blob.sentiment.subjectivity,
-                'is_crisis': crisis_score > 0.1,
-                'crisis_intensity': crisis_score,
-                'sentiment_label': 'positive' if polarity > self.sentiment_threshold else 
-                                 'negative' if polarity < -self.sentiment_threshold else 'neutral'
-            }
-        except:
-            return {'polarity': 0, 'subjectivity': 0, 'is_crisis': False, 'crisis_intensity': 0, 'sentiment_label': 'neutral'}
+        return self.analyze_sentiments([text])[0]
     
 
     
-    def get_market_context(self, df: pd.DataFrame, symbol: str = 'BTC') -> Dict:
+    def get_market_context(self, df: pd.DataFrame, symbol: str = 'BTC', refresh: bool = True) -> Dict:
         """Obtiene el contexto de noticias y sentimiento del mercado"""
-        news = self.get_crypto_news(symbol)
+        news = self.get_crypto_news(symbol, refresh)
         
         # Analizar noticias recientes
         crisis_alerts = [n for n in news if n['sentiment']['is_crisis']]
-        recent_sentiment = np.mean([n['sentiment']['polarity'] for n in news]) if news else 0
+        # Media ponderada por antigüedad, mantenida de forma incremental por el pipeline
+        sentiment = self.pipeline.sentiment(symbol)
+        recent_sentiment = float(sentiment)
         
         return {
             'news': news[:5],  # Top 5 noticias
             'crisis_alerts': crisis_alerts,
-            'overall_sentiment': 'positive' if recent_sentiment > 0.1 else 'negative' if recent_sentiment < -0.1 else 'neutral',
-            'sentiment_score': float(recent_sentiment),
+            'overall_sentiment': 'positive' if recent_sentiment > SENTIMENT_THRESHOLD else 'negative' if recent_sentiment < -SENTIMENT_THRESHOLD else 'neutral',
+            'sentiment_score': recent_sentiment,
+            'sentiment_tracker': sentiment,
             'crisis_impact': sum(n['sentiment']['crisis_intensity'] for n in crisis_alerts)
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,477 @@
+import json
+import math
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+import requests
+
+from api.http_pool import create_session
+from config import (
+    NEWS_CACHE_TTL, NEWS_ITEMS_PER_SOURCE, NEWS_BATCH_SIZE, NEWS_DUPLICATE_THRESHOLD, NEWS_MAX_AGE,
+    NEWS_SENTIMENT_HALF_LIFE, NEWS_SENTIMENT_PRIOR_WEIGHT, NEWS_REDDIT_SUBREDDITS, TWITTER_BEARER_TOKEN
+)
+from utils.rate_limiter import acquire
+from utils.shared_cache import get_shared_cache
+
+QUOTE_SUFFIXES = ('USDT', 'BUSD', 'USDC', 'USD')
+
+
+def base_asset(symbol: str) -> str:
+    """'BTCUSDT' -> 'BTC'; news is searched by the traded asset"""
+    symbol = symbol.upper()
+    for suffix in QUOTE_SUFFIXES:
+        if symbol.endswith(suffix) and len(symbol) > len(suffix):
+            return symbol[:-len(suffix)]
+    return symbol
+
+
+@dataclass
+class NewsItem:
+    title: str
+    summary: str = ''
+    published: float = 0.0  # epoch seconds
+    source: str = ''  # publisher, subreddit, author...
+    url: str = ''
+    provider: str = ''  # adapter that produced the item
+    id: str = ''
+    sentiment: Optional[Dict] = None
+
+    @property
+    def key(self) -> str:
+        return self.id or self.url or f"{self.provider}:{self.title}"
+
+    @property
+    def text(self) -> str:
+        return self.title + ' ' + self.summary
+
+    def to_dict(self) -> Dict:
+        """Dashboard shape (as NewsAnalyzer always returned it)"""
+        return {
+            'title': self.title,
+            'summary': self.summary,
+            'published': datetime.fromtimestamp(self.published),
+            'source': self.source,
+            'url': self.url,
+            'sentiment': self.sentiment,
+        }
+
+
+class NewsSource:
+    """Adapter for one news provider; fetch() returns the newest items for an asset"""
+
+    name = 'base'
+
+    def fetch(self, asset: str, limit: int) -> List[NewsItem]:
+        raise NotImplementedError
+
+
+class YahooNewsSource(NewsSource):
+    """yfinance ticker news (the original and default source)"""
+
+    name = 'crypto_news'
+
+    def fetch(self, asset: str, limit: int) -> List[NewsItem]:
+        import yfinance as yf
+
+        if not acquire('yfinance', priority='news'):
+            print("[NEWS] yfinance request budget exhausted")
+            return []
+        items = []
+        for item in (yf.Ticker(f"{asset}-USD").news or [])[:limit]:
+            items.append(NewsItem(
+                title=item.get('title', ''),
+                summary=item.get('summary', ''),
+                published=float(item.get('providerPublishTime', 0)),
+                source=item.get('publisher', ''),
+                url=item.get('link', ''),
+                provider=self.name,
+                id=f"yahoo:{item['uuid']}" if item.get('uuid') else '',
+            ))
+        return items
+
+
+class RedditSource(NewsSource):
+    """Newest posts mentioning the asset in a few crypto subreddits (public JSON API)"""
+
+    name = 'reddit'
+
+    def __init__(self, subreddits: Sequence[str] = NEWS_REDDIT_SUBREDDITS,
+                 session: Optional[requests.Session] = None):
+        self.subreddits = list(subreddits)
+        self.session = session or create_session()
+
+    def fetch(self, asset: str, limit: int) -> List[NewsItem]:
+        items = []
+        for subreddit in self.subreddits:
+            if not acquire('reddit', priority='news'):
+                break
+            response = self.session.get(
+                f"https://www.reddit.com/r/{subreddit}/search.json",
+                params={'q': asset, 'restrict_sr': 1, 'sort': 'new', 't': 'week', 'limit': limit},
+                timeout=10
+            )
+            if response.status_code != 200:
+                print(f"[NEWS] Reddit r/{subreddit} error {response.status_code}")
+                continue
+            for child in response.json().get('data', {}).get('children', []):
+                post = child.get('data', {})
+                items.append(NewsItem(
+                    title=post.get('title', ''),
+                    summary=(post.get('selftext') or '')[:500],
+                    published=float(post.get('created_utc', 0)),
+                    source=f"r/{post.get('subreddit', subreddit)}",
+                    url=f"https://www.reddit.com{post.get('permalink', '')}",
+                    provider=self.name,
+                    id=f"reddit:{post.get('name', '')}" if post.get('name') else '',
+                ))
+        return items
+
+
+class TwitterSource(NewsSource):
+    """Recent tweets about the asset (needs TWITTER_BEARER_TOKEN)"""
+
+    name = 'twitter'
+
+    def __init__(self, bearer_token: str = TWITTER_BEARER_TOKEN, session: Optional[requests.Session] = None):
+        self.bearer_token = bearer_token
+        self.session = session or create_session()
+
+    def fetch(self, asset: str, limit: int) -> List[NewsItem]:
+        if not self.bearer_token or not acquire('twitter', priority='news'):
+            return []
+        response = self.session.get(
+            "https://api.twitter.com/2/tweets/search/recent",
+            params={'query': f"({asset} OR #{asset}) lang:en -is:retweet",
+                    'max_results': min(max(limit, 10), 100), 'tweet.fields': 'created_at,author_id'},
+            headers={'Authorization': f"Bearer {self.bearer_token}"},
+            timeout=10
+        )
+        if response.status_code != 200:
+            print(f"[NEWS] Twitter error {response.status_code}: {response.text[:200]}")
+            return []
+        items = []
+        for tweet in response.json().get('data', []):
+            created = tweet.get('created_at')
+            items.append(NewsItem(
+                title=tweet.get('text', ''),
+                published=_timestamp(created) if created else time.time(),
+                source=f"twitter:{tweet.get('author_id', '')}",
+                url=f"https://twitter.com/i/web/status/{tweet['id']}",
+                provider=self.name,
+                id=f"twitter:{tweet['id']}",
+            ))
+        return items
+
+
+def _timestamp(value) -> float:
+    """Epoch seconds from a number or an ISO 8601 string"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+
+
+class FileNewsSource(NewsSource):
+    """Replays news items from a JSON-lines file, for offline runs and tests.
+
+    Each line has title and optionally summary, published (epoch or ISO),
+    source, url, id and symbol (items for other assets are skipped). With
+    shift_to_now the timestamps are moved so the newest item is "now",
+    keeping their spacing, so time decay behaves as it would live.
+    """
+
+    name = 'replay'
+
+    def __init__(self, path: str, shift_to_now: bool = True):
+        self.path = path
+        self.shift_to_now = shift_to_now
+
+    def fetch(self, asset: str, limit: int) -> List[NewsItem]:
+        items = []
+        with open(self.path, encoding='utf-8') as f:
+            for number, line in enumerate(f):
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                if row.get('symbol') and base_asset(row['symbol']) != asset:
+                    continue
+                items.append(NewsItem(
+                    title=row.get('title', ''),
+                    summary=row.get('summary', ''),
+                    published=_timestamp(row['published']) if row.get('published') is not None else 0.0,
+                    source=row.get('source', ''),
+                    url=row.get('url', ''),
+                    provider=self.name,
+                    id=str(row.get('id') or f"replay:{number}"),
+                ))
+        if self.shift_to_now and items:
+            offset = time.time() - max(item.published for item in items)
+            for item in items:
+                item.published += offset
+        items.sort(key=lambda item: item.published, reverse=True)
+        return items[:limit]
+
+
+NEWS_SOURCE_TYPES: Dict[str, Callable[[], NewsSource]] = {
+    'crypto_news': YahooNewsSource,
+    'reddit': RedditSource,
+    'twitter': TwitterSource,
+}
+
+
+def build_sources(names: Sequence[str], replay_file: str = '') -> List[NewsSource]:
+    """Source adapters for the configured names (only the replay file when one is given)"""
+    if replay_file:
+        return [FileNewsSource(replay_file)]
+    sources = []
+    for name in names:
+        if name not in NEWS_SOURCE_TYPES:
+            print(f"[NEWS] Unknown news source {name!r}, skipped")
+        elif name == 'twitter' and not TWITTER_BEARER_TOKEN:
+            continue  # no credentials, nothing to fetch
+        else:
+            sources.append(NEWS_SOURCE_TYPES[name]())
+    return sources
+
+
+_WORD = re.compile(r"[a-z0-9]+")
+# Dropped before shingling so rewordings like "to a record" vs "to record" still match
+_STOPWORDS = frozenset({'a', 'an', 'the', 'to', 'of', 'in', 'on', 'at', 'for', 'and', 'as', 'is', 'are', 'by', 'with'})
+_MERSENNE = (1 << 61) - 1
+
+
+class NearDuplicateFilter:
+    """Detects re-published stories by MinHash over title word shingles.
+
+    Titles become sets of word bigrams (stopwords removed); num_perm hash minima estimate the
+    Jaccard similarity of two sets, and LSH banding (bands x rows) finds
+    candidates without comparing against every stored title. Only the
+    newest `capacity` titles are remembered.
+    """
+
+    def __init__(self, threshold: float = NEWS_DUPLICATE_THRESHOLD, num_perm: int = 64, bands: int = 16,
+                 capacity: int = 5000, seed: int = 1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = np.random.default_rng(seed)
+        # Universal hashes (a*x + b) mod p with p = 2^61 - 1, split so products fit in 64 bits
+        self._a = rng.integers(1, 1 << 30, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 30, num_perm, dtype=np.uint64)
+        self._buckets: Dict[tuple, List[int]] = {}
+        self._signatures: 'OrderedDict[int, np.ndarray]' = OrderedDict()
+        self._next_id = 0
+        self.capacity = capacity
+
+    @staticmethod
+    def shingles(title: str) -> set:
+        words = [word for word in _WORD.findall(title.lower()) if word not in _STOPWORDS]
+        if len(words) < 2:
+            return set(words)
+        return {f"{first} {second}" for first, second in zip(words, words[1:])}
+
+    def signature(self, title: str) -> Optional[np.ndarray]:
+        shingles = self.shingles(title)
+        if not shingles:
+            return None
+        hashes = np.array([zlib.crc32(s.encode('utf-8')) for s in shingles], dtype=np.uint64)
+        # (a * x) with a < 2^30 and x < 2^32 stays below 2^62
+        values = (np.outer(self._a, hashes) + self._b[:, None]) % np.uint64(_MERSENNE)
+        return values.min(axis=1)
+
+    def _band_keys(self, signature: np.ndarray) -> List[tuple]:
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    def is_duplicate(self, title: str) -> bool:
+        """True if a similar title was seen; otherwise remember this one"""
+        signature = self.signature(title)
+        if signature is None:
+            return False
+        keys = self._band_keys(signature)
+        candidates = {other for key in keys for other in self._buckets.get(key, ())}
+        for other in candidates:
+            if np.mean(self._signatures[other] == signature) >= self.threshold:
+                return True
+        item_id = self._next_id
+        self._next_id += 1
+        self._signatures[item_id] = signature
+        for key in keys:
+            self._buckets.setdefault(key, []).append(item_id)
+        if len(self._signatures) > self.capacity:
+            old_id, old_signature = self._signatures.popitem(last=False)
+            for key in self._band_keys(old_signature):
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.remove(old_id)
+                    if not bucket:
+                        del self._buckets[key]
+        return False
+
+
+class DecayedSentiment:
+    """Exponentially time-decayed mean polarity, updated one item at a time.
+
+    Every item's weight halves each half_life seconds, so reading the value
+    costs O(1) however much news has been seen. prior_weight is a neutral
+    pseudo-item that does not decay: without fresh news the aggregate drifts
+    back to 0. float(aggregate) is the current value.
+    """
+
+    def __init__(self, half_life: float = NEWS_SENTIMENT_HALF_LIFE,
+                 prior_weight: float = NEWS_SENTIMENT_PRIOR_WEIGHT):
+        self.rate = math.log(2) / half_life
+        self.prior_weight = prior_weight
+        self._sum = 0.0
+        self._weight = 0.0
+        self._at = time.time()
+        self._lock = threading.Lock()
+
+    def _advance(self, now: float) -> None:
+        if now > self._at:
+            factor = math.exp(-self.rate * (now - self._at))
+            self._sum *= factor
+            self._weight *= factor
+            self._at = now
+
+    def add(self, polarity: float, published: float, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        with self._lock:
+            self._advance(now)
+            weight = math.exp(-self.rate * max(self._at - published, 0.0))
+            self._sum += weight * polarity
+            self._weight += weight
+
+    def value(self, now: Optional[float] = None) -> float:
+        with self._lock:
+            self._advance(time.time() if now is None else now)
+            total = self._weight + self.prior_weight
+            return self._sum / total if total > 0 else 0.0
+
+    def __float__(self) -> float:
+        return self.value()
+
+
+@dataclass
+class _AssetState:
+    sentiment: DecayedSentiment = field(default_factory=DecayedSentiment)
+    duplicates: NearDuplicateFilter = field(default_factory=NearDuplicateFilter)
+    seen: 'OrderedDict[str, None]' = field(default_factory=OrderedDict)
+    recent: deque = field(default_factory=lambda: deque(maxlen=100))
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+def batched(items: Iterable, size: int) -> Iterator[List]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class NewsPipeline:
+    """Streams news from every source through dedup and scoring into a decayed aggregate.
+
+    fetch (sources in parallel, each cached across workers) -> drop stale,
+    empty and already-seen items -> drop near-duplicate titles -> score in
+    batches of batch_size -> update the per-asset DecayedSentiment. Each stage
+    is a generator, so items flow through as soon as their source answers and
+    at most one batch is held between stages.
+    """
+
+    def __init__(self, sources: Sequence[NewsSource], score_batch: Callable[[List[str]], List[Dict]],
+                 items_per_source: int = NEWS_ITEMS_PER_SOURCE, batch_size: int = NEWS_BATCH_SIZE,
+                 max_age: float = NEWS_MAX_AGE):
+        self.sources = list(sources)
+        self.score_batch = score_batch
+        self.items_per_source = items_per_source
+        self.batch_size = batch_size
+        self.max_age = max_age
+        self._states: Dict[str, _AssetState] = {}
+        self._states_lock = threading.Lock()
+
+    def _state(self, asset: str) -> _AssetState:
+        with self._states_lock:
+            return self._states.setdefault(asset, _AssetState())
+
+    def _fetch_source(self, source: NewsSource, asset: str) -> List[NewsItem]:
+        def fetch() -> Optional[List[NewsItem]]:
+            try:
+                return source.fetch(asset, self.items_per_source) or None
+            except Exception as e:
+                print(f"[NEWS] {source.name} failed for {asset}: {e}")
+                return None
+
+        cache = get_shared_cache()
+        if cache is None:
+            return fetch() or []
+        # Empty results are not cached so a failed fetch is retried next time
+        items = cache.get_or_compute(f"news:{source.name}:{asset}", fetch,
+                                     expires_at=lambda: time.time() + NEWS_CACHE_TTL)
+        return [NewsItem(**vars(item)) for item in items] if items else []
+
+    def fetch(self, asset: str) -> Iterator[NewsItem]:
+        """Items from all sources, in the order the sources answer"""
+        if not self.sources:
+            return
+        with ThreadPoolExecutor(max_workers=len(self.sources), thread_name_prefix='news') as pool:
+            futures = [pool.submit(self._fetch_source, source, asset) for source in self.sources]
+            for future in as_completed(futures):
+                yield from future.result()
+
+    def fresh(self, items: Iterable[NewsItem], state: _AssetState) -> Iterator[NewsItem]:
+        oldest = time.time() - self.max_age
+        for item in items:
+            if not item.title or item.published < oldest or item.key in state.seen:
+                continue
+            state.seen[item.key] = None
+            if len(state.seen) > state.duplicates.capacity:
+                state.seen.popitem(last=False)
+            yield item
+
+    def unique(self, items: Iterable[NewsItem], state: _AssetState) -> Iterator[NewsItem]:
+        for item in items:
+            if not state.duplicates.is_duplicate(item.title):
+                yield item
+
+    def scored(self, items: Iterable[NewsItem]) -> Iterator[NewsItem]:
+        for batch in batched(items, self.batch_size):
+            for item, sentiment in zip(batch, self.score_batch([item.text for item in batch])):
+                item.sentiment = sentiment
+                yield item
+
+    def refresh(self, symbol: str) -> int:
+        """Pull new items for the symbol into its aggregate; number of new items"""
+        asset = base_asset(symbol)
+        state = self._state(asset)
+        added = 0
+        # One refresh per asset at a time: dedup state is not thread-safe
+        with state.lock:
+            for item in self.scored(self.unique(self.fresh(self.fetch(asset), state), state)):
+                state.sentiment.add(item.sentiment['polarity'], item.published)
+                state.recent.append(item)
+                added += 1
+            if added:
+                ordered = sorted(state.recent, key=lambda item: item.published, reverse=True)
+                state.recent.clear()
+                state.recent.extend(reversed(ordered))
+        return added
+
+    def recent(self, symbol: str, limit: int = 10) -> List[NewsItem]:
+        """Newest unique items seen for the symbol, newest first"""
+        state = self._state(base_asset(symbol))
+        with state.lock:
+            return list(state.recent)[::-1][:limit]
+
+    def sentiment(self, symbol: str) -> DecayedSentiment:
+        return self._state(base_asset(symbol)).sentiment
@@ -0,0 +1,266 @@
+import itertools
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import fields
+from functools import lru_cache
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from services.backtest import OHLCV_COLUMNS, Backtester
+from services.indicators import TechnicalIndicators
+from services.strategy import DEFAULT_PARAMS, StrategyParams, generate_signals
+
+# A dimension is either explicit values or a (low, high) range to sample from
+Dimension = Union[Sequence, Tuple[float, float]]
+ParameterSpace = Mapping[str, Dimension]
+
+# Indicator group -> (TechnicalIndicators method, StrategyParams fields it depends on)
+INDICATOR_GROUPS: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    'rsi': ('add_rsi', ('rsi_period',)),
+    'macd': ('add_macd', ('macd_fast', 'macd_slow', 'macd_signal')),
+    'bollinger': ('add_bollinger_bands', ('bb_period', 'bb_std')),
+    'sma_short': ('add_sma', ('sma_short',)),
+    'sma_long': ('add_sma', ('sma_long',)),
+    'adx': ('add_adx', ('adx_period',)),
+    'atr': ('add_atr', ('atr_period',)),
+    'volume': ('add_volume_indicators', ()),
+    'support_resistance': ('add_support_resistance', ()),
+}
+INDICATOR_FIELDS = tuple(name for _, names in INDICATOR_GROUPS.values() for name in names)
+PARAM_FIELDS = tuple(f.name for f in fields(StrategyParams))
+# Indicator columns kept per worker; each 1M-bar column is 8MB
+WORKER_CACHE_SIZE = 32
+
+
+def is_valid(params: StrategyParams) -> bool:
+    """Reject combinations the strategy cannot use (e.g. fast MACD slower than slow)"""
+    return (params.macd_fast < params.macd_slow and params.sma_short < params.sma_long
+            and params.atr_multiplier > 0 and params.min_risk_reward > 0)
+
+
+def _is_range(dimension: Dimension) -> bool:
+    return isinstance(dimension, tuple) and len(dimension) == 2 and all(
+        isinstance(v, (int, float)) for v in dimension)
+
+
+def _sample(dimension: Dimension, rng: random.Random):
+    if _is_range(dimension):
+        low, high = dimension
+        if isinstance(low, int) and isinstance(high, int):
+            return rng.randint(low, high)
+        return rng.uniform(low, high)
+    return rng.choice(list(dimension))
+
+
+def grid(space: ParameterSpace, base: StrategyParams = DEFAULT_PARAMS) -> List[StrategyParams]:
+    """Every combination of the listed values"""
+    names = list(space)
+    for name in names:
+        if _is_range(space[name]):
+            raise ValueError(f"Grid dimension {name} must list its values, not a range")
+    configs = (base.replace(**dict(zip(names, values)))
+               for values in itertools.product(*(space[name] for name in names)))
+    return [params for params in configs if is_valid(params)]
+
+
+def random_samples(space: ParameterSpace, samples: int, base: StrategyParams = DEFAULT_PARAMS,
+                   seed: Optional[int] = None) -> List[StrategyParams]:
+    """Independent random draws from each dimension (duplicates dropped)"""
+    rng = random.Random(seed)
+    configs: Dict[StrategyParams, None] = {}
+    for _ in range(samples * 20):
+        if len(configs) >= samples:
+            break
+        params = base.replace(**{name: _sample(dim, rng) for name, dim in space.items()})
+        if is_valid(params):
+            configs[params] = None
+    return list(configs)
+
+
+def _narrow(space: ParameterSpace, elite: pd.DataFrame) -> Dict[str, Dimension]:
+    """Shrink each dimension around the values used by the best configurations"""
+    narrowed: Dict[str, Dimension] = {}
+    for name, dimension in space.items():
+        values = elite[name]
+        if _is_range(dimension):
+            low, high = dimension
+            # Keep a margin so the search can still move past the elite's edges
+            margin = (values.max() - values.min()) * 0.25 or (high - low) * 0.05
+            new_low, new_high = max(low, values.min() - margin), min(high, values.max() + margin)
+            if isinstance(low, int) and isinstance(high, int):
+                new_low, new_high = int(np.floor(new_low)), int(np.ceil(new_high))
+            narrowed[name] = (new_low, new_high)
+        else:
+            narrowed[name] = [v for v in dimension if v in set(values)] or list(dimension)
+    return narrowed
+
+
+# --- Worker side ----------------------------------------------------------
+
+_worker: Dict[str, object] = {}
+
+
+def _init_worker(shm_name: str, rows: int, backtest_options: Dict) -> None:
+    """Attach to the shared candle block (no copy) once per worker process"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    values = np.ndarray((rows, len(OHLCV_COLUMNS)), dtype=np.float64, buffer=shm.buf)
+    times = np.ndarray((rows,), dtype=np.int64, buffer=shm.buf, offset=values.nbytes)
+    _worker.update(shm=shm, values=values, index=pd.DatetimeIndex(times.view('datetime64[ns]')),
+                   options=backtest_options)
+    _group_columns.cache_clear()
+
+
+def _ohlcv_frame() -> pd.DataFrame:
+    values = _worker['values']
+    return pd.DataFrame({name: values[:, i] for i, name in enumerate(OHLCV_COLUMNS)},
+                        index=_worker['index'], copy=False)
+
+
+@lru_cache(maxsize=WORKER_CACHE_SIZE)
+def _group_columns(method: str, args: Tuple) -> Dict[str, np.ndarray]:
+    """Indicator columns of one group, computed once per worker and argument set"""
+    df = _ohlcv_frame()
+    before = set(df.columns)
+    if method == 'add_sma':
+        df = TechnicalIndicators.add_sma(df, list(args))
+    else:
+        df = getattr(TechnicalIndicators, method)(df, *args)
+    return {column: df[column].to_numpy() for column in df.columns if column not in before}
+
+
+def indicator_frame(params: StrategyParams) -> pd.DataFrame:
+    """Shared candles plus the indicators for params, reusing cached groups"""
+    columns = {name: _worker['values'][:, i] for i, name in enumerate(OHLCV_COLUMNS)}
+    for method, names in INDICATOR_GROUPS.values():
+        columns.update(_group_columns(method, tuple(getattr(params, name) for name in names)))
+    return pd.DataFrame(columns, index=_worker['index'])
+
+
+def _evaluate(params: StrategyParams) -> Dict:
+    options = _worker['options']
+    try:
+        df = indicator_frame(params)
+        backtester = Backtester(params, **options)
+        signals = generate_signals(df, params, backtester.sentiment_score)
+        return backtester.run_prepared(df, signals).stats
+    except Exception as e:
+        print(f"[OPTIMIZER] Evaluation failed for {params}: {e}")
+        return {'error': str(e)}
+
+
+# --- Parent side ----------------------------------------------------------
+
+class Optimizer:
+    """Parallel parameter sweeps of the dashboard strategy.
+
+    The candle history is copied once into a shared memory block that every
+    worker maps read-only. Configurations are ordered by their indicator
+    parameters before being chunked out, so each worker's indicator cache
+    can reuse the columns an earlier configuration already computed (e.g. a
+    sweep over ATR_MULTIPLIER computes the indicators once per worker).
+
+    Use it as a context manager, or call close() to release the pool.
+    """
+
+    def __init__(self, candles: pd.DataFrame, base: StrategyParams = DEFAULT_PARAMS,
+                 workers: Optional[int] = None, objective: str = 'profit_factor',
+                 initial_balance: Optional[float] = None, sentiment_score: float = 0.0,
+                 intrabar: bool = True):
+        self.candles = candles
+        self.base = base
+        self.workers = workers or os.cpu_count() or 1
+        self.objective = objective
+        self.backtest_options = {'sentiment_score': sentiment_score, 'intrabar': intrabar}
+        if initial_balance is not None:
+            self.backtest_options['initial_balance'] = initial_balance
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self) -> 'Optimizer':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            rows = len(self.candles)
+            values = self.candles[OHLCV_COLUMNS].to_numpy(dtype=np.float64)
+            times = pd.DatetimeIndex(self.candles.index).as_unit('ns').asi8
+            self._shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes + times.nbytes, 1))
+            np.ndarray(values.shape, dtype=np.float64, buffer=self._shm.buf)[:] = values
+            np.ndarray(times.shape, dtype=np.int64, buffer=self._shm.buf, offset=values.nbytes)[:] = times
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker,
+                initargs=(self._shm.name, rows, self.backtest_options)
+            )
+        return self._executor
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def evaluate(self, configs: Iterable[StrategyParams], columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Backtest every configuration; one row per configuration, best first.
+
+        The report lists the parameters in `columns` (by default those that
+        differ between the configurations) followed by the backtest stats.
+        """
+        configs = sorted(set(configs), key=lambda p: tuple(getattr(p, name) for name in INDICATOR_FIELDS))
+        if not configs:
+            return pd.DataFrame()
+        chunksize = max(1, len(configs) // (self.workers * 4))
+        results = list(self._pool().map(_evaluate, configs, chunksize=chunksize))
+
+        if columns is None:
+            columns = [name for name in PARAM_FIELDS if len({getattr(p, name) for p in configs}) > 1]
+        report = pd.DataFrame([{**{name: getattr(params, name) for name in columns}, **stats}
+                               for params, stats in zip(configs, results)])
+        if self.objective in report.columns:
+            report = report.sort_values(self.objective, ascending=False, kind='stable')
+        return report
+
+    def grid(self, space: ParameterSpace) -> pd.DataFrame:
+        return self.evaluate(grid(space, self.base))
+
+    def random(self, space: ParameterSpace, samples: int, seed: Optional[int] = None) -> pd.DataFrame:
+        return self.evaluate(random_samples(space, samples, self.base, seed))
+
+    def adaptive(self, space: ParameterSpace, rounds: int = 4, samples_per_round: int = 32,
+                 elite_fraction: float = 0.25, seed: Optional[int] = None) -> pd.DataFrame:
+        """Sample, keep the best configurations, narrow the space around them, repeat.
+
+        A cheap stand-in for Bayesian optimization: later rounds spend their
+        budget where the objective was good instead of across the whole space.
+        """
+        rng = random.Random(seed)
+        current: Dict[str, Dimension] = dict(space)
+        seen: Dict[StrategyParams, None] = {}
+        reports = []
+        for _ in range(rounds):
+            configs = [p for p in random_samples(current, samples_per_round, self.base, rng.getrandbits(32))
+                       if p not in seen]
+            if not configs:
+                break
+            seen.update(dict.fromkeys(configs))
+            reports.append(self.evaluate(configs, columns=list(space)))
+            combined = pd.concat(reports, ignore_index=True)
+            if self.objective not in combined.columns:
+                break
+            elite = combined.nlargest(max(1, int(len(combined) * elite_fraction)), self.objective)
+            current = _narrow(space, elite)
+        if not reports:
+            return pd.DataFrame()
+        combined = pd.concat(reports, ignore_index=True)
+        if self.objective in combined.columns:
+            combined = combined.sort_values(self.objective, ascending=False, kind='stable')
+        return combined
@@ -0,0 +1,226 @@
+import math
+import threading
+from statistics import NormalDist
+from typing import Dict, Iterable, List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    INITIAL_BALANCE, PORTFOLIO_COVARIANCE_WINDOW, PORTFOLIO_VAR_CONFIDENCE, PORTFOLIO_VAR_LIMIT,
+    PORTFOLIO_MAX_EXPOSURE
+)
+from models.trade import Trade
+from services.risk_management import RiskManager, calculate_position_size
+
+
+class RollingCovariance:
+    """Covariance of per-bar returns over the last `window` bars, updated per bar.
+
+    Keeps the window in a ring buffer plus running sums of returns and of
+    their outer products, so adding a bar costs O(symbols^2) instead of a
+    full recomputation. Symbols may join at any time; bars where a symbol has
+    no return count as flat. The sums are rebuilt from the buffer once per
+    window to stop rounding drift.
+    """
+
+    def __init__(self, window: int = PORTFOLIO_COVARIANCE_WINDOW):
+        self.window = window
+        self.symbols: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._buffer = np.zeros((window, 0))
+        self._sum = np.zeros(0)
+        self._products = np.zeros((0, 0))
+        self._count = 0  # bars seen, capped at window
+        self._position = 0  # next ring slot
+        self._since_rebuild = 0
+
+    def add_symbols(self, symbols: Iterable[str]) -> None:
+        new = [s for s in symbols if s not in self._index]
+        if not new:
+            return
+        for symbol in new:
+            self._index[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        grow = len(new)
+        self._buffer = np.pad(self._buffer, ((0, 0), (0, grow)))
+        self._sum = np.pad(self._sum, (0, grow))
+        self._products = np.pad(self._products, ((0, grow), (0, grow)))
+
+    def _rebuild(self) -> None:
+        rows = self._buffer[:self._count]
+        self._sum = rows.sum(axis=0)
+        self._products = rows.T @ rows
+        self._since_rebuild = 0
+
+    def update(self, returns: Mapping[str, float]) -> None:
+        """Add one bar of returns (symbol -> simple return)"""
+        self.add_symbols(returns)
+        row = np.zeros(len(self.symbols))
+        for symbol, value in returns.items():
+            if value is not None and math.isfinite(value):
+                row[self._index[symbol]] = value
+        if self._count == self.window:
+            old = self._buffer[self._position]
+            self._sum -= old
+            self._products -= np.outer(old, old)
+        else:
+            self._count += 1
+        self._buffer[self._position] = row
+        self._position = (self._position + 1) % self.window
+        self._sum += row
+        self._products += np.outer(row, row)
+        self._since_rebuild += 1
+        if self._since_rebuild >= self.window:
+            self._rebuild()
+
+    def load(self, returns: pd.DataFrame) -> None:
+        """Replace the window with the newest rows of a (bars x symbols) returns frame"""
+        self.add_symbols(returns.columns)
+        self.load_rows(returns.tail(self.window).reindex(columns=self.symbols).fillna(0.0).to_numpy(dtype=float))
+
+    def load_rows(self, rows: np.ndarray) -> None:
+        """Replace the window with (bars x symbols) returns, columns ordered like self.symbols"""
+        rows = rows[-self.window:]
+        self._buffer[:] = 0.0
+        self._count = len(rows)
+        self._buffer[:self._count] = rows
+        self._position = self._count % self.window
+        self._rebuild()
+
+    def index_of(self, symbol: str) -> Optional[int]:
+        return self._index.get(symbol)
+
+    @property
+    def bars(self) -> int:
+        return self._count
+
+    def matrix(self) -> np.ndarray:
+        """Sample covariance matrix, ordered like self.symbols"""
+        n = self._count
+        if n < 2:
+            return np.zeros((len(self.symbols), len(self.symbols)))
+        return (self._products - np.outer(self._sum, self._sum) / n) / (n - 1)
+
+
+class PortfolioRiskManager(RiskManager):
+    """Exposure, correlation-aware sizing and VaR across every open position.
+
+    Open positions become a vector of signed notionals e per symbol; with
+    the rolling covariance S of bar returns the portfolio variance is e'Se
+    and the one-bar parametric VaR is z * sqrt(e'Se). S @ e is cached
+    whenever prices, positions or the covariance change, so evaluating a
+    candidate trade of notional x on symbol j only needs
+    e'Se + 2x(Se)_j + x^2 S_jj, a handful of float operations. The size is
+    the usual fixed-risk size, reduced to keep the VaR and gross exposure
+    within their limits.
+    """
+
+    def __init__(self, initial_balance: float = INITIAL_BALANCE, window: int = PORTFOLIO_COVARIANCE_WINDOW,
+                 confidence: float = PORTFOLIO_VAR_CONFIDENCE, var_limit: float = PORTFOLIO_VAR_LIMIT,
+                 max_exposure: float = PORTFOLIO_MAX_EXPOSURE):
+        super().__init__(initial_balance)
+        self.covariance = RollingCovariance(window)
+        self.z = NormalDist().inv_cdf(confidence)
+        self.confidence = confidence
+        self.var_limit = var_limit
+        self.max_exposure = max_exposure
+        self._lock = threading.Lock()
+        self._last_time: Optional[pd.Timestamp] = None
+        self._last_close: Dict[str, float] = {}
+        self._positions: List[Trade] = []
+        self._prices: Dict[str, float] = {}
+        self._exposure = np.zeros(0)
+        self._sigma_e = np.zeros(0)
+        self._variances = np.zeros(0)
+        self._variance = 0.0
+        self._gross = 0.0
+
+    def observe(self, closes: pd.DataFrame) -> None:
+        """Feed closes (bars x symbols); only bars newer than the last one seen are added"""
+        closes = closes.sort_index()
+        with self._lock:
+            if self._last_time is None or len(closes.columns.difference(self.covariance.symbols)):
+                # First call, or new symbols: seed the whole window from this history
+                self.covariance.load(closes.pct_change(fill_method=None).iloc[1:])
+            else:
+                for time, row in closes[closes.index > self._last_time].iterrows():
+                    returns = {symbol: price / self._last_close[symbol] - 1
+                               for symbol, price in row.items()
+                               if pd.notna(price) and self._last_close.get(symbol)}
+                    self.covariance.update(returns)
+                    self._last_close.update(row.dropna().to_dict())
+            self._last_time = closes.index[-1]
+            self._last_close.update(closes.ffill().iloc[-1].dropna().to_dict())
+            self._prices.update(self._last_close)
+            self._refresh()
+
+    def set_positions(self, positions: Iterable[Trade], prices: Optional[Mapping[str, float]] = None) -> None:
+        """Open positions to measure, marked at prices (default: the latest observed closes)"""
+        with self._lock:
+            self._positions = list(positions)
+            if prices:
+                self._prices.update(prices)
+            self._refresh()
+
+    def _refresh(self) -> None:
+        self.covariance.add_symbols(p.symbol for p in self._positions)
+        exposure = np.zeros(len(self.covariance.symbols))
+        for trade in self._positions:
+            price = self._prices.get(trade.symbol, trade.entry_price)
+            exposure[self.covariance.index_of(trade.symbol)] += trade.size * price * (1 if trade.side == 'buy' else -1)
+        self._exposure = exposure
+        covariance = self.covariance.matrix()
+        self._variances = np.diag(covariance).copy()
+        self._sigma_e = covariance @ exposure
+        self._variance = max(float(exposure @ self._sigma_e), 0.0)
+        self._gross = float(np.abs(exposure).sum())
+
+    def portfolio_var(self) -> float:
+        return self.z * math.sqrt(self._variance)
+
+    def evaluate(self, symbol: str, is_buy: bool, entry_price: float, stop_loss: float,
+                 balance: Optional[float] = None) -> Dict[str, float]:
+        """Size a candidate trade against the current portfolio"""
+        balance = self.current_balance if balance is None else balance
+        base_size = calculate_position_size(entry_price, stop_loss, balance * self.risk_per_trade)
+        sign = 1.0 if is_buy else -1.0
+        j = self.covariance.index_of(symbol)
+        variance_j = float(self._variances[j]) if j is not None and j < len(self._variances) else 0.0
+        beta = float(self._sigma_e[j]) if variance_j > 0 else 0.0
+
+        limits = {'risk': base_size * entry_price}
+        # Gross exposure left
+        limits['exposure'] = max(self.max_exposure * balance - self._gross, 0.0)
+        # Largest notional x with z * sqrt(v + 2 sign x beta + x^2 var_j) <= var_limit * balance
+        if variance_j > 0:
+            budget = (self.var_limit * balance / self.z) ** 2
+            discriminant = beta * beta - variance_j * (self._variance - budget)
+            limits['var'] = max((-sign * beta + math.sqrt(discriminant)) / variance_j, 0.0) if discriminant >= 0 else 0.0
+        limited_by = min(limits, key=limits.get)
+        notional = limits[limited_by]
+        variance_after = max(self._variance + 2 * sign * notional * beta + notional * notional * variance_j, 0.0)
+        correlation = beta / math.sqrt(variance_j * self._variance) if variance_j > 0 and self._variance > 0 else 0.0
+        return {
+            'size': notional / entry_price if entry_price > 0 else 0.0,
+            'base_size': base_size,
+            'notional': notional,
+            'limited_by': limited_by,
+            'var_before': self.portfolio_var(),
+            'var_after': self.z * math.sqrt(variance_after),
+            'correlation': sign * correlation,  # with the current portfolio; > 0 adds to its risk
+            'known_volatility': variance_j > 0,
+        }
+
+    def summary(self) -> Dict:
+        symbols = self.covariance.symbols
+        return {
+            'bars': self.covariance.bars,
+            'confidence': self.confidence,
+            'var': self.portfolio_var(),
+            'var_limit': self.var_limit * self.current_balance,
+            'gross_exposure': self._gross,
+            'net_exposure': float(self._exposure.sum()),
+            'exposure': {symbols[i]: float(value) for i, value in enumerate(self._exposure) if value},
+            'positions': len(self._positions),
+        }
@@ -0,0 +1,178 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+import pandas as pd
+
+from api.client import ExchangeClient
+from models.trade import Trade
+from services.batch_indicators import indicator_frames
+from services.market_context import get_context_engine
+from services.portfolio_risk import PortfolioRiskManager
+from services.risk_management import validate_trade_conditions
+from services.strategy import (
+    DEFAULT_PARAMS, StrategyParams, entry_signal, feature_rows_ready, predict_direction, stop_levels
+)
+from utils.rate_limiter import request_priority
+
+
+@dataclass
+class ScanResult:
+    symbol: str
+    timeframe: str
+    price: float = 0.0
+    change_percent: float = 0.0
+    signal: Optional[str] = None  # 'buy', 'sell' or None
+    stop_loss: Optional[float] = None
+    take_profit: Optional[float] = None
+    can_trade: bool = False
+    blocked_reasons: List[str] = field(default_factory=list)
+    trend: str = 'unknown'
+    adx: Optional[float] = None
+    rsi: Optional[float] = None
+    score: float = 0.0
+    position_size: Optional[float] = None  # portfolio-aware size for the signal
+    risk: Optional[Dict[str, Any]] = None  # PortfolioRiskManager.evaluate() of that size
+    error: Optional[str] = None
+
+
+def _number(value) -> Optional[float]:
+    return None if pd.isna(value) else round(float(value), 8)
+
+
+def analyze_symbol(df: pd.DataFrame, symbol: str, timeframe: str,
+                   params: StrategyParams = DEFAULT_PARAMS, sentiment_score: float = 0.0) -> ScanResult:
+    """Dashboard signal rules for one symbol whose frame already has indicators"""
+    result = ScanResult(symbol, timeframe)
+    last = df.iloc[-1]
+    result.price = float(last['close'])
+    if len(df) > 1 and df['close'].iloc[-2]:
+        result.change_percent = round((result.price / float(df['close'].iloc[-2]) - 1) * 100, 4)
+    result.adx = _number(last['adx'])
+    result.rsi = _number(last['rsi'])
+    if len(df) < 50:
+        result.blocked_reasons = ['Insufficient data']
+        return result
+
+    context = get_context_engine(symbol, timeframe).get_market_context(df, sentiment_score)
+    result.trend = context['trend']['direction']
+    result.blocked_reasons = context['blocked_reasons']
+    result.can_trade = context['can_trade']
+
+    ai_prediction = predict_direction(last, params) if feature_rows_ready(df, params)[-1] else 0
+    signal = entry_signal(last, ai_prediction, params)
+    if signal is not None and validate_trade_conditions(df, is_buy=signal):
+        stop_loss, take_profit = stop_levels(result.price, float(last['atr']), signal, params)
+        result.stop_loss, result.take_profit = round(stop_loss, 8), round(take_profit, 8)
+        if result.can_trade:
+            result.signal = 'buy' if signal else 'sell'
+
+    # Rank: actionable signals first, then tradable markets, then trend strength
+    result.score = round((2.0 if result.signal else 0.0) + (1.0 if result.can_trade else 0.0)
+                         + min(result.adx or 0.0, 100.0) / 100.0, 4)
+    return result
+
+
+class MarketScanner:
+    """Runs the dashboard pipeline over many symbols and timeframes.
+
+    Candles are fetched through ExchangeClient (so the shared cache and
+    candle store apply) by a bounded thread pool, which keeps upstream
+    concurrency predictable. Indicators for all symbols of a timeframe are
+    computed in one batch over a (symbols x bars) array; the market context
+    and signal rules then run per symbol exactly as on the dashboard.
+    """
+
+    def __init__(self, client: ExchangeClient, timeframes: Sequence[str], symbols: Sequence[str] = (),
+                 universe_size: int = 300, quote_asset: str = 'USDT', limit: int = 200,
+                 max_concurrency: int = 16, params: StrategyParams = DEFAULT_PARAMS,
+                 risk_manager: Optional[PortfolioRiskManager] = None, risk_timeframe: Optional[str] = None,
+                 positions: Optional[Callable[[], Iterable[Trade]]] = None):
+        self.client = client
+        self.timeframes = list(timeframes)
+        self.symbols = list(symbols)
+        self.universe_size = universe_size
+        self.quote_asset = quote_asset
+        self.limit = limit
+        self.max_concurrency = max_concurrency
+        self.params = params
+        # risk_timeframe candles of every scanned symbol feed the risk manager's covariance;
+        # positions() returns the open positions signals are sized against
+        self.risk_manager = risk_manager
+        self.risk_timeframe = risk_timeframe
+        self.positions = positions
+        self._universe: List[str] = []
+        self._universe_at = 0.0
+        self._lock = threading.Lock()
+
+    def universe(self, max_age: float = 3600) -> List[str]:
+        """Configured symbols, or the most traded ones (refreshed hourly)"""
+        if self.symbols:
+            return self.symbols
+        with self._lock:
+            if not self._universe or time.time() - self._universe_at > max_age:
+                symbols = self.client.get_top_symbols(self.quote_asset, self.universe_size)
+                if symbols:
+                    self._universe, self._universe_at = symbols, time.time()
+            return list(self._universe)
+
+    def _fetch(self, symbol: str, timeframe: str) -> Optional[pd.DataFrame]:
+        try:
+            # Bulk scans must not starve the dashboard's own requests
+            with request_priority('backfill'):
+                return self.client.get_cached_historical_data(symbol, timeframe, self.limit)
+        except Exception as e:
+            print(f"[SCANNER] Fetch failed for {symbol} {timeframe}: {e}")
+            return None
+
+    def analyze_timeframe(self, timeframe: str, symbols: Sequence[str],
+                          frames: Sequence[Optional[pd.DataFrame]]) -> List[ScanResult]:
+        results = [ScanResult(symbol, timeframe, error='No data')
+                   for symbol, df in zip(symbols, frames) if df is None or df.empty]
+        fetched = [(symbol, df) for symbol, df in zip(symbols, frames) if df is not None and not df.empty]
+        enriched = indicator_frames([df for _, df in fetched], self.limit, self.params)
+        if self.risk_manager is not None and timeframe == self.risk_timeframe and fetched:
+            self.risk_manager.observe(pd.DataFrame({symbol: df['close'] for symbol, df in fetched}))
+        for (symbol, _), df in zip(fetched, enriched):
+            try:
+                results.append(analyze_symbol(df, symbol, timeframe, self.params))
+            except Exception as e:
+                print(f"[SCANNER] Analysis failed for {symbol} {timeframe}: {e}")
+                results.append(ScanResult(symbol, timeframe, error=str(e)))
+        return results
+
+    def size_signals(self, results: Sequence[ScanResult]) -> None:
+        """Size every signal against the open positions, all at the same portfolio state"""
+        if self.risk_manager is None:
+            return
+        self.risk_manager.set_positions(self.positions() if self.positions else ())
+        for result in results:
+            if result.signal and result.stop_loss is not None:
+                result.risk = self.risk_manager.evaluate(result.symbol, result.signal == 'buy',
+                                                         result.price, result.stop_loss)
+                result.position_size = round(result.risk['size'], 8)
+
+    def scan(self) -> Dict[str, Any]:
+        """Scan every symbol/timeframe; results ranked best first"""
+        started = time.time()
+        symbols = self.universe()
+        results: List[ScanResult] = []
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='scanner') as pool:
+            # Queue every fetch up front so later timeframes download while earlier ones are analyzed
+            pending = {timeframe: [pool.submit(self._fetch, symbol, timeframe) for symbol in symbols]
+                       for timeframe in self.timeframes}
+            for timeframe, futures in pending.items():
+                results.extend(self.analyze_timeframe(timeframe, symbols, [f.result() for f in futures]))
+        self.size_signals(results)
+        results.sort(key=lambda r: (r.error is None, r.score), reverse=True)
+        return {
+            'scanned_at': started,
+            'duration': round(time.time() - started, 3),
+            'symbols': len(symbols),
+            'timeframes': self.timeframes,
+            'signals': sum(1 for r in results if r.signal),
+            'errors': sum(1 for r in results if r.error),
+            'results': [asdict(r) for r in results],
+        }
@@ -0,0 +1,309 @@
+import importlib.util
+import os
+import random
+import re
+import threading
+import time
+import xml.etree.ElementTree as ElementTree
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+Score = Tuple[float, float]  # (polarity in [-1, 1], subjectivity in [0, 1])
+
+# Crypto/finance terms that general-purpose lexicons miss or score differently
+CRYPTO_LEXICON: Dict[str, Score] = {
+    'bullish': (0.6, 0.6), 'bearish': (-0.6, 0.6), 'rally': (0.5, 0.3), 'rallies': (0.5, 0.3),
+    'surge': (0.5, 0.3), 'surges': (0.5, 0.3), 'soar': (0.6, 0.3), 'soars': (0.6, 0.3),
+    'jump': (0.3, 0.2), 'jumps': (0.3, 0.2), 'climb': (0.3, 0.2), 'climbs': (0.3, 0.2),
+    'rise': (0.3, 0.2), 'rises': (0.3, 0.2), 'gain': (0.3, 0.2), 'gains': (0.3, 0.2),
+    'rebound': (0.4, 0.3), 'rebounds': (0.4, 0.3), 'recovery': (0.4, 0.3), 'recovers': (0.4, 0.3),
+    'breakout': (0.5, 0.4), 'ath': (0.6, 0.3), 'inflows': (0.3, 0.2), 'adoption': (0.4, 0.3),
+    'approval': (0.5, 0.3), 'approves': (0.5, 0.3), 'approved': (0.5, 0.3), 'partnership': (0.3, 0.2),
+    'upgrade': (0.4, 0.2), 'upgrades': (0.4, 0.2), 'outperform': (0.5, 0.4), 'outperforms': (0.5, 0.4),
+    'crash': (-0.8, 0.5), 'crashes': (-0.8, 0.5), 'plunge': (-0.7, 0.4), 'plunges': (-0.7, 0.4),
+    'plummet': (-0.8, 0.4), 'plummets': (-0.8, 0.4), 'tumble': (-0.6, 0.4), 'tumbles': (-0.6, 0.4),
+    'slump': (-0.6, 0.4), 'slumps': (-0.6, 0.4), 'sink': (-0.4, 0.3), 'sinks': (-0.4, 0.3),
+    'drop': (-0.3, 0.2), 'drops': (-0.3, 0.2), 'fall': (-0.3, 0.2), 'falls': (-0.3, 0.2),
+    'dip': (-0.2, 0.2), 'dips': (-0.2, 0.2), 'loss': (-0.4, 0.2), 'losses': (-0.4, 0.2),
+    'selloff': (-0.6, 0.4), 'sell-off': (-0.6, 0.4), 'dump': (-0.5, 0.4), 'dumps': (-0.5, 0.4),
+    'liquidation': (-0.5, 0.3), 'liquidations': (-0.5, 0.3), 'outflows': (-0.3, 0.2),
+    'hack': (-0.7, 0.3), 'hacked': (-0.7, 0.3), 'exploit': (-0.7, 0.3), 'exploited': (-0.7, 0.3),
+    'stolen': (-0.7, 0.3), 'scam': (-0.8, 0.6), 'fraud': (-0.8, 0.5), 'lawsuit': (-0.5, 0.3),
+    'sues': (-0.5, 0.3), 'ban': (-0.5, 0.3), 'bans': (-0.5, 0.3), 'banned': (-0.5, 0.3),
+    'delist': (-0.5, 0.3), 'delisted': (-0.5, 0.3), 'delisting': (-0.5, 0.3),
+    'bankruptcy': (-0.8, 0.4), 'bankrupt': (-0.8, 0.4), 'insolvent': (-0.8, 0.4),
+    'default': (-0.5, 0.3), 'recession': (-0.6, 0.4), 'crisis': (-0.7, 0.5), 'panic': (-0.7, 0.6),
+    'collapse': (-0.8, 0.5), 'collapses': (-0.8, 0.5), 'meltdown': (-0.8, 0.5), 'fud': (-0.4, 0.7),
+    'downgrade': (-0.4, 0.2), 'downgrades': (-0.4, 0.2), 'underperform': (-0.5, 0.4),
+    'sanctions': (-0.4, 0.3), 'scandal': (-0.7, 0.6), 'warning': (-0.3, 0.3), 'warns': (-0.3, 0.3),
+}
+
+# Used when TextBlob's lexicon file is not installed: common words plus the modifiers
+GENERAL_LEXICON: Dict[str, Score] = {
+    'good': (0.7, 0.6), 'great': (0.8, 0.75), 'strong': (0.43, 0.73), 'positive': (0.23, 0.55),
+    'best': (1.0, 0.3), 'better': (0.5, 0.5), 'high': (0.16, 0.54), 'higher': (0.25, 0.5),
+    'record': (0.2, 0.2), 'optimistic': (0.5, 0.6), 'confident': (0.5, 0.7), 'stable': (0.2, 0.4),
+    'bad': (-0.7, 0.67), 'poor': (-0.4, 0.6), 'weak': (-0.38, 0.53), 'negative': (-0.3, 0.4),
+    'worst': (-1.0, 1.0), 'worse': (-0.4, 0.6), 'low': (0.0, 0.3), 'lower': (0.0, 0.0),
+    'fear': (-0.5, 0.6), 'fears': (-0.5, 0.6), 'uncertain': (-0.2, 0.6), 'volatile': (-0.2, 0.6),
+}
+MODIFIERS: Dict[str, float] = {  # word -> intensity applied to the next known word
+    'very': 1.3, 'really': 1.2, 'extremely': 1.5, 'highly': 1.3, 'most': 1.2, 'too': 1.2,
+    'slightly': 0.7, 'somewhat': 0.8, 'sharply': 1.3, 'strongly': 1.3,
+}
+NEGATIONS = ('no', 'not', "n't", 'never')
+
+TOKEN_PATTERN = re.compile(r"n't|[a-z0-9]+(?:[-'][a-z0-9]+)*|!")
+
+
+class SentimentBackend:
+    """Scores many texts at once as (polarity, subjectivity) pairs.
+
+    `name` and `version` identify the scores in the sentiment cache, so bump
+    the version whenever a backend's output changes.
+    """
+
+    name = 'base'
+    version = '1'
+
+    def score_batch(self, texts: Sequence[str]) -> List[Score]:
+        raise NotImplementedError
+
+
+class TextBlobBackend(SentimentBackend):
+    """TextBlob's pattern analyzer, one document at a time (the original scorer)"""
+
+    name = 'textblob'
+
+    def __init__(self):
+        # Imported on first use: TextBlob pulls in NLTK and takes a while to load
+        from textblob import TextBlob
+        self._textblob = TextBlob
+
+    def score_batch(self, texts: Sequence[str]) -> List[Score]:
+        scores = []
+        for text in texts:
+            sentiment = self._textblob(text).sentiment
+            scores.append((sentiment.polarity, sentiment.subjectivity))
+        return scores
+
+
+def _textblob_lexicon_path() -> Optional[str]:
+    """TextBlob's bundled sentiment lexicon, located without importing textblob"""
+    spec = importlib.util.find_spec('textblob')
+    if spec is None or not spec.submodule_search_locations:
+        return None
+    path = os.path.join(list(spec.submodule_search_locations)[0], 'en', 'en-sentiment.xml')
+    return path if os.path.exists(path) else None
+
+
+def load_pattern_lexicon(path: str) -> Tuple[Dict[str, Tuple[float, float, float]], set]:
+    """word -> (polarity, subjectivity, intensity) as TextBlob loads it, plus the adverbs (modifiers)"""
+    senses: Dict[str, Dict[str, List[Tuple[float, float, float]]]] = {}
+    for element in ElementTree.parse(path).getroot().iter('word'):
+        form = element.get('form')
+        if not form:
+            continue
+        psi = (float(element.get('polarity', 0.0)), float(element.get('subjectivity', 0.0)),
+               float(element.get('intensity', 1.0)))
+        senses.setdefault(form, {}).setdefault(element.get('pos'), []).append(psi)
+    # Average per part of speech, then across parts of speech
+    by_pos = {form: {pos: tuple(np.mean(values, axis=0)) for pos, values in tags.items()}
+              for form, tags in senses.items()}
+    lexicon = {form: tuple(float(v) for v in np.mean(list(tags.values()), axis=0)) for form, tags in by_pos.items()}
+    modifiers = {form for form, tags in by_pos.items() if 'RB' in tags}
+    # Like textblob.en: every adjective also scores its adverb ("terrible" -> "terribly")
+    for form, tags in by_pos.items():
+        if 'JJ' in tags:
+            adverb = form[:-1] + 'i' if form.endswith('y') else form
+            adverb = adverb[:-2] if adverb.endswith('le') else adverb
+            lexicon[adverb + 'ly'] = tuple(float(v) for v in tags['JJ'])
+            modifiers.add(adverb + 'ly')
+    return lexicon, modifiers
+
+
+class LexiconBackend(SentimentBackend):
+    """Fast lexicon scorer following the rules of TextBlob's pattern analyzer.
+
+    The lexicon (TextBlob's bundled word list when available, plus crypto
+    terms) is compiled into arrays once. A batch is tokenized, every token is
+    mapped to a lexicon id, and modifiers ("very good"), negations ("not
+    good") and exclamation marks are applied with array operations over the
+    whole batch; per-text averages come from a single bincount.
+    """
+
+    name = 'lexicon'
+
+    def __init__(self, lexicon_path: Optional[str] = None, extra: Optional[Dict[str, Score]] = None):
+        lexicon_path = lexicon_path or _textblob_lexicon_path()
+        if lexicon_path:
+            words, modifiers = load_pattern_lexicon(lexicon_path)
+        else:
+            words = {word: (p, s, 1.0) for word, (p, s) in GENERAL_LEXICON.items()}
+            words.update({word: (0.0, 0.0, intensity) for word, intensity in MODIFIERS.items()})
+            modifiers = set(MODIFIERS)
+        for word, (polarity, subjectivity) in (CRYPTO_LEXICON if extra is None else extra).items():
+            words[word] = (polarity, subjectivity, 1.0)
+        self.version = f"1:{'pattern' if lexicon_path else 'builtin'}:{len(words)}"
+
+        self._ids = {word: i for i, word in enumerate(words)}
+        values = np.array(list(words.values()), dtype=float).reshape(-1, 3)
+        # Two extra rows: unknown word and '!'
+        self._polarity = np.append(values[:, 0], [0.0, 0.0])
+        self._subjectivity = np.append(values[:, 1], [0.0, 0.0])
+        self._intensity = np.append(values[:, 2], [1.0, 1.0])
+        self._is_modifier = np.append([word in modifiers for word in words], [False, False])
+        self._unknown = len(words)
+        self._exclamation = len(words) + 1
+        self._ids['!'] = self._exclamation
+        self._negation_words = set(NEGATIONS)
+
+    def _tokenize(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Flat arrays over the batch: lexicon id, text index, negation flag, token length"""
+        ids: List[int] = []
+        docs: List[int] = []
+        negation: List[bool] = []
+        length: List[int] = []
+        lookup, unknown, negations = self._ids.get, self._unknown, self._negation_words
+        for doc, text in enumerate(texts):
+            tokens = TOKEN_PATTERN.findall(text.lower().replace("n't", " n't"))
+            ids.extend(lookup(token, unknown) for token in tokens)
+            docs.extend([doc] * len(tokens))
+            negation.extend(token in negations for token in tokens)
+            length.extend(len(token.strip("'")) for token in tokens)
+        return (np.array(ids, dtype=np.int64), np.array(docs, dtype=np.int64),
+                np.array(negation, dtype=bool), np.array(length, dtype=np.int64))
+
+    def score_batch(self, texts: Sequence[str]) -> List[Score]:
+        if not texts:
+            return []
+        ids, docs, negation, length = self._tokenize(texts)
+        n = len(ids)
+        if n == 0:
+            return [(0.0, 0.0)] * len(texts)
+        positions = np.arange(n)
+        known = ids < self._unknown
+        exclamation = ids == self._exclamation
+
+        def previous(skip: np.ndarray, of: np.ndarray = positions) -> np.ndarray:
+            """Index of the nearest earlier token of the same text that is not skipped, or -1"""
+            last = np.maximum.accumulate(np.where(skip, -1, positions))
+            before = np.full(n, -1)
+            before[1:] = last[:-1]
+            found = before[of]
+            valid = of >= 0
+            found = np.where(valid, found, -1)
+            return np.where((found >= 0) & (docs[np.maximum(found, 0)] == docs[np.maximum(of, 0)]), found, -1)
+
+        def flag(mask: np.ndarray, index: np.ndarray) -> np.ndarray:
+            return (index >= 0) & mask[np.maximum(index, 0)]
+
+        # Modifiers carry over unknown words of up to two letters ("really is a good")
+        modifier_at = previous(~known & (length <= 2) & ~negation & ~exclamation)
+        prev_modifier = known & flag(known & self._is_modifier[ids], modifier_at)
+        # The modifier's assessment absorbs the word it modifies ("very good" counts once)
+        merged_away = np.zeros(n, dtype=bool)
+        merged_away[modifier_at[prev_modifier]] = True
+        intensity = np.where(prev_modifier, self._intensity[ids[np.maximum(modifier_at, 0)]], 1.0)
+
+        # Negations carry over one-letter unknown words ("not a good") and over the modifier ("not very good")
+        skip_for_negation = ~known & (length <= 1) & ~negation
+        negated = known & (
+            flag(negation, previous(skip_for_negation))
+            | (prev_modifier & flag(negation, previous(skip_for_negation, np.where(prev_modifier, modifier_at, -1))))
+        )
+        # Negated modifiers weaken instead of strengthen ("not very good")
+        intensity = np.where(negated & prev_modifier, 1.0 / intensity, intensity)
+
+        polarity = np.clip(self._polarity[ids] * intensity, -1.0, 1.0)
+        subjectivity = np.clip(self._subjectivity[ids] * intensity, -1.0, 1.0)
+        counted = known & ~merged_away
+
+        # Each "!" boosts the latest assessment before it
+        latest = previous(~counted)
+        boosts = np.bincount(latest[exclamation & (latest >= 0)], minlength=n)
+        polarity = np.clip(polarity * 1.25 ** boosts, -1.0, 1.0)
+        # "not good" = slightly bad, "not bad" = slightly good
+        polarity = np.where(negated, polarity * -0.5, polarity)
+
+        weights = counted.astype(float)
+        count = np.bincount(docs, weights=weights, minlength=len(texts))
+        divisor = np.where(count > 0, count, 1.0)
+        polarity_mean = np.bincount(docs, weights=polarity * weights, minlength=len(texts)) / divisor
+        subjectivity_mean = np.bincount(docs, weights=subjectivity * weights, minlength=len(texts)) / divisor
+        return list(zip(polarity_mean.tolist(), subjectivity_mean.tolist()))
+
+
+class PatternBackend(LexiconBackend):
+    """LexiconBackend without the crypto terms: TextBlob's labels, much faster"""
+
+    name = 'pattern'
+
+    def __init__(self, lexicon_path: Optional[str] = None):
+        super().__init__(lexicon_path, extra={})
+
+
+SENTIMENT_BACKENDS = {
+    'textblob': TextBlobBackend,
+    'lexicon': LexiconBackend,
+    'pattern': PatternBackend,
+}
+_backends: Dict[str, SentimentBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def get_sentiment_backend(name: str) -> SentimentBackend:
+    """Shared instance of a registered backend (built on first use)"""
+    if name not in SENTIMENT_BACKENDS:
+        raise ValueError(f"Unknown sentiment backend {name!r}; choose from {sorted(SENTIMENT_BACKENDS)}")
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = SENTIMENT_BACKENDS[name]()
+        return _backends[name]
+
+
+_HEADLINE_SUBJECTS = ['Bitcoin', 'Ethereum', 'Solana', 'Crypto markets', 'BTC', 'Altcoins', 'Stablecoin issuer',
+                      'Exchange', 'DeFi protocol', 'Miners', 'ETF issuers', 'Traders', 'Analysts', 'Regulators']
+_HEADLINE_VERBS = ['surges', 'plunges', 'rallies', 'slumps', 'climbs', 'falls', 'rebounds', 'tumbles', 'holds',
+                   'trades flat', 'soars', 'crashes', 'is hacked', 'wins approval', 'faces lawsuit', 'stays quiet']
+_HEADLINE_TAILS = ['as investors turn bullish', 'amid fears of a recession', 'after a very strong week',
+                   'despite not so good data', 'on record inflows', 'as liquidations pile up', 'ahead of the halving',
+                   'in a volatile session', 'following a great earnings report', 'as regulators warn of fraud',
+                   'but analysts are not worried', 'with a really bad outlook', 'on positive news!',
+                   'after the worst month since 2022', 'as confidence returns', 'in quiet trading']
+
+
+def synthetic_headlines(count: int, seed: int = 0) -> List[str]:
+    """Offline corpus of market-news-like headlines for benchmarking"""
+    rng = random.Random(seed)
+    return [f"{rng.choice(_HEADLINE_SUBJECTS)} {rng.choice(_HEADLINE_VERBS)} {rng.choice(_HEADLINE_TAILS)}"
+            for _ in range(count)]
+
+
+def sentiment_label(polarity: float, threshold: float) -> str:
+    return 'positive' if polarity > threshold else 'negative' if polarity < -threshold else 'neutral'
+
+
+def benchmark(texts: Sequence[str], backends: Sequence[str] = ('textblob', 'lexicon'),
+              reference: str = 'textblob', threshold: float = 0.3) -> Dict[str, Dict]:
+    """Throughput of each backend and how often its labels agree with the reference backend"""
+    labels: Dict[str, List[str]] = {}
+    report: Dict[str, Dict] = {}
+    for name in dict.fromkeys([reference, *backends]):
+        started = time.perf_counter()
+        backend = get_sentiment_backend(name)
+        loaded = time.perf_counter()
+        scores = backend.score_batch(texts)
+        elapsed = time.perf_counter() - loaded
+        labels[name] = [sentiment_label(polarity, threshold) for polarity, _ in scores]
+        report[name] = {
+            'load_seconds': loaded - started,
+            'seconds': elapsed,
+            'per_second': len(texts) / elapsed if elapsed else float('inf'),
+        }
+    for name in report:
+        agreement = [a == b for a, b in zip(labels[name], labels[reference])]
+        report[name]['label_agreement'] = float(np.mean(agreement)) if agreement else 1.0
+        report[name]['labels'] = {label: labels[name].count(label) for label in ('positive', 'neutral', 'negative')}
+    return report
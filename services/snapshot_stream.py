@@ -0,0 +1,137 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, Mapping, Optional, Tuple
+
+from services.market_poller import MarketDataPoller, MarketSnapshot
+
+CANDLE_FIELDS = ('x', 'open', 'high', 'low', 'close')
+
+
+def _candle_delta(prev_trace: Mapping, cur_trace: Mapping) -> Optional[Dict]:
+    """New/updated candles turning prev_trace into cur_trace, None if they don't line up"""
+    prev_x = prev_trace.get('x') or []
+    cur_x = cur_trace.get('x') or []
+    if not prev_x or not cur_x:
+        return None
+    last = prev_x[-1]
+    # The previous last candle is normally the forming one, so search from the end
+    for pos in range(len(cur_x) - 1, -1, -1):
+        if cur_x[pos] == last:
+            break
+    else:
+        return None
+    candles = {field: list(cur_trace[field][pos:]) for field in CANDLE_FIELDS}
+    if len(candles['x']) == 1 and all(prev_trace[f][-1] == cur_trace[f][-1] for f in CANDLE_FIELDS):
+        return {}
+    # Always resend the previous last candle: it may have changed while forming
+    candles['replace_last'] = True
+    candles['max_points'] = len(cur_x)
+    return candles
+
+
+def build_delta(prev: Mapping[str, Any], cur: Mapping[str, Any]) -> Optional[Dict[str, Any]]:
+    """Minimal update that turns the prev payload into cur.
+
+    Returns None when the change cannot be expressed as a delta (e.g. the
+    candle window jumped), in which case the full snapshot should be sent.
+    """
+    delta: Dict[str, Any] = {}
+    changed = {key: value for key, value in cur.items()
+               if key != 'graph' and prev.get(key) != value}
+    if changed:
+        delta['changed'] = changed
+
+    prev_graph = prev.get('graph') or {}
+    cur_graph = cur.get('graph') or {}
+    prev_data = prev_graph.get('data') or []
+    cur_data = cur_graph.get('data') or []
+    if bool(prev_data) != bool(cur_data):
+        return None
+    if cur_data:
+        candles = _candle_delta(prev_data[0], cur_data[0])
+        if candles is None:
+            return None
+        if candles:
+            delta['candles'] = candles
+        if prev_data[1:] != cur_data[1:]:
+            delta['overlays'] = cur_data[1:]
+    if prev_graph.get('layout') != cur_graph.get('layout'):
+        delta['layout'] = cur_graph.get('layout')
+    return delta
+
+
+def format_event(event: str, event_id: str, data: bytes) -> bytes:
+    """Encode one server-sent event"""
+    return b''.join((
+        f"event: {event}\nid: {event_id}\n".encode('utf-8'),
+        b''.join(b"data: " + line + b"\n" for line in data.split(b"\n")),
+        b"\n",
+    ))
+
+
+class SnapshotStream:
+    """Turns poller snapshots into server-sent events.
+
+    A client first gets the full snapshot (or a delta, when it reconnects
+    with a Last-Event-ID still in the poller history) and afterwards only
+    deltas. Deltas are encoded once per version pair and shared by every
+    connected client.
+    """
+
+    def __init__(self, poller: MarketDataPoller, serialize: Callable[[Any], str],
+                 heartbeat: float, max_duration: float, retry_ms: int, cache_size: int = 16):
+        self.poller = poller
+        self.serialize = serialize
+        self.heartbeat = heartbeat
+        self.max_duration = max_duration
+        self.retry_ms = retry_ms
+        self.cache_size = cache_size
+        self._encoded: 'OrderedDict[Tuple[int, int], bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _event_id(self, snapshot: MarketSnapshot) -> str:
+        return f"{self.poller.instance}-{snapshot.version}"
+
+    def _resume_from(self, last_event_id: Optional[str]) -> Optional[MarketSnapshot]:
+        """Snapshot a reconnecting client already has, if this process still knows it"""
+        if not last_event_id:
+            return None
+        instance, _, version = last_event_id.partition('-')
+        if instance != self.poller.instance or not version.isdigit():
+            return None
+        return self.poller.get_snapshot(int(version))
+
+    def _encode(self, base: Optional[MarketSnapshot], snapshot: MarketSnapshot) -> bytes:
+        key = (base.version if base else 0, snapshot.version)
+        with self._lock:
+            event = self._encoded.get(key)
+            if event is not None:
+                self._encoded.move_to_end(key)
+                return event
+        delta = build_delta(base.payload, snapshot.payload) if base is not None else None
+        if delta is None:
+            event = format_event('snapshot', self._event_id(snapshot), snapshot.body)
+        else:
+            delta['base_version'] = base.version
+            delta['version'] = snapshot.version
+            body = self.serialize(delta)
+            event = format_event('delta', self._event_id(snapshot), body.encode('utf-8') if isinstance(body, str) else body)
+        with self._lock:
+            self._encoded[key] = event
+            while len(self._encoded) > self.cache_size:
+                self._encoded.popitem(last=False)
+        return event
+
+    def events(self, last_event_id: Optional[str] = None) -> Iterator[bytes]:
+        """Event stream for one client; ends after max_duration so the client reconnects"""
+        yield f"retry: {self.retry_ms}\n\n".encode('utf-8')
+        sent = self._resume_from(last_event_id)
+        deadline = time.time() + self.max_duration
+        while time.time() < deadline:
+            snapshot = self.poller.wait_for_snapshot(self.heartbeat, after_version=sent.version if sent else 0)
+            if snapshot is None:
+                yield b": ping\n\n"
+                continue
+            yield self._encode(sent, snapshot)
+            sent = snapshot
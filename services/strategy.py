@@ -0,0 +1,208 @@
+from dataclasses import asdict, dataclass
+from typing import Mapping, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    RSI_PERIOD, RSI_OVERBOUGHT, MACD_FAST, MACD_SLOW, MACD_SIGNAL, BB_PERIOD, BB_STD,
+    ADX_PERIOD, ATR_PERIOD, SMA_SHORT, SMA_LONG, ATR_MULTIPLIER, MIN_RISK_REWARD,
+    RISK_PER_TRADE, MAX_DAILY_TRADES, SIDEWAYS_ATR_THRESHOLD, SIDEWAYS_ADX_THRESHOLD,
+    SIDEWAYS_MIN_BARS, CRISIS_SENTIMENT_THRESHOLD
+)
+from services.indicators import TechnicalIndicators
+from services.market_analysis import MarketAnalyzer
+
+# Rows of valid ML features required before the dashboard makes a prediction
+MIN_FEATURE_ROWS = 50
+# Candles the dashboard analyzes on every refresh
+ANALYSIS_LOOKBACK = 200
+
+
+@dataclass(frozen=True)
+class StrategyParams:
+    """Tunable inputs of the dashboard strategy (defaults come from config)"""
+    rsi_period: int = RSI_PERIOD
+    rsi_overbought: float = RSI_OVERBOUGHT
+    macd_fast: int = MACD_FAST
+    macd_slow: int = MACD_SLOW
+    macd_signal: int = MACD_SIGNAL
+    bb_period: int = BB_PERIOD
+    bb_std: float = BB_STD
+    adx_period: int = ADX_PERIOD
+    atr_period: int = ATR_PERIOD
+    sma_short: int = SMA_SHORT
+    sma_long: int = SMA_LONG
+    atr_multiplier: float = ATR_MULTIPLIER
+    min_risk_reward: float = MIN_RISK_REWARD
+    risk_per_trade: float = RISK_PER_TRADE
+    max_daily_trades: int = MAX_DAILY_TRADES
+    sideways_atr_threshold: float = SIDEWAYS_ATR_THRESHOLD
+    sideways_adx_threshold: float = SIDEWAYS_ADX_THRESHOLD
+    sideways_min_bars: int = SIDEWAYS_MIN_BARS
+    crisis_sentiment_threshold: float = CRISIS_SENTIMENT_THRESHOLD
+    lookback: int = ANALYSIS_LOOKBACK
+
+    @property
+    def sma_short_column(self) -> str:
+        return f'sma_{self.sma_short}'
+
+    @property
+    def sma_long_column(self) -> str:
+        return f'sma_{self.sma_long}'
+
+    def replace(self, **changes) -> 'StrategyParams':
+        values = asdict(self)
+        values.update(changes)
+        return StrategyParams(**values)
+
+
+DEFAULT_PARAMS = StrategyParams()
+
+
+def add_strategy_indicators(df: pd.DataFrame, params: StrategyParams = DEFAULT_PARAMS) -> pd.DataFrame:
+    """Add the indicator columns the strategy reads, computed with params"""
+    return TechnicalIndicators.add_all_indicators(
+        df,
+        rsi_period=params.rsi_period,
+        macd_fast=params.macd_fast,
+        macd_slow=params.macd_slow,
+        macd_signal=params.macd_signal,
+        bb_period=params.bb_period,
+        bb_std=params.bb_std,
+        adx_period=params.adx_period,
+        atr_period=params.atr_period,
+        sma_periods=sorted({params.sma_short, params.sma_long})
+    )
+
+
+# --- Single candle (live dashboard) ---------------------------------------
+
+def predict_direction(candle: Mapping, params: StrategyParams = DEFAULT_PARAMS) -> int:
+    """Trend-based prediction: 1 (up) when SMAs, MACD and RSI agree, else 0"""
+    is_golden_cross = candle[params.sma_short_column] > candle[params.sma_long_column]
+    is_macd_bullish = candle['macd'] > candle['macd_signal']
+    return 1 if is_golden_cross and is_macd_bullish and candle['rsi'] < params.rsi_overbought else 0
+
+
+def entry_signal(candle: Mapping, ai_prediction: int, params: StrategyParams = DEFAULT_PARAMS) -> Union[bool, None]:
+    """True for a buy, False for a sell, None when the candle gives no entry"""
+    short, long_ = candle[params.sma_short_column], candle[params.sma_long_column]
+    if short > long_ and candle['macd'] > candle['macd_signal'] and ai_prediction == 1:
+        return True
+    if short < long_ and candle['macd'] < candle['macd_signal'] and ai_prediction == 0:
+        return False
+    return None
+
+
+def stop_levels(entry_price: float, atr: float, is_buy: bool,
+                params: StrategyParams = DEFAULT_PARAMS) -> Tuple[float, float]:
+    """ATR-based (stop_loss, take_profit) for an entry"""
+    distance = atr * params.atr_multiplier
+    if is_buy:
+        return entry_price - distance, entry_price + distance * params.min_risk_reward
+    return entry_price + distance, entry_price - distance * params.min_risk_reward
+
+
+# --- Whole series (backtesting) -------------------------------------------
+
+def feature_rows_ready(df: pd.DataFrame, params: StrategyParams) -> np.ndarray:
+    """Vectorized `len(prepare_features(df)) >= MIN_FEATURE_ROWS` for every bar"""
+    close = df['close']
+    columns = [
+        close.pct_change(),
+        (df['high'] - df['low']) / close,
+        (close - df['bb_lower']) / (df['bb_upper'] - df['bb_lower']),
+        df['rsi'], df['macd'] - df['macd_signal'], df['adx'], df['atr'] / close,
+        df[params.sma_short_column] / df[params.sma_long_column],
+        close / df[params.sma_short_column],
+        df['volume'] / df['volume_ma'],
+        (close - df['support']) / close,
+        (df['resistance'] - close) / close,
+    ]
+    valid = np.logical_and.reduce([column.notna().to_numpy() for column in columns])
+    return np.cumsum(valid) >= MIN_FEATURE_ROWS
+
+
+def _valid_conditions(df: pd.DataFrame) -> np.ndarray:
+    """Vectorized validate_trade_conditions() for every bar"""
+    rsi, adx, atr = (df[c].to_numpy(dtype=float) for c in ('rsi', 'adx', 'atr'))
+    with np.errstate(invalid='ignore'):
+        valid = ((rsi >= 0) & (rsi <= 100) & (adx >= 0) & (adx <= 100) & (atr > 0)
+                 & ~np.isnan(df['macd'].to_numpy(dtype=float)))
+    valid[:MIN_FEATURE_ROWS - 1] = False
+    return valid
+
+
+def limit_daily_entries(entries: np.ndarray, index: pd.DatetimeIndex, max_daily_trades: int) -> np.ndarray:
+    """Keep only the first max_daily_trades entries of each calendar day"""
+    positions = np.flatnonzero(entries)
+    if len(positions) == 0:
+        return entries
+    days = index[positions].normalize().asi8
+    # Rank of each entry within its day: position in the run of equal days
+    starts = np.r_[0, np.flatnonzero(np.diff(days)) + 1]
+    run_lengths = np.diff(np.r_[starts, len(days)])
+    rank = np.arange(len(days)) - np.repeat(starts, run_lengths)
+    limited = np.zeros_like(entries)
+    limited[positions[rank < max_daily_trades]] = True
+    return limited
+
+
+def market_context_series(df: pd.DataFrame, params: StrategyParams = DEFAULT_PARAMS,
+                          sentiment_score: Union[float, pd.Series] = 0.0) -> pd.DataFrame:
+    """MarketAnalyzer.context_series() (per-bar context and regime) with params' thresholds"""
+    return MarketAnalyzer.context_series(
+        df, sentiment_score,
+        lookback=params.lookback,
+        sideways_atr_threshold=params.sideways_atr_threshold,
+        sideways_adx_threshold=params.sideways_adx_threshold,
+        sideways_min_bars=params.sideways_min_bars,
+        crisis_sentiment_threshold=params.crisis_sentiment_threshold,
+        sma_column=params.sma_short_column,
+        trend_column=params.sma_long_column
+    )
+
+
+def generate_signals(df: pd.DataFrame, params: StrategyParams = DEFAULT_PARAMS,
+                     sentiment_score: Union[float, pd.Series] = 0.0) -> pd.DataFrame:
+    """Evaluate the dashboard entry rules on every bar at once.
+
+    df must already hold the strategy indicators (see add_strategy_indicators).
+    Each bar is judged the way build_dashboard_data() judges the newest
+    candle, with the market context computed over the trailing
+    params.lookback bars. Returns one row per bar with the entry side, its
+    SL/TP levels, whether the market context allowed trading and its regime.
+    """
+    short = df[params.sma_short_column].to_numpy(dtype=float)
+    long_ = df[params.sma_long_column].to_numpy(dtype=float)
+    macd = df['macd'].to_numpy(dtype=float)
+    macd_signal = df['macd_signal'].to_numpy(dtype=float)
+    rsi = df['rsi'].to_numpy(dtype=float)
+    close = df['close'].to_numpy(dtype=float)
+    atr = df['atr'].to_numpy(dtype=float)
+
+    context = market_context_series(df, params, sentiment_score)
+    with np.errstate(invalid='ignore'):
+        golden = short > long_
+        death = short < long_
+        bullish = macd > macd_signal
+        bearish = macd < macd_signal
+        ai_prediction = feature_rows_ready(df, params) & golden & bullish & (rsi < params.rsi_overbought)
+
+    tradable = context['can_trade'].to_numpy() & _valid_conditions(df)
+    buy = tradable & golden & bullish & ai_prediction
+    sell = tradable & death & bearish & ~ai_prediction
+    entries = limit_daily_entries(buy | sell, df.index, params.max_daily_trades)
+
+    distance = atr * params.atr_multiplier
+    side = np.where(buy, 1, -1)
+    return pd.DataFrame({
+        'entry': entries,
+        'is_buy': buy & entries,
+        'entry_price': close,
+        'stop_loss': close - side * distance,
+        'take_profit': close + side * distance * params.min_risk_reward,
+        'can_trade': context['can_trade'].to_numpy(),
+        'regime': context['regime'].values,
+    }, index=df.index)
@@ -0,0 +1,403 @@
+import math
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+NAN = float('nan')
+
+# Output columns in the same order TechnicalIndicators.add_all_indicators adds them
+INDICATOR_COLUMNS = [
+    'rsi', 'macd', 'macd_signal', 'macd_histogram',
+    'bb_middle', 'bb_upper', 'bb_lower', 'bb_high', 'bb_low',
+]
+
+
+def _div(a: float, b: float) -> float:
+    """Divide following NumPy semantics (inf/nan instead of ZeroDivisionError)"""
+    if b == 0:
+        if a == 0 or a != a:
+            return NAN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+class RollingStats:
+    """Fixed-size rolling mean/std with O(1) updates.
+
+    Values are stored shifted by a reference level to keep the running sum of
+    squares well conditioned, and the sums are rebuilt exactly once per window
+    so floating point drift never accumulates over long streams.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values: deque = deque()
+        self.nan_count = 0
+        self.shift = None
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.pushes = 0
+
+    def _sums_with(self, x: float) -> Tuple[int, int, float, float, float]:
+        """Return (count, nan_count, sum, sum_sq, shift) as if x were appended"""
+        count = len(self.values)
+        nan_count = self.nan_count
+        total = self.total
+        total_sq = self.total_sq
+        shift = self.shift if self.shift is not None else (x if x == x else 0.0)
+        if x != x:
+            nan_count += 1
+        else:
+            d = x - shift
+            total += d
+            total_sq += d * d
+        count += 1
+        if count > self.window:
+            old = self.values[0]
+            if old != old:
+                nan_count -= 1
+            else:
+                d = old - shift
+                total -= d
+                total_sq -= d * d
+            count -= 1
+        return count, nan_count, total, total_sq, shift
+
+    def _mean(self, count: int, nan_count: int, total: float, shift: float) -> float:
+        if count < self.window or nan_count:
+            return NAN
+        return shift + total / count
+
+    def _std(self, count: int, nan_count: int, total: float, total_sq: float) -> float:
+        if count < self.window or nan_count or count < 2:
+            return NAN
+        var = (total_sq - total * total / count) / (count - 1)
+        return math.sqrt(var) if var > 0 else 0.0
+
+    def push(self, x: float) -> None:
+        """Append a value to the window"""
+        count, nan_count, total, total_sq, shift = self._sums_with(x)
+        if self.shift is None and x == x:
+            self.shift = shift
+        self.values.append(x)
+        if len(self.values) > self.window:
+            self.values.popleft()
+        self.nan_count = nan_count
+        self.total = total
+        self.total_sq = total_sq
+        self.pushes += 1
+        if self.pushes % self.window == 0:
+            self._rebuild()
+
+    def _rebuild(self) -> None:
+        """Recompute the running sums exactly around the current mean"""
+        finite = [v for v in self.values if v == v]
+        self.shift = math.fsum(finite) / len(finite) if finite else None
+        shift = self.shift if self.shift is not None else 0.0
+        self.total = math.fsum(v - shift for v in finite)
+        self.total_sq = math.fsum((v - shift) ** 2 for v in finite)
+
+    def _state(self, x: float, commit: bool) -> Tuple[int, int, float, float, float]:
+        if commit:
+            self.push(x)
+            shift = self.shift if self.shift is not None else 0.0
+            return len(self.values), self.nan_count, self.total, self.total_sq, shift
+        return self._sums_with(x)
+
+    def mean(self, x: float, commit: bool) -> float:
+        """Rolling mean after appending x (x is only previewed unless commit)"""
+        count, nan_count, total, _, shift = self._state(x, commit)
+        return self._mean(count, nan_count, total, shift)
+
+    def mean_std(self, x: float, commit: bool) -> Tuple[float, float]:
+        """Rolling mean and sample std after appending x"""
+        count, nan_count, total, total_sq, shift = self._state(x, commit)
+        return self._mean(count, nan_count, total, shift), self._std(count, nan_count, total, total_sq)
+
+
+class RollingExtreme:
+    """Rolling min or max over a fixed window using a monotonic deque"""
+
+    def __init__(self, window: int, mode: str = 'min'):
+        self.window = window
+        self.is_min = mode == 'min'
+        self.candidates: deque = deque()  # (index, value), monotonic
+        self.nan_indexes: deque = deque()
+        self.count = 0
+
+    def _better(self, a: float, b: float) -> bool:
+        return a <= b if self.is_min else a >= b
+
+    def _preview(self, x: float) -> float:
+        index = self.count
+        start = index - self.window + 1
+        if index + 1 < self.window:
+            return NAN
+        if x != x or (self.nan_indexes and self.nan_indexes[-1] >= start):
+            return NAN
+        best = x
+        for i, v in self.candidates:
+            if i >= start:
+                if not self._better(best, v):
+                    best = v
+                break
+        return best
+
+    def push(self, x: float) -> None:
+        """Append a value to the window"""
+        index = self.count
+        if x != x:
+            self.nan_indexes.append(index)
+        else:
+            while self.candidates and self._better(x, self.candidates[-1][1]):
+                self.candidates.pop()
+            self.candidates.append((index, x))
+        self.count += 1
+        start = self.count - self.window
+        while self.candidates and self.candidates[0][0] < start:
+            self.candidates.popleft()
+        while self.nan_indexes and self.nan_indexes[0] < start:
+            self.nan_indexes.popleft()
+
+    def value(self, x: float, commit: bool) -> float:
+        """Rolling extreme after appending x (x is only previewed unless commit)"""
+        result = self._preview(x)
+        if commit:
+            self.push(x)
+        return result
+
+
+class EMA:
+    """Exponential moving average matching pandas ewm(span, adjust=False)"""
+
+    def __init__(self, span: int):
+        self.alpha = 2.0 / (span + 1.0)
+        self.state: Optional[float] = None
+
+    def value(self, x: float, commit: bool) -> float:
+        """EMA after appending x (x is only previewed unless commit)"""
+        if self.state is None:
+            result = x
+        elif x != x:
+            result = self.state
+        else:
+            result = self.state + self.alpha * (x - self.state)
+        if commit and result == result:
+            self.state = result
+        return result
+
+
+class StreamingIndicators:
+    """Stateful indicator engine that advances in O(1) per candle.
+
+    Produces the same columns as TechnicalIndicators.add_all_indicators. The
+    last candle is treated as still forming: feeding a candle with the same
+    timestamp again replaces it instead of advancing the state, so the engine
+    can be polled while the current candle is open.
+
+    Rolling indicators match a full recompute over the same window exactly;
+    EMA based ones (MACD) match a recompute over the whole stream the engine
+    has seen, since ewm(adjust=False) depends on where the series starts.
+    """
+
+    def __init__(self, rsi_period: int = 14, macd_fast: int = 12, macd_slow: int = 26,
+                 macd_signal: int = 9, bb_period: int = 20, bb_std: int = 2,
+                 adx_period: int = 14, atr_period: int = 14, sma_periods: list = None,
+                 volume_period: int = 20, sr_window: int = 50, history: int = 1000):
+        if sma_periods is None:
+            sma_periods = [20, 50]
+        self.params = dict(
+            rsi_period=rsi_period, macd_fast=macd_fast, macd_slow=macd_slow,
+            macd_signal=macd_signal, bb_period=bb_period, bb_std=bb_std,
+            adx_period=adx_period, atr_period=atr_period, sma_periods=list(sma_periods),
+            volume_period=volume_period, sr_window=sr_window, history=history
+        )
+        self.columns = INDICATOR_COLUMNS + [f'sma_{p}' for p in sma_periods] + [
+            'adx', 'atr', 'volume_ma', 'support', 'resistance'
+        ]
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop all state"""
+        p = self.params
+        self._rsi_gain = RollingStats(p['rsi_period'])
+        self._rsi_loss = RollingStats(p['rsi_period'])
+        self._ema_fast = EMA(p['macd_fast'])
+        self._ema_slow = EMA(p['macd_slow'])
+        self._ema_signal = EMA(p['macd_signal'])
+        self._bb = RollingStats(p['bb_period'])
+        self._smas = [RollingStats(period) for period in p['sma_periods']]
+        self._adx_tr = RollingStats(p['adx_period'])
+        self._adx_plus = RollingStats(p['adx_period'])
+        self._adx_minus = RollingStats(p['adx_period'])
+        self._adx_dx = RollingStats(p['adx_period'])
+        self._atr_tr = RollingStats(p['atr_period'])
+        self._volume = RollingStats(p['volume_period'])
+        self._support = RollingExtreme(p['sr_window'], 'min')
+        self._resistance = RollingExtreme(p['sr_window'], 'max')
+        self._prev: Optional[Tuple[float, float, float]] = None  # high, low, close
+        self._pending: Optional[Tuple] = None  # (timestamp, open, high, low, close, volume)
+        self._history: deque = deque(maxlen=p['history'])
+
+    @property
+    def last_timestamp(self):
+        """Timestamp of the most recent (possibly forming) candle"""
+        return self._pending[0] if self._pending else None
+
+    def __len__(self) -> int:
+        return len(self._history)
+
+    def _reseed(self, size: int) -> None:
+        self.reset()
+        if size > self._history.maxlen:
+            self._history = deque(maxlen=size)
+
+    def _compute(self, bar: Tuple, commit: bool) -> Tuple[float, ...]:
+        """Evaluate every indicator for one bar, advancing state when commit"""
+        _, _, high, low, close, volume = bar
+        p = self.params
+
+        if self._prev is None:
+            delta = NAN
+            plus_dm = NAN
+            minus_dm = NAN
+            tr = high - low
+        else:
+            prev_high, prev_low, prev_close = self._prev
+            delta = close - prev_close
+            plus_dm = high - prev_high
+            if plus_dm < 0:
+                plus_dm = 0.0
+            minus_dm = low - prev_low
+            if minus_dm > 0:
+                minus_dm = 0.0
+            minus_dm = abs(minus_dm)
+            ranges = [v for v in (high - low, abs(high - prev_close), abs(low - prev_close)) if v == v]
+            tr = max(ranges) if ranges else NAN
+
+        # RSI: NaN deltas count as zero gain/loss, as with Series.where
+        gain = self._rsi_gain.mean(delta if delta > 0 else 0.0, commit)
+        loss = self._rsi_loss.mean(-delta if delta < 0 else 0.0, commit)
+        rsi = 100 - _div(100, 1 + _div(gain, loss))
+
+        # MACD
+        macd = self._ema_fast.value(close, commit) - self._ema_slow.value(close, commit)
+        macd_signal = self._ema_signal.value(macd, commit)
+
+        # Bollinger Bands
+        bb_middle, bb_dev = self._bb.mean_std(close, commit)
+        bb_upper = bb_middle + bb_dev * p['bb_std']
+        bb_lower = bb_middle - bb_dev * p['bb_std']
+
+        smas = [sma.mean(close, commit) for sma in self._smas]
+
+        # ADX
+        atr_adx = self._adx_tr.mean(tr, commit)
+        plus_di = 100 * _div(self._adx_plus.mean(plus_dm, commit), atr_adx)
+        minus_di = 100 * _div(self._adx_minus.mean(minus_dm, commit), atr_adx)
+        dx = 100 * _div(abs(plus_di - minus_di), plus_di + minus_di)
+        adx = self._adx_dx.mean(dx, commit)
+
+        atr = self._atr_tr.mean(tr, commit)
+        volume_ma = self._volume.mean(volume, commit)
+        support = self._support.value(low, commit)
+        resistance = self._resistance.value(high, commit)
+
+        if commit:
+            self._prev = (high, low, close)
+
+        return (rsi, macd, macd_signal, macd - macd_signal,
+                bb_middle, bb_upper, bb_lower, bb_upper, bb_lower,
+                *smas, adx, atr, volume_ma, support, resistance)
+
+    def update(self, timestamp, open_: float, high: float, low: float,
+               close: float, volume: float) -> Dict[str, float]:
+        """Feed one candle and return the indicator values for it"""
+        with self._lock:
+            return dict(zip(self.columns, self._update(
+                (timestamp, float(open_), float(high), float(low), float(close), float(volume))
+            )))
+
+    def _update(self, bar: Tuple) -> Tuple[float, ...]:
+        timestamp = bar[0]
+        if self._pending is not None:
+            if timestamp < self._pending[0]:
+                raise ValueError(f"Out of order candle {timestamp} < {self._pending[0]}")
+            if timestamp == self._pending[0]:
+                self._history.pop()
+            else:
+                self._compute(self._pending, commit=True)
+        values = self._compute(bar, commit=False)
+        self._pending = bar
+        self._history.append((timestamp, values))
+        return values
+
+    def update_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Sync the engine with a freshly fetched candle frame.
+
+        Only candles at or after the last seen timestamp are processed; if the
+        frame does not line up with the engine history (first run, gap, or
+        reordered data) the engine is reseeded from the frame.
+        Returns a copy of df with the indicator columns added.
+        """
+        with self._lock:
+            if df is None or df.empty:
+                return df
+            index = df.index
+            ohlcv = df[['open', 'high', 'low', 'close', 'volume']].to_numpy(dtype=float)
+
+            last = self.last_timestamp
+            start = None
+            if last is not None and len(df) <= self._history.maxlen:
+                position = int(index.searchsorted(last))
+                if position < len(index) and index[position] == last:
+                    start = position
+            if start is None:
+                self._reseed(len(df))
+                start = 0
+
+            for i in range(start, len(index)):
+                self._update((index[i], *ohlcv[i]))
+
+            rows = list(self._history)[-len(df):]
+            if len(rows) != len(df) or any(ts != index[i] for i, (ts, _) in enumerate(rows)):
+                # History has holes relative to the frame; rebuild from scratch
+                self._reseed(len(df))
+                for i in range(len(index)):
+                    self._update((index[i], *ohlcv[i]))
+                rows = list(self._history)
+
+            values = np.array([v for _, v in rows], dtype=float)
+            indicators = pd.DataFrame(values, index=index, columns=self.columns)
+            return pd.concat([df.drop(columns=self.columns, errors='ignore'), indicators], axis=1)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Indicator history as a DataFrame indexed by candle timestamp"""
+        with self._lock:
+            rows = list(self._history)
+        return pd.DataFrame([v for _, v in rows], index=[ts for ts, _ in rows], columns=self.columns)
+
+
+_engines: Dict[Tuple[str, str], StreamingIndicators] = {}
+_engines_lock = threading.Lock()
+
+
+def get_indicator_engine(symbol: str, timeframe: str, **params) -> StreamingIndicators:
+    """Get (or create) the streaming engine for a symbol/timeframe pair"""
+    key = (symbol, timeframe)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = StreamingIndicators(**params)
+            _engines[key] = engine
+        return engine
+
+
+def list_indicator_engines() -> List[Tuple[str, str]]:
+    """Symbol/timeframe pairs with a live engine"""
+    with _engines_lock:
+        return list(_engines.keys())
@@ -0,0 +1,195 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config import (
+    TRADE_LEDGER_ENABLED, TRADE_LEDGER_PATH, TRADE_LEDGER_SYNC, TRADE_LEDGER_SNAPSHOT_EVERY
+)
+
+# (seq, kind, trade_id, payload)
+Event = Tuple[int, str, Optional[int], Optional[Dict]]
+
+
+class TradeLedger:
+    """Append-only, write-ahead log of trade events shared by every worker.
+
+    Events are 'open' (the new trade), 'close' (the closed trade) and 'reset'.
+    They live in a SQLite table in WAL mode, so each worker folds the same
+    sequence into its own book and picks up other workers' trades by reading
+    the events after the last one it applied. Every `snapshot_every` events
+    the folded state is stored as a snapshot; recovery loads the newest
+    snapshot and replays only the events after it, however long the history.
+    """
+
+    def __init__(self, path: str, synchronous: str = TRADE_LEDGER_SYNC,
+                 snapshot_every: int = TRADE_LEDGER_SNAPSHOT_EVERY):
+        self.path = path
+        self.synchronous = synchronous
+        self.snapshot_every = snapshot_every
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, "
+            "trade_id INTEGER, payload TEXT, created_at REAL NOT NULL)"
+        )
+        if 'signal_key' not in {row[1] for row in conn.execute("PRAGMA table_info(events)")}:
+            conn.execute("ALTER TABLE events ADD COLUMN signal_key TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS events_trade ON events (trade_id, kind)")
+        conn.execute("CREATE INDEX IF NOT EXISTS events_signal ON events (signal_key)")
+        conn.execute("CREATE INDEX IF NOT EXISTS events_kind ON events (kind, seq)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            "seq INTEGER PRIMARY KEY, state TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={self.synchronous}")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _last_reset(self, conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM events WHERE kind = 'reset'").fetchone()[0]
+
+    def _append(self, kind: str, trade_id: Optional[int], payload: Optional[Dict],
+                signal_key: Optional[str] = None) -> int:
+        cursor = self._connection().execute(
+            "INSERT INTO events (kind, trade_id, payload, created_at, signal_key) VALUES (?, ?, ?, ?, ?)",
+            (kind, trade_id, json.dumps(payload) if payload is not None else None, time.time(), signal_key)
+        )
+        return cursor.lastrowid
+
+    def open_trade(self, payload: Dict, signal_key: Optional[str] = None) -> Optional[int]:
+        """Append an 'open' event, assigning the next trade id across all workers.
+
+        Every worker evaluates the same signal on the same candle; with a
+        signal_key (e.g. symbol, side and signal candle) only the first one
+        opens a trade and the others get None.
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if signal_key is not None and conn.execute(
+                "SELECT 1 FROM events WHERE signal_key = ? AND kind = 'open' AND seq > ? LIMIT 1",
+                (signal_key, self._last_reset(conn))
+            ).fetchone():
+                conn.execute("COMMIT")
+                return None
+            trade_id = conn.execute("SELECT COALESCE(MAX(trade_id), 0) + 1 FROM events").fetchone()[0]
+            self._append('open', trade_id, {**payload, 'id': trade_id}, signal_key)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return trade_id
+
+    def opened_since(self, since: float) -> int:
+        """Trades opened at or after the epoch time since (and after the last reset)"""
+        conn = self._connection()
+        return conn.execute(
+            "SELECT COUNT(*) FROM events WHERE kind = 'open' AND seq > ? AND created_at >= ?",
+            (self._last_reset(conn), since)
+        ).fetchone()[0]
+
+    def close_trade(self, trade_id: int, payload: Dict) -> bool:
+        """Append a 'close' event unless the trade is not open (closed by another worker, or reset)"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            kinds = dict(conn.execute(
+                "SELECT kind, MAX(seq) FROM events WHERE trade_id = ? GROUP BY kind", (trade_id,)
+            ).fetchall())
+            is_open = 'open' in kinds and 'close' not in kinds and kinds['open'] > self._last_reset(conn)
+            if is_open:
+                self._append('close', trade_id, payload)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return is_open
+
+    def reset(self) -> int:
+        """Append a 'reset' event; trades before it are kept but no longer folded"""
+        return self._append('reset', None, None)
+
+    def events_since(self, seq: int) -> List[Event]:
+        rows = self._connection().execute(
+            "SELECT seq, kind, trade_id, payload FROM events WHERE seq > ? ORDER BY seq", (seq,)
+        ).fetchall()
+        return [(s, kind, trade_id, json.loads(payload) if payload is not None else None)
+                for s, kind, trade_id, payload in rows]
+
+    def last_seq(self) -> int:
+        return self._connection().execute("SELECT COALESCE(MAX(seq), 0) FROM events").fetchone()[0]
+
+    def latest_snapshot(self) -> Tuple[int, Optional[Dict]]:
+        row = self._connection().execute(
+            "SELECT seq, state FROM snapshots ORDER BY seq DESC LIMIT 1"
+        ).fetchone()
+        return (row[0], json.loads(row[1])) if row else (0, None)
+
+    def write_snapshot(self, seq: int, state: Dict) -> None:
+        """Store the state folded up to seq, keeping the previous snapshot as a fallback"""
+        conn = self._connection()
+        conn.execute("INSERT OR IGNORE INTO snapshots (seq, state, created_at) VALUES (?, ?, ?)",
+                     (seq, json.dumps(state), time.time()))
+        conn.execute("DELETE FROM snapshots WHERE seq NOT IN (SELECT seq FROM snapshots ORDER BY seq DESC LIMIT 2)")
+
+    def closed_trades(self, limit: Optional[int] = None, until_seq: Optional[int] = None) -> List[Dict]:
+        """Trades closed since the last reset, oldest first (the newest `limit` if given)"""
+        conn = self._connection()
+        query = "SELECT payload FROM events WHERE kind = 'close' AND seq > ?"
+        params: list = [self._last_reset(conn)]
+        if until_seq is not None:
+            query += " AND seq <= ?"
+            params.append(until_seq)
+        query += " ORDER BY seq DESC"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        rows = conn.execute(query, params).fetchall()
+        return [json.loads(row[0]) for row in reversed(rows)]
+
+    def closed_after(self, after_seq: int, limit: int, until_seq: Optional[int] = None) -> List[Tuple[int, Dict]]:
+        """(seq, trade) of the first `limit` trades closed after event after_seq (and the last reset), oldest first"""
+        conn = self._connection()
+        return [(seq, json.loads(payload)) for seq, payload in conn.execute(
+            "SELECT seq, payload FROM events WHERE kind = 'close' AND seq > ? AND seq <= ? ORDER BY seq LIMIT ?",
+            (max(after_seq, self._last_reset(conn)), until_seq if until_seq is not None else self.last_seq(), limit)
+        )]
+
+    def closed_pnl(self, until_seq: Optional[int] = None) -> List[Optional[float]]:
+        """P&L of the trades closed since the last reset, in closing order"""
+        conn = self._connection()
+        return [row[0] for row in conn.execute(
+            "SELECT json_extract(payload, '$.pnl') FROM events WHERE kind = 'close' AND seq > ? AND seq <= ? ORDER BY seq",
+            (self._last_reset(conn), until_seq if until_seq is not None else self.last_seq())
+        )]
+
+
+_trade_ledger: Optional[TradeLedger] = None
+_trade_ledger_lock = threading.Lock()
+
+
+def get_trade_ledger() -> Optional[TradeLedger]:
+    """Process-wide TradeLedger, or None when disabled or unavailable (trades then stay in memory)"""
+    global _trade_ledger
+    if not TRADE_LEDGER_ENABLED:
+        return None
+    with _trade_ledger_lock:
+        if _trade_ledger is None:
+            try:
+                os.makedirs(os.path.dirname(TRADE_LEDGER_PATH) or '.', exist_ok=True)
+                _trade_ledger = TradeLedger(TRADE_LEDGER_PATH)
+            except (OSError, sqlite3.Error) as e:
+                print(f"[WARN] Trade ledger unavailable, keeping trades in memory: {e}")
+                return None
+        return _trade_ledger
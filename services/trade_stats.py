@@ -0,0 +1,128 @@
+import math
+from array import array
+from typing import Dict, Optional
+
+from config import INITIAL_BALANCE
+
+
+class TradeStats:
+    """Running performance statistics over closed trades.
+
+    add() is O(1) and every figure is an O(1) read, so the dashboard cost
+    does not grow with the history. Per-trade returns (pnl_percent) feed a
+    Welford mean/variance for the Sharpe ratio and a running sum of squared
+    losses for the Sortino ratio; both are per trade, not annualized.
+    Win/loss classification matches the original list scans: a zero P&L
+    trade counts towards the total but is neither a win nor a loss.
+    """
+
+    SCALARS = ('count', 'wins', 'losses', 'total_pnl', 'gross_profit', 'gross_loss',
+               'peak', 'max_drawdown', 'max_drawdown_peak', 'mean_return', 'm2_return', 'downside_sq', 'returns')
+
+    def __init__(self, initial_balance: float = INITIAL_BALANCE, keep_equity: bool = True):
+        self.initial_balance = initial_balance
+        self.keep_equity = keep_equity
+        self.equity = array('d')  # balance after each closed trade
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.wins = 0
+        self.losses = 0
+        self.total_pnl = 0.0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        self.peak = self.initial_balance
+        self.max_drawdown = 0.0
+        self.max_drawdown_peak = self.initial_balance
+        self.returns = 0
+        self.mean_return = 0.0
+        self.m2_return = 0.0
+        self.downside_sq = 0.0
+        del self.equity[:]
+
+    def add(self, pnl: Optional[float], pnl_percent: Optional[float] = None):
+        """Account for one closed trade"""
+        self.count += 1
+        if pnl is not None:
+            self.total_pnl += pnl
+        if pnl and pnl > 0:
+            self.wins += 1
+            self.gross_profit += pnl
+        elif pnl:
+            self.losses += 1
+            self.gross_loss -= pnl
+
+        balance = self.balance
+        if self.keep_equity:
+            self.equity.append(balance)
+        if balance > self.peak:
+            self.peak = balance
+        elif self.peak - balance > self.max_drawdown:
+            self.max_drawdown = self.peak - balance
+            self.max_drawdown_peak = self.peak
+
+        if pnl_percent is not None:
+            self.returns += 1
+            delta = pnl_percent - self.mean_return
+            self.mean_return += delta / self.returns
+            self.m2_return += delta * (pnl_percent - self.mean_return)
+            if pnl_percent < 0:
+                self.downside_sq += pnl_percent * pnl_percent
+
+    @property
+    def balance(self) -> float:
+        return self.initial_balance + self.total_pnl
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.count * 100 if self.count else 0.0
+
+    @property
+    def profit_factor(self) -> float:
+        return self.gross_profit / self.gross_loss if self.gross_loss > 0 else 0.0
+
+    @property
+    def max_drawdown_percent(self) -> float:
+        return self.max_drawdown / self.max_drawdown_peak * 100 if self.max_drawdown_peak > 0 else 0.0
+
+    @property
+    def return_std(self) -> float:
+        return math.sqrt(self.m2_return / (self.returns - 1)) if self.returns > 1 else 0.0
+
+    @property
+    def sharpe_ratio(self) -> float:
+        std = self.return_std
+        return self.mean_return / std if std > 0 else 0.0
+
+    @property
+    def sortino_ratio(self) -> float:
+        downside = math.sqrt(self.downside_sq / self.returns) if self.returns else 0.0
+        return self.mean_return / downside if downside > 0 else 0.0
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'closed_trades': self.count,
+            'wins': self.wins,
+            'losses': self.losses,
+            'win_rate': self.win_rate,
+            'profit_factor': self.profit_factor,
+            'total_pnl': self.total_pnl,
+            'gross_profit': self.gross_profit,
+            'gross_loss': self.gross_loss,
+            'max_drawdown': self.max_drawdown,
+            'max_drawdown_percent': self.max_drawdown_percent,
+            'avg_return_percent': self.mean_return,
+            'sharpe_ratio': self.sharpe_ratio,
+            'sortino_ratio': self.sortino_ratio,
+        }
+
+    def to_dict(self) -> Dict[str, float]:
+        """Scalar state for snapshots (the equity curve is not included)"""
+        return {name: getattr(self, name) for name in self.SCALARS}
+
+    def load(self, state: Dict[str, float]):
+        self.reset()
+        for name in self.SCALARS:
+            if name in state:
+                setattr(self, name, state[name])
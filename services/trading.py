@@ -1,19 +1,129 @@
-import time
-from datetime import datetime
-from typing import Dict, Optional, List
-from models.trade import Trade
-from config import RISK_PER_TRADE
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional, List, Tuple
+from models.trade import Trade, utc_now
+from models.trade_store import TradeStore
+from services.execution import ExecutionCosts
+from services.trade_ledger import TradeLedger
+from services.trade_stats import TradeStats
+from services.trigger_index import TriggerIndex
+from config import INITIAL_BALANCE, RISK_PER_TRADE, TRADE_HISTORY_MEMORY
 
 class TradingService:
-    def __init__(self):
-        self.trade_history: List[Trade] = []
+    """Open positions and closed trades.
+
+    Without a ledger the book lives in this object only. With a TradeLedger
+    every change is appended to the shared log first and the book is the
+    fold of its events, so all workers (and restarts) see the same trades;
+    each public method catches up with the log before answering.
+
+    Fills follow the ExecutionSimulator's cost model: entries and stops are
+    market orders paying slippage and the taker fee, stops filling at the
+    triggering price (gaps included), take profits limit orders paying the
+    maker fee. Fees are kept on the trade and deducted from its P&L.
+    """
+
+    def __init__(self, ledger: Optional[TradeLedger] = None, initial_balance: float = INITIAL_BALANCE,
+                 costs: ExecutionCosts = ExecutionCosts()):
+        self.trade_history = TradeStore()  # closed trades, columnar
         self.current_positions: Dict[str, Trade] = {}
+        self._triggers: Dict[str, TriggerIndex] = {}  # symbol -> SL/TP levels of its open positions
         self.next_trade_id = 1
-        
+        self._signal_keys = set()  # signals already traded, without a ledger
+        self._closed_seq = 0  # trades ever closed, the trade cursor without a ledger (not reset)
+        self.ledger = ledger
+        self.costs = costs
+        self._lock = threading.RLock()
+        self._seq = 0  # last ledger event folded into the book
+        self._snapshot_seq = 0
+        # Updated as trades close, so statistics do not rescan the history; with a ledger
+        # the equity curve is read back from it instead of being kept in every worker
+        self.stats = TradeStats(initial_balance, keep_equity=ledger is None)
+        if ledger is not None:
+            self._recover()
+
+    def _recover(self):
+        """Rebuild the book from the newest snapshot plus the events after it"""
+        self._snapshot_seq, state = self.ledger.latest_snapshot()
+        if state is not None:
+            self._seq = self._snapshot_seq
+            self.next_trade_id = state['next_trade_id']
+            for position in state['positions']:
+                self._add_position(str(position['id']), Trade.from_dict(position))
+            self.stats.load(state['totals'])
+        self._sync()
+        self.trade_history = TradeStore.from_trades(
+            Trade.from_dict(t) for t in self.ledger.closed_trades(TRADE_HISTORY_MEMORY, until_seq=self._seq)
+        )
+
+    def _sync(self):
+        """Fold ledger events appended since the last call (by any worker)"""
+        if self.ledger is None:
+            return
+        with self._lock:
+            for seq, kind, trade_id, payload in self.ledger.events_since(self._seq):
+                self._apply(kind, trade_id, payload)
+                self._seq = seq
+            if self._seq - self._snapshot_seq >= self.ledger.snapshot_every:
+                self.ledger.write_snapshot(self._seq, {
+                    'next_trade_id': self.next_trade_id,
+                    'positions': [t.to_dict() for t in self.current_positions.values()],
+                    'totals': self.stats.to_dict(),
+                })
+                self._snapshot_seq = self._seq
+
+    def _apply(self, kind: str, trade_id: Optional[int], payload: Optional[Dict]):
+        if kind == 'open':
+            self._add_position(str(trade_id), Trade.from_dict(payload))
+            self.next_trade_id = max(self.next_trade_id, trade_id + 1)
+        elif kind == 'close':
+            self._remove_position(str(trade_id))
+            self._record_closed(Trade.from_dict(payload))
+        elif kind == 'reset':
+            self.current_positions = {}
+            self._triggers = {}
+            self.trade_history = TradeStore()
+            self._signal_keys = set()
+            self.stats.reset()
+
+    def _add_position(self, trade_id: str, trade: Trade):
+        self.current_positions[trade_id] = trade
+        self._triggers.setdefault(trade.symbol, TriggerIndex()).add(
+            trade_id, trade.side == 'buy', trade.entry_price, trade.size, trade.stop_loss, trade.take_profit
+        )
+
+    def _remove_position(self, trade_id: str):
+        trade = self.current_positions.pop(trade_id, None)
+        if trade is not None:
+            self._triggers[trade.symbol].remove(trade_id)
+
+    def _record_closed(self, trade: Trade):
+        self.trade_history.append(trade)
+        self._closed_seq += 1
+        if self.ledger is not None and len(self.trade_history) > 2 * TRADE_HISTORY_MEMORY:
+            self.trade_history.keep_last(TRADE_HISTORY_MEMORY)
+        self.stats.add(trade.pnl, trade.pnl_percent)
+
+    def reset(self):
+        """Drop all positions and history (kept in the ledger, but no longer counted)"""
+        with self._lock:
+            if self.ledger is not None:
+                self.ledger.reset()
+                self._sync()
+            else:
+                self._apply('reset', None, None)
+                self.next_trade_id = 1
+
     def execute_trade(self, symbol: str, is_buy: bool, entry_price: float, 
                      stop_loss: float, take_profit: float, size: float = None,
-                     risk_amount: float = None, current_balance: float = 1000.0) -> Optional[Trade]:
-        """Execute a new trade"""
+                     risk_amount: float = None, current_balance: float = 1000.0,
+                     signal_key: Optional[str] = None) -> Optional[Trade]:
+        """Execute a new trade.
+
+        signal_key identifies the signal (symbol, side, candle): a signal
+        already traded, by this or any other worker, opens nothing and
+        returns None.
+        """
         try:
             if risk_amount is None:
                 risk_amount = current_balance * RISK_PER_TRADE
@@ -25,6 +135,8 @@ class TradingService:
                     return None
                 size = risk_amount / risk_per_unit
             
+            # Market order: filled with slippage, paying the taker fee
+            entry_price = self.costs.market_price(entry_price, buying=is_buy)
             trade = Trade(
                 id=self.next_trade_id,
                 symbol=symbol,
@@ -34,12 +146,25 @@ class TradingService:
                 take_profit=take_profit,
                 size=size,
                 risk_amount=risk_amount,
-                entry_time=datetime.now(),
-                status='open'
+                entry_time=utc_now(),
+                status='open',
+                fees=entry_price * size * self.costs.taker_fee
             )
             
-            self.current_positions[str(self.next_trade_id)] = trade
-            self.next_trade_id += 1
+            with self._lock:
+                if self.ledger is not None:
+                    trade_id = self.ledger.open_trade(trade.to_dict(), signal_key)
+                    self._sync()
+                    if trade_id is None:
+                        return None
+                    trade = self.current_positions.get(str(trade_id), trade)
+                else:
+                    if signal_key is not None:
+                        if signal_key in self._signal_keys:
+                            return None
+                        self._signal_keys.add(signal_key)
+                    self._add_position(str(self.next_trade_id), trade)
+                    self.next_trade_id += 1
             
             print(f"Trade executed: {trade.side} {trade.symbol} at {trade.entry_price}")
             return trade
@@ -48,28 +173,50 @@ class TradingService:
             print(f"Error executing trade: {e}")
             return None
     
-    def close_position(self, trade_id: str, exit_price: float) -> bool:
-        """Close an open position"""
+    def trades_opened_since(self, since: datetime) -> int:
+        """Trades opened at or after since, by every worker when there is a ledger"""
+        if self.ledger is not None:
+            return self.ledger.opened_since(since.timestamp())
+        since = datetime.fromtimestamp(since.timestamp(), timezone.utc).replace(tzinfo=None)
+        with self._lock:
+            opened = [t.entry_time for t in self.current_positions.values()]
+            if len(self.trade_history):
+                opened.extend(self.trade_history.column('entry_time').astype('datetime64[us]').tolist())
+            return sum(1 for t in opened if t is not None and t >= since)
+
+    def close_position(self, trade_id: str, exit_price: float, fee_rate: float = None) -> bool:
+        """Close an open position at exit_price (a market order, paying the taker fee, by default)"""
+        self._lock.acquire()
         try:
+            self._sync()
             if trade_id not in self.current_positions:
                 return False
                 
             trade = self.current_positions[trade_id]
             trade.exit_price = exit_price
-            trade.exit_time = datetime.now()
+            trade.exit_time = utc_now()
             trade.status = 'closed'
             
             # Calculate P&L
+            if fee_rate is None:
+                fee_rate = self.costs.taker_fee
+            trade.fees += exit_price * trade.size * fee_rate
             if trade.side == 'buy':
-                trade.pnl = (exit_price - trade.entry_price) * trade.size
+                trade.pnl = (exit_price - trade.entry_price) * trade.size - trade.fees
             else:
-                trade.pnl = (trade.entry_price - exit_price) * trade.size
+                trade.pnl = (trade.entry_price - exit_price) * trade.size - trade.fees
                 
             trade.pnl_percent = (trade.pnl / (trade.entry_price * trade.size)) * 100
             
             # Move to history
-            self.trade_history.append(trade)
-            del self.current_positions[trade_id]
+            if self.ledger is not None:
+                closed = self.ledger.close_trade(trade.id, trade.to_dict())
+                self._sync()
+                if not closed:  # closed by another worker, or reset
+                    return False
+            else:
+                self._remove_position(trade_id)
+                self._record_closed(trade)
             
             print(f"Position closed: {trade.side} {trade.symbol} at {exit_price}, P&L: {trade.pnl:.2f}")
             return True
@@ -77,46 +224,37 @@ class TradingService:
         except Exception as e:
             print(f"Error closing position: {e}")
             return False
+        finally:
+            self._lock.release()
     
-    def check_open_positions(self, current_price: float, 
-                             current_balance: float) -> tuple:
-        """Check all open positions for stop loss or take profit triggers"""
+    def check_open_positions(self, current_price: float, current_balance: float,
+                             high: float = None, low: float = None, symbol: str = None) -> tuple:
+        """Check open positions for stop loss or take profit triggers.
+
+        high/low is the range traded since the last check (defaults to
+        current_price); symbol limits the check to one market, otherwise every
+        open position is compared against current_price. Only positions whose
+        levels were crossed are visited.
+        """
         closed_trades = []
-        total_pnl = 0.0
         
         try:
-            positions_to_close = []
-            
-            for trade_id, trade in self.current_positions.items():
-                if trade.status != 'open':
-                    continue
-                    
-                pnl = 0.0
-                if trade.side == 'buy':
-                    pnl = (current_price - trade.entry_price) * trade.size
-                    # Check stop loss and take profit
-                    if current_price <= trade.stop_loss:
-                        positions_to_close.append((trade_id, trade.stop_loss))
-                        print(f"Stop loss triggered for {trade.symbol}")
-                    elif current_price >= trade.take_profit:
-                        positions_to_close.append((trade_id, trade.take_profit))
-                        print(f"Take profit triggered for {trade.symbol}")
-                else:  # sell
-                    pnl = (trade.entry_price - current_price) * trade.size
-                    # Check stop loss and take profit
-                    if current_price >= trade.stop_loss:
-                        positions_to_close.append((trade_id, trade.stop_loss))
-                        print(f"Stop loss triggered for {trade.symbol}")
-                    elif current_price <= trade.take_profit:
-                        positions_to_close.append((trade_id, trade.take_profit))
-                        print(f"Take profit triggered for {trade.symbol}")
+            with self._lock:
+                self._sync()
+                indexes = [self._triggers.get(symbol, TriggerIndex())] if symbol else list(self._triggers.values())
+                total_pnl = sum(index.unrealized_pnl(current_price) for index in indexes)
+                positions_to_close = [hit for index in indexes for hit in index.triggered(current_price, high, low)]
                 
-                total_pnl += pnl
-            
-            # Close positions
-            for trade_id, exit_price in positions_to_close:
-                if self.close_position(trade_id, exit_price):
-                    closed_trades.append(trade_id)
+                # Close positions
+                for trade_id, level, reason in positions_to_close:
+                    trade = self.current_positions.get(trade_id)
+                    if trade is None:  # closed by another worker, folded in by an earlier close's sync
+                        continue
+                    print(f"{'Stop loss' if reason == 'stop_loss' else 'Take profit'} triggered for {trade.symbol}")
+                    exit_price, fee_rate = self.costs.exit_fill(trade.side == 'buy', current_price, level,
+                                                                is_stop=reason == 'stop_loss')
+                    if self.close_position(trade_id, exit_price, fee_rate):
+                        closed_trades.append(trade_id)
             
             return closed_trades, total_pnl
             
@@ -126,39 +264,76 @@ class TradingService:
     
     def get_open_positions(self) -> Dict[str, Trade]:
         """Get all open positions"""
+        self._sync()
         return self.current_positions.copy()
     
     def get_trade_history(self, limit: int = None) -> List[Trade]:
         """Get trade history"""
+        self._sync()
+        if self.ledger is not None and (not limit or limit > len(self.trade_history)):
+            # Older trades are only in the ledger
+            return [Trade.from_dict(t) for t in self.ledger.closed_trades(limit, until_seq=self._seq)]
         if limit:
-            return self.trade_history[-limit:]
-        return self.trade_history.copy()
+            return self.trade_history.to_trades(slice(-limit, None))
+        return self.trade_history.to_trades()
     
+    def get_trades_after(self, cursor: Optional[int], limit: int) -> Tuple[List[Trade], int]:
+        """The first `limit` trades closed after cursor, oldest first (the newest `limit`
+        without one), and the cursor to resume from.
+
+        Cursors only grow (ledger event seq, or closes counted by this service), so
+        trades closed in the same millisecond or out of id order are neither skipped
+        nor sent twice.
+        """
+        self._sync()
+        with self._lock:
+            if self.ledger is not None:
+                if cursor is None:
+                    return [Trade.from_dict(t) for t in self.ledger.closed_trades(limit, until_seq=self._seq)], self._seq
+                closed = self.ledger.closed_after(cursor, limit, until_seq=self._seq)
+                return [Trade.from_dict(t) for _, t in closed], closed[-1][0] if closed else max(cursor, 0)
+            # Without a ledger the history is never trimmed: its rows are the closes
+            # numbered _closed_seq - len + 1 .. _closed_seq
+            first = self._closed_seq - len(self.trade_history)
+            start = max(len(self.trade_history) - limit, 0) if cursor is None else max(cursor - first, 0)
+            trades = self.trade_history.to_trades(slice(start, start + limit))
+            if not trades:
+                return [], self._closed_seq if cursor is None else max(cursor, 0)
+            return trades, first + start + len(trades)
+
     def get_position_by_id(self, trade_id: str) -> Optional[Trade]:
         """Get specific position by ID"""
+        self._sync()
         return self.current_positions.get(trade_id)
     
     def get_total_pnl(self) -> float:
         """Calculate total P&L from all closed trades"""
-        return sum(trade.pnl for trade in self.trade_history if trade.pnl is not None)
+        self._sync()
+        return self.stats.total_pnl
     
     def get_win_rate(self) -> float:
         """Calculate win rate from trade history"""
-        if not self.trade_history:
-            return 0.0
-            
-        winning_trades = [t for t in self.trade_history if t.pnl and t.pnl > 0]
-        return len(winning_trades) / len(self.trade_history) * 100
+        self._sync()
+        return self.stats.win_rate
     
     def get_profit_factor(self) -> float:
         """Calculate profit factor from trade history"""
-        if not self.trade_history:
-            return 0.0
-            
-        winning_trades = [t for t in self.trade_history if t.pnl and t.pnl > 0]
-        losing_trades = [t for t in self.trade_history if t.pnl and t.pnl <= 0]
-        
-        total_profit = sum(t.pnl for t in winning_trades)
-        total_loss = abs(sum(t.pnl for t in losing_trades))
-        
-        return total_profit / total_loss if total_loss > 0 else 0.0
\ No newline at end of file
+        self._sync()
+        return self.stats.profit_factor
+
+    def get_performance(self) -> Dict[str, float]:
+        """Win rate, profit factor, drawdown, Sharpe and Sortino over closed trades"""
+        self._sync()
+        return self.stats.summary()
+
+    def get_equity_curve(self) -> List[float]:
+        """Balance after each closed trade"""
+        self._sync()
+        if self.ledger is None:
+            return self.stats.equity.tolist()
+        balance = self.stats.initial_balance
+        curve = []
+        for pnl in self.ledger.closed_pnl(until_seq=self._seq):
+            balance += pnl or 0.0
+            curve.append(balance)
+        return curve
@@ -0,0 +1,107 @@
+import math
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, List, Optional, Tuple
+
+# (trade_id, exit_price, 'stop_loss' | 'take_profit')
+Trigger = Tuple[str, float, str]
+
+
+class TriggerIndex:
+    """Stop-loss and take-profit levels of open positions, sorted per side.
+
+    A price check bisects the four sorted level lists and only touches the
+    positions whose levels were crossed, instead of every open position.
+    Running size and notional sums per side give the unrealized P&L in O(1).
+    """
+
+    def __init__(self):
+        # Sorted (level, order, trade_id); order keeps ties in insertion order
+        self._buy_stops: List[Tuple[float, int, str]] = []
+        self._buy_targets: List[Tuple[float, int, str]] = []
+        self._sell_stops: List[Tuple[float, int, str]] = []
+        self._sell_targets: List[Tuple[float, int, str]] = []
+        # id -> (order, is_buy, stop_loss, take_profit, entry_price, size)
+        self._positions: Dict[str, Tuple[int, bool, float, float, float, float]] = {}
+        self._order = 0
+        # side -> [sum(size), sum(entry_price * size)]
+        self._exposure = {True: [0.0, 0.0], False: [0.0, 0.0]}
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, trade_id: str) -> bool:
+        return trade_id in self._positions
+
+    def _levels(self, is_buy: bool) -> Tuple[list, list]:
+        return (self._buy_stops, self._buy_targets) if is_buy else (self._sell_stops, self._sell_targets)
+
+    def add(self, trade_id: str, is_buy: bool, entry_price: float, size: float,
+            stop_loss: float, take_profit: float) -> None:
+        if trade_id in self._positions:
+            self.remove(trade_id)
+        self._order += 1
+        stops, targets = self._levels(is_buy)
+        # NaN levels never trigger (every comparison with them is false)
+        if not math.isnan(stop_loss):
+            insort(stops, (stop_loss, self._order, trade_id))
+        if not math.isnan(take_profit):
+            insort(targets, (take_profit, self._order, trade_id))
+        self._positions[trade_id] = (self._order, is_buy, stop_loss, take_profit, entry_price, size)
+        exposure = self._exposure[is_buy]
+        exposure[0] += size
+        exposure[1] += entry_price * size
+
+    def remove(self, trade_id: str) -> None:
+        entry = self._positions.pop(trade_id, None)
+        if entry is None:
+            return
+        order, is_buy, stop_loss, take_profit, entry_price, size = entry
+        for levels, level in zip(self._levels(is_buy), (stop_loss, take_profit)):
+            if not math.isnan(level):
+                i = bisect_left(levels, (level, order, trade_id))
+                if i < len(levels) and levels[i][2] == trade_id:
+                    del levels[i]
+        exposure = self._exposure[is_buy]
+        exposure[0] -= size
+        exposure[1] -= entry_price * size
+        if not self._positions:  # drop accumulated rounding error
+            self._exposure = {True: [0.0, 0.0], False: [0.0, 0.0]}
+
+    def clear(self) -> None:
+        self.__init__()
+
+    def triggered(self, price: float, high: Optional[float] = None, low: Optional[float] = None) -> List[Trigger]:
+        """Positions whose stop loss or take profit was reached, in the order they were added.
+
+        With high/low (the range traded since the last check), buys stop out
+        on the low and take profit on the high and sells the reverse;
+        otherwise only `price` is checked. When both levels were reached the
+        stop loss wins.
+        """
+        high = price if high is None else high
+        low = price if low is None else low
+        hits: Dict[str, Tuple[int, float, str]] = {}
+        # Buy stops at or above the low, sell stops at or below the high
+        for level, order, trade_id in self._buy_stops[bisect_left(self._buy_stops, (low,)):]:
+            hits[trade_id] = (order, level, 'stop_loss')
+        for level, order, trade_id in self._sell_stops[:bisect_right(self._sell_stops, (high, math.inf))]:
+            hits[trade_id] = (order, level, 'stop_loss')
+        for level, order, trade_id in self._buy_targets[:bisect_right(self._buy_targets, (high, math.inf))]:
+            hits.setdefault(trade_id, (order, level, 'take_profit'))
+        for level, order, trade_id in self._sell_targets[bisect_left(self._sell_targets, (low,)):]:
+            hits.setdefault(trade_id, (order, level, 'take_profit'))
+        return [(trade_id, level, reason)
+                for trade_id, (order, level, reason) in sorted(hits.items(), key=lambda item: item[1][0])]
+
+    def band(self) -> Tuple[float, float]:
+        """(lower, upper): no level triggers while lower < price < upper"""
+        lower = max(self._buy_stops[-1][0] if self._buy_stops else -math.inf,
+                    self._sell_targets[-1][0] if self._sell_targets else -math.inf)
+        upper = min(self._sell_stops[0][0] if self._sell_stops else math.inf,
+                    self._buy_targets[0][0] if self._buy_targets else math.inf)
+        return lower, upper
+
+    def unrealized_pnl(self, price: float) -> float:
+        buy_size, buy_cost = self._exposure[True]
+        sell_size, sell_cost = self._exposure[False]
+        return (price * buy_size - buy_cost) + (sell_cost - price * sell_size)
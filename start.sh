@@ -3,7 +3,9 @@
 # Set default port if not specified
 PORT=${PORT:-8080}
 WORKERS=${WORKERS:-4}
+# Threads per worker; /api/stream keeps one thread busy per connected dashboard
+THREADS=${THREADS:-8}
 TIMEOUT=${TIMEOUT:-120}
 
 # Start Gunicorn
-exec gunicorn --bind 0.0.0.0:$PORT --workers $WORKERS --timeout $TIMEOUT app:app
+exec gunicorn --bind 0.0.0.0:$PORT --workers $WORKERS --threads $THREADS --timeout $TIMEOUT app:app
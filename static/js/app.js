@@ -1,5 +1,9 @@
 
 let currentGraph = null;
+let lastData = null;
+let dataStream = null;
+let streamVersion = null;
+let pollTimer = null;
 
 // Función para formatear números
 function formatNumber(num, decimals = 2) {
@@ -96,22 +100,89 @@ function initializeDefaultValues() {
     }
 }
 
+// Configuración estática del gráfico (layout y estilos), se pide una sola vez
+let chartConfig = null;
+
+async function getChartConfig() {
+    if (!chartConfig) {
+        const response = await fetch('/api/chart-config');
+        chartConfig = await response.json();
+    }
+    return chartConfig;
+}
+
+// Decodifica una columna base64 de Float64 little-endian
+function decodeFloat64(base64) {
+    const binary = atob(base64);
+    const bytes = new Uint8Array(binary.length);
+    for (let i = 0; i < binary.length; i++) {
+        bytes[i] = binary.charCodeAt(i);
+    }
+    return Array.from(new Float64Array(bytes.buffer));
+}
+
+// Reconstruye trazas y layout de Plotly a partir del gráfico compacto de /api/data?format=compact
+function expandCompactGraph(graph, config) {
+    const layout = {
+        ...config.layout,
+        title: { text: graph.title, x: 0.5, xanchor: 'center', font: { color: '#e0e0e0' } }
+    };
+    const data = [];
+    if (graph.candles) {
+        // Milisegundos epoch -> 'YYYY-MM-DD HH:MM:SS', igual que el payload completo
+        const x = decodeFloat64(graph.candles.time).map(ms => new Date(ms).toISOString().slice(0, 19).replace('T', ' '));
+        data.push({
+            ...config.candles,
+            x,
+            open: decodeFloat64(graph.candles.open),
+            high: decodeFloat64(graph.candles.high),
+            low: decodeFloat64(graph.candles.low),
+            close: decodeFloat64(graph.candles.close)
+        });
+    }
+    // Niveles SL/TP/entrada como líneas horizontales de todo el ancho
+    layout.shapes = Object.entries(graph.levels || {}).map(([level, price]) => ({
+        type: 'line',
+        xref: 'paper',
+        x0: 0,
+        x1: 1,
+        yref: 'y2',
+        y0: price,
+        y1: price,
+        line: config.levels[level].line
+    }));
+    return { data, layout };
+}
+
 // Función para actualizar los datos
 async function updateData() {
     try {
         console.log('Solicitando datos...');
-        const response = await fetch('/api/data');
+        const response = await fetch('/api/data?format=compact');
         const data = await response.json();
 
         if (!response.ok) {
             throw new Error(data.error || 'Error en la respuesta del servidor');
         }
 
+        if (data.graph && data.graph.format === 'compact') {
+            data.graph = expandCompactGraph(data.graph, await getChartConfig());
+        }
+        renderData(data);
+    } catch (error) {
+        console.error('Error al actualizar datos:', error);
+    }
+}
+
+// Renderiza un payload completo de /api/data (options.skipGraph evita redibujar el gráfico)
+function renderData(data, options = {}) {
+    try {
+        lastData = data;
         console.log('Datos recibidos:', data);
 
 
         // Actualizar el gráfico si hay datos
-        if (data.graph && data.graph.data && data.graph.data.length > 0) {
+        if (!options.skipGraph && data.graph && data.graph.data && data.graph.data.length > 0) {
             console.log('Actualizando gráfico con datos:', data.graph);
             try {
                 // Asegurarse de que las fechas estén en el formato correcto
@@ -1421,10 +1492,107 @@ document.addEventListener('DOMContentLoaded', function () {
 
     updateTradingHistory(exampleTrades);
 
-    // Actualizar datos cada 60 segundos
-    setInterval(updateData, 60000);
+    // Recibir actualizaciones en tiempo real (con sondeo cada 60 segundos como respaldo)
+    startDataStream();
 });
 
+// Sondeo de respaldo cuando el stream no está disponible
+function startPolling() {
+    if (!pollTimer) {
+        pollTimer = setInterval(updateData, 60000);
+    }
+}
+
+function stopPolling() {
+    if (pollTimer) {
+        clearInterval(pollTimer);
+        pollTimer = null;
+    }
+}
+
+// Conectar al stream de eventos del servidor (/api/stream)
+function startDataStream() {
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+
+    dataStream = new EventSource('/api/stream');
+
+    dataStream.addEventListener('snapshot', (event) => {
+        stopPolling();
+        streamVersion = parseInt(event.lastEventId.split('-').pop(), 10);
+        renderData(JSON.parse(event.data));
+    });
+
+    dataStream.addEventListener('delta', (event) => {
+        stopPolling();
+        applyDelta(JSON.parse(event.data));
+    });
+
+    dataStream.onerror = () => {
+        // EventSource se reconecta solo; si el servidor lo rechaza, volver al sondeo
+        if (dataStream.readyState === EventSource.CLOSED) {
+            console.warn('Stream no disponible, usando sondeo');
+            startPolling();
+        }
+    };
+}
+
+// Reabrir el stream para recibir un snapshot completo
+function resyncDataStream() {
+    if (dataStream) {
+        dataStream.close();
+    }
+    streamVersion = null;
+    startDataStream();
+}
+
+// Aplicar un delta del servidor sobre el último payload completo
+function applyDelta(delta) {
+    if (!lastData || streamVersion !== delta.base_version) {
+        resyncDataStream();
+        return;
+    }
+    streamVersion = delta.version;
+
+    Object.assign(lastData, delta.changed || {});
+
+    const graphDiv = document.getElementById('graph');
+    const graph = lastData.graph || { data: [], layout: {} };
+    const candleFields = ['x', 'open', 'high', 'low', 'close'];
+
+    if (delta.candles && graph.data.length > 0 && graphDiv && graphDiv.data && graphDiv.data.length > 0) {
+        const candles = delta.candles;
+        const liveTrace = graphDiv.data[0];
+        if (candles.replace_last) {
+            candleFields.forEach(field => liveTrace[field].pop());
+        }
+        Plotly.extendTraces(graphDiv, {
+            x: [candles.x],
+            open: [candles.open],
+            high: [candles.high],
+            low: [candles.low],
+            close: [candles.close]
+        }, [0], candles.max_points);
+        // Mantener el payload local sincronizado con lo que muestra Plotly
+        candleFields.forEach(field => { graph.data[0][field] = graphDiv.data[0][field]; });
+    }
+
+    if (delta.overlays || delta.layout) {
+        if (delta.overlays) {
+            graph.data = [graph.data[0], ...delta.overlays];
+        }
+        if (delta.layout) {
+            graph.layout = delta.layout;
+        }
+        lastData.graph = graph;
+        renderData(lastData);
+    } else {
+        renderData(lastData, { skipGraph: true });
+    }
+}
+
 // Update the 'Análisis Avanzado' section to display data from app.py
 const updateAdvancedAnalysis = (data) => {
     const indicators = data.indicators || {};
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.indicators import TechnicalIndicators
+from services.streaming_indicators import StreamingIndicators
+
+WINDOW = 200
+# Longest lookback of the rolling indicators (support/resistance, sma_50)
+WARMUP = 50
+EMA_COLUMNS = ['macd', 'macd_signal', 'macd_histogram']
+
+
+def candles(n: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 30000 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    spread = np.abs(rng.normal(0, 0.004, n)) * close
+    return pd.DataFrame({
+        'open': np.roll(close, 1),
+        'high': close + spread,
+        'low': close - spread,
+        'close': close,
+        'volume': rng.lognormal(5, 1, n),
+    }, index=pd.date_range('2024-01-01', periods=n, freq='h'))
+
+
+def recompute(df: pd.DataFrame) -> pd.DataFrame:
+    return TechnicalIndicators.add_all_indicators(df.copy())
+
+
+def assert_columns_close(actual: pd.DataFrame, expected: pd.DataFrame, columns) -> None:
+    for column in columns:
+        np.testing.assert_allclose(actual[column].to_numpy(), expected[column].to_numpy(),
+                                   rtol=1e-9, atol=1e-9, equal_nan=True, err_msg=column)
+
+
+def test_sliding_window_matches_recompute():
+    df = candles(400)
+    engine = StreamingIndicators()
+    rolling_columns = [c for c in engine.columns if c not in EMA_COLUMNS]
+    for end in range(WINDOW, len(df) + 1):
+        window = df.iloc[end - WINDOW:end]
+        streamed = engine.update_frame(window)
+        # Rolling indicators only depend on the window
+        assert_columns_close(streamed.iloc[WARMUP:], recompute(window).iloc[WARMUP:], rolling_columns)
+        # EMAs depend on where the series starts: they match a recompute over
+        # everything the engine has seen, not over the window
+        assert_columns_close(streamed.iloc[-1:], recompute(df.iloc[:end]).iloc[-1:], EMA_COLUMNS)
+
+
+def test_macd_differs_from_window_recompute():
+    """The documented MACD difference: ewm(adjust=False) restarts at the window's first close"""
+    df = candles(WINDOW + 101)
+    engine = StreamingIndicators()
+    engine.update_frame(df.iloc[:-1])
+    streamed = engine.update_frame(df.iloc[-WINDOW:])
+    assert streamed['macd'].iloc[-1] != pytest.approx(recompute(df.iloc[-WINDOW:])['macd'].iloc[-1], rel=1e-9)
+    assert streamed['macd'].iloc[-1] == pytest.approx(recompute(df)['macd'].iloc[-1], rel=1e-9)
+
+
+def test_forming_candle_is_replaced():
+    df = candles(WINDOW + 1)
+    engine = StreamingIndicators()
+    engine.update_frame(df.iloc[:-1])
+    forming = df.iloc[-1]
+    for close in (forming['close'] * 0.99, forming['close'] * 1.02):
+        engine.update(df.index[-1], forming['open'], max(forming['high'], close), min(forming['low'], close),
+                      close, forming['volume'])
+    streamed = engine.update_frame(df)
+    assert_columns_close(streamed.iloc[-1:], recompute(df).iloc[-1:], engine.columns)
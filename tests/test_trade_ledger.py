@@ -0,0 +1,62 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from services.trade_ledger import TradeLedger
+from services.trading import TradingService
+
+SIGNAL = 'BTCUSDT:1h:buy:2024-01-01T00:00:00'
+
+
+def workers(n: int = 2):
+    """n TradingServices sharing one ledger file, as gunicorn workers do"""
+    path = os.path.join(tempfile.mkdtemp(), 'ledger.sqlite3')
+    return [TradingService(TradeLedger(path)) for _ in range(n)]
+
+
+def open_buy(service: TradingService, signal_key: str = None):
+    return service.execute_trade('BTCUSDT', True, 100.0, 95.0, 110.0, size=1.0, signal_key=signal_key)
+
+
+def test_only_one_worker_closes_a_trade():
+    first, second = workers()
+    trade = open_buy(first)
+    assert str(trade.id) in second.get_open_positions()
+    assert first.close_position(str(trade.id), 105.0)
+    assert not second.close_position(str(trade.id), 106.0)
+    for service in (first, second):
+        history = service.get_trade_history()
+        assert [t.id for t in history] == [trade.id]
+        assert history[0].exit_price == 105.0
+        assert not service.get_open_positions()
+
+
+def test_signal_is_traded_once_across_workers():
+    services = workers(3)
+    trades = [open_buy(service, SIGNAL) for service in services]
+    assert sum(trade is not None for trade in trades) == 1
+    assert open_buy(services[0], SIGNAL) is None
+    assert open_buy(services[1], SIGNAL.replace('buy', 'sell')) is not None
+    since = datetime.now() - timedelta(hours=1)
+    assert [service.trades_opened_since(since) for service in services] == [2, 2, 2]
+    assert all(len(service.get_open_positions()) == 2 for service in services)
+
+
+def test_reset_hides_earlier_trades():
+    first, second = workers()
+    closed = open_buy(first, SIGNAL)
+    first.close_position(str(closed.id), 105.0)
+    open_buy(first)
+    second.reset()
+    since = datetime.now() - timedelta(hours=1)
+    for service in (first, second):
+        assert not service.get_open_positions()
+        assert service.get_trade_history() == []
+        assert service.get_total_pnl() == 0.0
+        assert service.trades_opened_since(since) == 0
+    # The signal traded before the reset may be traded again
+    assert open_buy(first, SIGNAL) is not None
+    # A worker started after the reset recovers the same book
+    late = TradingService(TradeLedger(first.ledger.path))
+    assert list(late.get_open_positions()) == list(first.get_open_positions())
+    assert late.get_trade_history() == []
@@ -1,6 +1,10 @@
+import time
 import pandas as pd
-from datetime import datetime, date
-from typing import List, Dict, Any
+from datetime import datetime, date, timezone
+from typing import List, Dict, Any, Callable, Mapping, Optional
+
+TIMEFRAME_UNITS = {'m': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+WEEK_OFFSET = 4 * 86400  # Epoch day 0 is a Thursday; exchange weeks start on Monday
 
 def can_trade_today(daily_trades: int, max_daily_trades: int) -> bool:
     """Check if trading is allowed today based on daily limit"""
@@ -121,4 +125,83 @@ def calculate_risk_reward(entry: float, stop: float, target: float, is_long: boo
             'reward_percent': reward_percent
         }
     except Exception:
-        return {'risk': 0, 'reward': 0, 'ratio': 0, 'risk_percent': 0, 'reward_percent': 0}
\ No newline at end of file
+        return {'risk': 0, 'reward': 0, 'ratio': 0, 'risk_percent': 0, 'reward_percent': 0}
+
+def timeframe_to_seconds(timeframe: str) -> int:
+    """Length of a candle timeframe such as '15m', '1h' or '1d' in seconds (1M ~ 30 days)"""
+    amount, unit = int(timeframe[:-1] or 1), timeframe[-1]
+    if unit == 'M':
+        return amount * 30 * 86400
+    if unit not in TIMEFRAME_UNITS:
+        raise ValueError(f"Unsupported timeframe: {timeframe}")
+    return amount * TIMEFRAME_UNITS[unit]
+
+def next_candle_close(timeframe: str, now: Optional[float] = None) -> float:
+    """Epoch seconds (UTC) at which the currently forming candle closes"""
+    now = time.time() if now is None else now
+    if timeframe.endswith('M'):
+        current = datetime.fromtimestamp(now, tz=timezone.utc)
+        months = current.month - 1 + int(timeframe[:-1] or 1)
+        boundary = current.replace(year=current.year + months // 12, month=months % 12 + 1, day=1,
+                                   hour=0, minute=0, second=0, microsecond=0)
+        return boundary.timestamp()
+    seconds = timeframe_to_seconds(timeframe)
+    offset = WEEK_OFFSET if timeframe.endswith('w') else 0
+    return ((now - offset) // seconds + 1) * seconds + offset
+
+def parse_fields(fields: Optional[str]) -> Optional[Dict[str, Any]]:
+    """'a,b.c,b.d' -> {'a': None, 'b': {'c': None, 'd': None}}; None keeps every field"""
+    if not fields:
+        return None
+    tree: Dict[str, Any] = {}
+    for path in fields.split(','):
+        names = [name.strip() for name in path.split('.') if name.strip()]
+        node = tree
+        for i, name in enumerate(names):
+            if i == len(names) - 1 or node.get(name, {}) is None:
+                node[name] = None  # the whole field, even if a subfield was also asked for
+                break
+            node = node.setdefault(name, {})
+    return tree or None
+
+def project(value: Any, tree: Optional[Dict[str, Any]]) -> Any:
+    """Keep only the fields of a parse_fields() tree; lists are projected item by item"""
+    if tree is None:
+        return value
+    if isinstance(value, list):
+        return [project(item, tree) for item in value]
+    if isinstance(value, Mapping):
+        return {name: project(value[name], subtree) for name, subtree in tree.items() if name in value}
+    return value
+
+def select_fields(sections: Mapping[str, Callable[[], Any]], fields: Optional[str]) -> Dict[str, Any]:
+    """Compute and project only the requested top-level fields.
+
+    `sections` maps each field to a function computing it, so fields left
+    out of ?fields= cost nothing. Raises ValueError on unknown fields.
+    """
+    tree = parse_fields(fields)
+    if tree is None:
+        return {name: compute() for name, compute in sections.items()}
+    unknown = [name for name in tree if name not in sections]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)} (available: {', '.join(sections)})")
+    return {name: project(compute(), tree[name]) for name, compute in sections.items() if name in tree}
+
+def parse_time_cursor(value: Optional[str]) -> Optional[pd.Timestamp]:
+    """A ?since= cursor, epoch milliseconds or an ISO date, as a naive UTC timestamp"""
+    if value is None or value == '':
+        return None
+    try:
+        if value.lstrip('-').isdigit():
+            return pd.Timestamp(int(value), unit='ms')
+        timestamp = pd.Timestamp(value)
+    except (ValueError, OverflowError):
+        raise ValueError(f"Invalid cursor: {value}")
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert('UTC').tz_localize(None)
+    return timestamp
+
+def time_cursor(timestamp: Optional[pd.Timestamp]) -> Optional[int]:
+    """Epoch milliseconds of a naive UTC timestamp, the ?since= value to resume from"""
+    return None if timestamp is None else int(pd.Timestamp(timestamp).value // 1_000_000)
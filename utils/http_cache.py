@@ -0,0 +1,69 @@
+import gzip
+import hashlib
+from typing import Callable, Dict, Optional
+
+from flask import Response, current_app, request
+
+from config import HTTP_COMPRESSION_ENABLED, HTTP_COMPRESS_MIN_SIZE, HTTP_GZIP_LEVEL, HTTP_BROTLI_QUALITY
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# Derived bytes of one body by name, computed at most once, e.g. MarketSnapshot.encode
+Memo = Callable[[str, Callable[[], bytes]], bytes]
+
+COMPRESSORS: Dict[str, Callable[[bytes], bytes]] = {
+    'gzip': lambda body: gzip.compress(body, compresslevel=HTTP_GZIP_LEVEL, mtime=0),
+}
+if brotli is not None:
+    COMPRESSORS = {'br': lambda body: brotli.compress(body, quality=HTTP_BROTLI_QUALITY), **COMPRESSORS}
+
+
+def make_etag(body: bytes) -> str:
+    """Strong validator for a body: a hash of its bytes.
+
+    Snapshot versions are only meaningful inside one worker, so the content
+    itself is hashed; any worker serving the same bytes answers with 304.
+    """
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def _no_memo(name: str, compute: Callable[[], bytes]) -> bytes:
+    return compute()
+
+
+def negotiate_encoding(size: int) -> Optional[str]:
+    """Best content coding the client accepts for a body of `size` bytes, None to send it as is"""
+    if not HTTP_COMPRESSION_ENABLED or size < HTTP_COMPRESS_MIN_SIZE:
+        return None
+    return request.accept_encodings.best_match(list(COMPRESSORS))
+
+
+def cached_response(body: bytes, memo: Memo = _no_memo, mimetype: str = 'application/json') -> Response:
+    """Response for body with a strong ETag, 304 for a matching If-None-Match,
+    compressed as the client prefers.
+
+    Every representation gets its own ETag (the hash plus the coding), as
+    strong validators require. Pass a memo to hash and compress a body that
+    is served many times (a snapshot) only once.
+    """
+    encoding = negotiate_encoding(len(body))
+    etag = memo('etag', lambda: make_etag(body).encode('ascii')).decode('ascii')
+    if encoding:
+        etag = f"{etag}-{encoding}"
+
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    else:
+        if encoding:
+            body = memo(encoding, lambda: COMPRESSORS[encoding](body))
+        response = current_app.response_class(body, mimetype=mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    # Cached by the browser, but revalidated on every poll
+    response.cache_control.no_cache = True
+    return response
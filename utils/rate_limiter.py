@@ -0,0 +1,206 @@
+import contextvars
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple
+
+from config import (
+    RATE_LIMIT_ENABLED, RATE_LIMIT_PATH, RATE_LIMITS, RATE_LIMIT_RESERVES, RATE_LIMIT_MAX_WAIT
+)
+
+# Bucket state: (tokens, updated_at, blocked_until)
+BucketState = Tuple[float, float, float]
+
+_priority: contextvars.ContextVar = contextvars.ContextVar('request_priority', default='market')
+
+
+@contextmanager
+def request_priority(priority: str):
+    """Run upstream calls made inside the block at the given priority"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+def binance_weight(path: str, params: Dict) -> int:
+    """Request weight Binance charges for a public endpoint"""
+    if path == 'klines':
+        limit = int(params.get('limit', 500))
+        return 1 if limit < 100 else 2 if limit < 500 else 5 if limit <= 1000 else 10
+    if path == 'ticker/24hr':
+        return 2 if 'symbol' in params else 80
+    if path == 'ticker/price':
+        return 2 if 'symbol' in params else 4
+    return 1
+
+
+class RateLimiter:
+    """Token buckets per upstream provider, shared by every worker on the host.
+
+    Each provider gets `capacity` tokens refilled evenly over `period`
+    seconds; a request spends its cost (Binance: the endpoint weight).
+    Lower priorities must leave a reserve in the bucket, so under load a
+    klines backfill or news refresh waits while live prices still go
+    through. Bucket state lives in SQLite (or in memory when path is None)
+    and is updated in short IMMEDIATE transactions.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]], reserves: Dict[str, float],
+                 path: Optional[str] = None):
+        self.limits = limits
+        self.reserves = reserves
+        self.path = path
+        self._local = threading.local()
+        self._memory: Dict[str, BucketState] = {}
+        self._memory_lock = threading.Lock()
+        if path:
+            self._connection().execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "provider TEXT PRIMARY KEY, tokens REAL NOT NULL, "
+                "updated_at REAL NOT NULL, blocked_until REAL NOT NULL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _update(self, provider: str, change: Callable[[BucketState, float], Tuple[BucketState, float]]) -> float:
+        """Atomically apply change(state, now) -> (new_state, result) to a bucket"""
+        now = time.time()
+        initial = (float(self.limits[provider][0]), now, 0.0)
+        if not self.path:
+            with self._memory_lock:
+                state, result = change(self._memory.get(provider, initial), now)
+                self._memory[provider] = state
+                return result
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated_at, blocked_until FROM buckets WHERE provider = ?", (provider,)
+            ).fetchone()
+            state, result = change(tuple(row) if row else initial, now)
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (provider, tokens, updated_at, blocked_until) VALUES (?, ?, ?, ?)",
+                (provider, *state)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    def _refilled(self, provider: str, state: BucketState, now: float) -> float:
+        capacity, period = self.limits[provider]
+        tokens, updated_at, _ = state
+        return min(capacity, tokens + max(now - updated_at, 0.0) * capacity / period)
+
+    def try_acquire(self, provider: str, cost: float = 1, priority: Optional[str] = None) -> float:
+        """Spend cost tokens now if the priority allows; else seconds until it might"""
+        if provider not in self.limits:
+            return 0.0
+        capacity, period = self.limits[provider]
+        cost = min(cost, capacity)
+        floor = self.reserves.get(priority or current_priority(), 0.0) * capacity
+        floor = min(floor, capacity - cost)
+
+        def change(state: BucketState, now: float) -> Tuple[BucketState, float]:
+            blocked_until = state[2]
+            tokens = self._refilled(provider, state, now)
+            if blocked_until > now:
+                return (tokens, now, blocked_until), blocked_until - now
+            if tokens - cost >= floor:
+                return (tokens - cost, now, blocked_until), 0.0
+            return (tokens, now, blocked_until), (cost + floor - tokens) * period / capacity
+
+        return self._update(provider, change)
+
+    def acquire(self, provider: str, cost: float = 1, priority: Optional[str] = None,
+                max_wait: Optional[float] = None) -> bool:
+        """Wait (up to max_wait seconds) for budget; False if it never came"""
+        deadline = time.time() + (RATE_LIMIT_MAX_WAIT if max_wait is None else max_wait)
+        while True:
+            wait = self.try_acquire(provider, cost, priority)
+            if wait <= 0:
+                return True
+            if time.time() + wait > deadline:
+                return False
+            # Re-check regularly: another worker's response headers may change the budget
+            time.sleep(min(wait, 1.0))
+
+    def sync_used(self, provider: str, used: float) -> None:
+        """Align the bucket with usage reported by the provider (e.g. X-MBX-USED-WEIGHT-1M)"""
+        if provider not in self.limits:
+            return
+        capacity = self.limits[provider][0]
+
+        def change(state: BucketState, now: float) -> Tuple[BucketState, float]:
+            tokens = min(self._refilled(provider, state, now), max(capacity - used, 0.0))
+            return (tokens, now, state[2]), 0.0
+
+        self._update(provider, change)
+
+    def block(self, provider: str, seconds: float) -> None:
+        """Stop all requests to provider for a while (after a 429/418)"""
+        if provider not in self.limits:
+            return
+
+        def change(state: BucketState, now: float) -> Tuple[BucketState, float]:
+            return (0.0, now, max(state[2], now + seconds)), 0.0
+
+        self._update(provider, change)
+
+    def status(self) -> Dict[str, Dict]:
+        result = {}
+        for provider, (capacity, period) in self.limits.items():
+            seen = {}
+
+            def peek(state: BucketState, now: float, provider=provider) -> Tuple[BucketState, float]:
+                seen['available'] = round(self._refilled(provider, state, now), 2)
+                seen['blocked_for'] = round(max(state[2] - now, 0.0), 2)
+                return state, 0.0
+
+            self._update(provider, peek)
+            result[provider] = {'capacity': capacity, 'period': period, **seen}
+        return result
+
+
+_rate_limiter: Optional[RateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> Optional[RateLimiter]:
+    """Process-wide RateLimiter (SQLite-backed when possible), or None when disabled"""
+    global _rate_limiter
+    if not RATE_LIMIT_ENABLED:
+        return None
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            try:
+                os.makedirs(os.path.dirname(RATE_LIMIT_PATH) or '.', exist_ok=True)
+                _rate_limiter = RateLimiter(RATE_LIMITS, RATE_LIMIT_RESERVES, RATE_LIMIT_PATH)
+            except (OSError, sqlite3.Error) as e:
+                print(f"[WARN] Shared rate limiter unavailable, limiting per process: {e}")
+                _rate_limiter = RateLimiter(RATE_LIMITS, RATE_LIMIT_RESERVES)
+        return _rate_limiter
+
+
+def acquire(provider: str, cost: float = 1, priority: Optional[str] = None,
+            max_wait: Optional[float] = None) -> bool:
+    """Wait for budget on the process-wide limiter; always True when disabled"""
+    limiter = get_rate_limiter()
+    return True if limiter is None else limiter.acquire(provider, cost, priority, max_wait)
@@ -0,0 +1,131 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+from config import (
+    SENTIMENT_CACHE_ENABLED, SENTIMENT_CACHE_PATH, SENTIMENT_CACHE_SIZE, SENTIMENT_CACHE_MEMORY_SIZE,
+    SENTIMENT_CACHE_TTL
+)
+
+
+class SentimentCache:
+    """Sentiment scores keyed by a content hash, with LRU eviction and a TTL.
+
+    A small in-process LRU sits in front of a SQLite table shared by every
+    worker and kept across restarts. Disk recency is refreshed when an entry
+    is promoted into memory, not on every memory hit, so eviction is
+    approximately least-recently-used without a write per lookup.
+    """
+
+    def __init__(self, path: Optional[str], max_entries: int = SENTIMENT_CACHE_SIZE,
+                 memory_entries: int = SENTIMENT_CACHE_MEMORY_SIZE, ttl: float = SENTIMENT_CACHE_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.ttl = ttl
+        self._memory: 'OrderedDict[str, tuple]' = OrderedDict()  # key -> (created_at, value)
+        self._memory_lock = threading.Lock()
+        self._local = threading.local()
+        if path:
+            self._connection().execute(
+                "CREATE TABLE IF NOT EXISTS sentiment ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, used_at REAL NOT NULL)"
+            )
+            self._connection().execute("CREATE INDEX IF NOT EXISTS sentiment_used_at ON sentiment (used_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _remember(self, key: str, created_at: float, value: Dict) -> None:
+        with self._memory_lock:
+            self._memory[key] = (created_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict]:
+        """Fresh cached values for whichever keys are present"""
+        now = time.time()
+        found: Dict[str, Dict] = {}
+        missing = []
+        with self._memory_lock:
+            for key in set(keys):
+                entry = self._memory.get(key)
+                if entry is not None and entry[0] + self.ttl > now:
+                    self._memory.move_to_end(key)
+                    found[key] = entry[1]
+                else:
+                    missing.append(key)
+        if not missing or not self.path:
+            return found
+        conn = self._connection()
+        placeholders = ','.join('?' * len(missing))
+        rows = conn.execute(
+            f"SELECT key, value, created_at FROM sentiment WHERE key IN ({placeholders}) AND created_at > ?",
+            (*missing, now - self.ttl)
+        ).fetchall()
+        for key, value, created_at in rows:
+            found[key] = json.loads(value)
+            self._remember(key, created_at, found[key])
+        if rows:
+            conn.execute(f"UPDATE sentiment SET used_at = ? WHERE key IN ({','.join('?' * len(rows))})",
+                         (now, *(row[0] for row in rows)))
+        return found
+
+    def put_many(self, values: Dict[str, Dict]) -> None:
+        """Store freshly scored values in one transaction, evicting the least recently used"""
+        now = time.time()
+        for key, value in values.items():
+            self._remember(key, now, value)
+        if not values or not self.path:
+            return
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO sentiment (key, value, created_at, used_at) VALUES (?, ?, ?, ?)",
+                [(key, json.dumps(value), now, now) for key, value in values.items()]
+            )
+            conn.execute("DELETE FROM sentiment WHERE created_at <= ?", (now - self.ttl,))
+            excess = conn.execute("SELECT COUNT(*) FROM sentiment").fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM sentiment WHERE key IN (SELECT key FROM sentiment ORDER BY used_at LIMIT ?)",
+                    (excess,)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+_sentiment_cache: Optional[SentimentCache] = None
+_sentiment_cache_lock = threading.Lock()
+
+
+def get_sentiment_cache() -> Optional[SentimentCache]:
+    """Process-wide SentimentCache (memory only if the database is unavailable), or None when disabled"""
+    global _sentiment_cache
+    if not SENTIMENT_CACHE_ENABLED:
+        return None
+    with _sentiment_cache_lock:
+        if _sentiment_cache is None:
+            try:
+                os.makedirs(os.path.dirname(SENTIMENT_CACHE_PATH) or '.', exist_ok=True)
+                _sentiment_cache = SentimentCache(SENTIMENT_CACHE_PATH)
+            except (OSError, sqlite3.Error) as e:
+                print(f"[WARN] Persistent sentiment cache unavailable, caching in memory: {e}")
+                _sentiment_cache = SentimentCache(None)
+        return _sentiment_cache
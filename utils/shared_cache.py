@@ -0,0 +1,213 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows: coalescing only within a process
+    fcntl = None
+
+from config import (
+    SHARED_CACHE_ENABLED, SHARED_CACHE_PATH, SHARED_CACHE_DECODED_MAX, SHARED_CACHE_STALE_GRACE, MARKET_DATA_MAX_AGE
+)
+from utils.helpers import next_candle_close
+
+Expiry = Union[float, Callable[[], float]]
+
+
+class SharedCache:
+    """TTL cache shared by every worker process on the host.
+
+    Values are pickled into a SQLite database in WAL mode, so gunicorn
+    workers and threads all see the same entries. get_or_compute() is
+    single-flight: concurrent callers for the same key, in any process, wait
+    on a per-key file lock while one of them runs the upstream fetch.
+    Expired entries stay available as the stale fallback for `stale_grace`
+    seconds; after that set() deletes them along with their lock files.
+    """
+
+    def __init__(self, path: str, decoded_max: int = SHARED_CACHE_DECODED_MAX,
+                 stale_grace: float = SHARED_CACHE_STALE_GRACE):
+        self.path = path
+        self.stale_grace = stale_grace
+        self.lock_dir = f"{path}.locks"
+        os.makedirs(self.lock_dir, exist_ok=True)
+        self._local = threading.local()
+        self._key_locks: Dict[str, List] = {}  # key -> [lock, users], only while in use
+        self._key_locks_guard = threading.Lock()
+        # Decoded values keyed by cache key -> (updated_at, value), skips unpickling unchanged rows.
+        # An LRU of decoded_max entries, so keys read once do not pile up.
+        self._decoded: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self._decoded_max = decoded_max
+        self._decoded_lock = threading.Lock()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                "expires_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread and per process (connections must not cross a fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _lookup(self, key: str, allow_stale: bool = False) -> Tuple[bool, Any]:
+        row = self._connection().execute(
+            "SELECT expires_at, updated_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or (not allow_stale and row[0] <= time.time()):
+            return False, None
+        updated_at = row[1]
+        with self._decoded_lock:
+            decoded = self._decoded.get(key)
+            if decoded is not None and decoded[0] == updated_at:
+                self._decoded.move_to_end(key)
+                return True, decoded[1]
+        blob = self._connection().execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+        if blob is None:
+            return False, None
+        value = pickle.loads(blob[0])
+        self._remember(key, updated_at, value)
+        return True, value
+
+    def _remember(self, key: str, updated_at: float, value: Any) -> None:
+        with self._decoded_lock:
+            self._decoded[key] = (updated_at, value)
+            self._decoded.move_to_end(key)
+            while len(self._decoded) > self._decoded_max:
+                self._decoded.popitem(last=False)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Fresh value for key, or default"""
+        found, value = self._lookup(key)
+        return value if found else default
+
+    def set(self, key: str, value: Any, expires_at: float) -> None:
+        """Store value until the given epoch time, evicting entries expired for longer than stale_grace"""
+        updated_at = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, updated_at) VALUES (?, ?, ?, ?)",
+                (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), expires_at, updated_at)
+            )
+            evicted = [row[0] for row in conn.execute(
+                "SELECT key FROM cache WHERE expires_at <= ?", (updated_at - self.stale_grace,)
+            )]
+            if evicted:
+                conn.execute("DELETE FROM cache WHERE expires_at <= ?", (updated_at - self.stale_grace,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._remember(key, updated_at, value)
+        for old_key in evicted:
+            self._forget(old_key)
+
+    def _lock_path(self, key: str) -> str:
+        return os.path.join(self.lock_dir, f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.lock")
+
+    def _forget(self, key: str) -> None:
+        """Drop an evicted key's decoded value and lock file"""
+        with self._decoded_lock:
+            self._decoded.pop(key, None)
+        if fcntl is None:
+            return
+        try:
+            with open(self._lock_path(key), 'a') as lock_file:
+                # Not while a worker holds it; one that opened it but has not locked yet
+                # may still lock the removed file, costing at most a duplicate fetch
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                os.unlink(self._lock_path(key))
+        except OSError:
+            pass
+
+    def delete(self, key: str) -> None:
+        self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+        self._forget(key)
+
+    @contextmanager
+    def _single_flight(self, key: str):
+        with self._key_locks_guard:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                if fcntl is None:
+                    yield
+                    return
+                with open(self._lock_path(key), 'a') as lock_file:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                    try:
+                        yield
+                    finally:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        finally:
+            with self._key_locks_guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._key_locks[key]
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], expires_at: Expiry) -> Any:
+        """Return the cached value or run compute() once across all workers.
+
+        None results are not cached; if compute() fails the last (stale)
+        value is returned instead so a flaky upstream does not blank the UI.
+        """
+        found, value = self._lookup(key)
+        if found:
+            return value
+        with self._single_flight(key):
+            # Another worker may have refreshed the entry while we waited
+            found, value = self._lookup(key)
+            if found:
+                return value
+            value = compute()
+            if value is None:
+                found, stale = self._lookup(key, allow_stale=True)
+                return stale if found else None
+            self.set(key, value, expires_at() if callable(expires_at) else expires_at)
+            return value
+
+
+def market_data_expiry(timeframe: str) -> float:
+    """Cache expiry for candles: the next candle close, capped by MARKET_DATA_MAX_AGE"""
+    expires_at = next_candle_close(timeframe)
+    if MARKET_DATA_MAX_AGE:
+        expires_at = min(expires_at, time.time() + MARKET_DATA_MAX_AGE)
+    return expires_at
+
+
+_shared_cache: Optional[SharedCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_cache() -> Optional[SharedCache]:
+    """Process-wide SharedCache, or None when disabled or unavailable"""
+    global _shared_cache
+    if not SHARED_CACHE_ENABLED:
+        return None
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            try:
+                os.makedirs(os.path.dirname(SHARED_CACHE_PATH) or '.', exist_ok=True)
+                _shared_cache = SharedCache(SHARED_CACHE_PATH)
+            except (OSError, sqlite3.Error) as e:
+                print(f"[WARN] Shared cache unavailable: {e}")
+                return None
+        return _shared_cache
@@ -0,0 +1,68 @@
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Sequence
+
+import requests
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)")
+
+
+def import_profile(module: str = 'app', env: Optional[Dict[str, str]] = None) -> List[Dict]:
+    """Import `module` in a fresh interpreter under -X importtime.
+
+    Returns one row per imported module with self and cumulative time in
+    seconds and the nesting depth, in import order.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, env={**os.environ, **(env or {})}
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'import failed')
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append({
+                'module': name,
+                'self': int(self_us) / 1e6,
+                'cumulative': int(cumulative_us) / 1e6,
+                'depth': len(indent) // 2,
+            })
+    return rows
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def time_to_healthy(command: Sequence[str], url: str, timeout: float = 60.0,
+                    env: Optional[Dict[str, str]] = None) -> float:
+    """Seconds from starting `command` until `url` answers 200; the process is stopped afterwards"""
+    started = time.perf_counter()
+    process = subprocess.Popen(command, env={**os.environ, **(env or {})},
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"Server exited with code {process.returncode}")
+            try:
+                if requests.get(url, timeout=1).status_code == 200:
+                    return time.perf_counter() - started
+            except requests.RequestException:
+                pass
+            time.sleep(0.02)
+        raise TimeoutError(f"{url} not healthy after {timeout:.0f}s")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()